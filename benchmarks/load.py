@@ -0,0 +1,129 @@
+# benchmarks/load.py
+"""
+Load tests that drive the real Flask routes over HTTP against local
+stand-ins for OpenRouter, SearXNG and MySQL (see benchmarks/stubs.py).
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from werkzeug.serving import make_server
+
+from benchmarks.stats import summarize
+from benchmarks.stubs import StubUpstreamServer, use_sqlite_database
+
+REPORT_DATA = {
+    "location": "Lat: 22.4707, Lon: 70.0577",
+    "latitude": 22.4707,
+    "longitude": 70.0577,
+    "feasibility": "82%",
+    "recommended_technology": "Solar Electrolysis",
+    "suitability_scores": {"solar_electrolysis": 82, "wind_electrolysis": 79, "thermal_with_ccs": 76},
+    "regional_advantages": [
+        "Pioneering Renewable Energy Policy 2023 with strong incentives.",
+        "Excellent port infrastructure for green hydrogen export."
+    ]
+}
+
+
+def create_app():
+    from flask import Flask
+    from routes.history import history_bp
+    from routes.LLM import llm_bp
+    from routes.map import map_bp
+
+    app = Flask(__name__)
+    app.register_blueprint(llm_bp, url_prefix='/LLM')
+    app.register_blueprint(map_bp, url_prefix='/map')
+    app.register_blueprint(history_bp, url_prefix='/history')
+    return app
+
+
+class AppServer:
+    """Runs the app on a free local port in a background thread"""
+
+    def __init__(self, app):
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+
+def _drive(send, requests_total, concurrency):
+    """Closed-loop load: `concurrency` workers issue `requests_total` calls in total"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    local = threading.local()
+
+    def one(i):
+        nonlocal errors
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        t0 = time.perf_counter()
+        try:
+            ok = send(local.session, i)
+        except requests.RequestException:
+            ok = False
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0
+        with lock:
+            latencies.append(elapsed_ms)
+            errors += 0 if ok else 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests_total)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+def run_load(scale=1.0, llm_delay=0.05, search_delay=0.02):
+    upstream = StubUpstreamServer(llm_delay=llm_delay, search_delay=search_delay).start()
+    upstream.configure_environment()
+    database_dir = tempfile.mkdtemp(prefix='terragen-bench-')
+    use_sqlite_database(os.path.join(database_dir, 'terragen.db'))
+    server = AppServer(create_app()).start()
+    base_url = server.base_url
+
+    rng = np.random.default_rng(0)
+    points = np.column_stack((rng.uniform(8.0, 30.0, 100000), rng.uniform(68.0, 90.0, 100000)))
+
+    def analyze(session, i):
+        lat, lon = points[i]
+        return session.get(f"{base_url}/map/analyze", params={"latitude": lat, "longitude": lon}, timeout=30).ok
+
+    def generate_report(session, i):
+        # Bypass the report cache, and vary the inputs so concurrent requests are
+        # not coalesced, so every call exercises the full LLM path
+        report_data = dict(REPORT_DATA, location=f"{REPORT_DATA['location']} #{i}", refresh=True)
+        response = session.post(f"{base_url}/LLM/generate-report", json=report_data, timeout=120)
+        return response.ok and response.json().get('status') == 'success'
+
+    def history_sessions(session, i):
+        return session.get(f"{base_url}/history/api/sessions", params={"limit": 20}, timeout=30).ok
+
+    try:
+        # Seed a few sessions so the history listing has rows to serialize
+        _drive(generate_report, 5, 5)
+        return {
+            "map_analyze": _drive(analyze, int(2000 * scale), 8),
+            "llm_generate_report": _drive(generate_report, int(40 * scale), 4),
+            "history_sessions": _drive(history_sessions, int(500 * scale), 8)
+        }
+    finally:
+        server.stop()
+        upstream.stop()
@@ -0,0 +1,48 @@
+# benchmarks/micro.py
+"""Micro-benchmarks for the map hot paths: hub lookup and scoring math."""
+import time
+
+import numpy as np
+
+from benchmarks.stats import summarize
+
+
+def _measure(fn, iterations, warmup=50):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def run_micro(iterations=2000):
+    from routes.map import build_analysis, hub_store
+    from utils.hub_data import find_closest_hub
+    from utils.scoring_utils import ScoringEngine
+
+    dataset = hub_store.current()
+    engine = dataset.engine
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(8.0, 30.0, 1000)
+    lons = rng.uniform(68.0, 90.0, 1000)
+    points = iter(np.tile(np.column_stack((lats, lons)), (iterations // 1000 + 2, 1)))
+    rows = np.arange(len(engine))
+
+    def closest_hub():
+        lat, lon = next(points)
+        find_closest_hub(lat, lon, dataset)
+
+    return {
+        "find_closest_hub": _measure(closest_hub, iterations),
+        "nearest_many_1000": _measure(lambda: dataset.index.nearest_many(lats, lons), iterations // 10),
+        "engine_build": _measure(lambda: ScoringEngine(engine.names, engine.states, engine.lat, engine.lon, engine.factors), iterations // 10),
+        "score_factors_all_hubs": _measure(lambda: engine.score_factors(engine.factors), iterations),
+        "row_scores": _measure(lambda: engine.row_scores(int(rng.integers(len(engine)))), iterations),
+        "build_analysis": _measure(lambda: build_analysis(dataset, 21.0, 78.0, int(rng.integers(len(engine))), 10.0), iterations),
+        "rank_top20": _measure(lambda: engine.rank('ELECTROLYSIS', limit=20), iterations),
+        "sensitivity_10k_all_hubs": _measure(lambda: engine.sensitivity(rows, n_samples=10000), 5, warmup=1)
+    }
@@ -0,0 +1,98 @@
+# benchmarks/run.py
+"""
+Runs the micro-benchmarks and load tests, prints p50/p95/p99 latency and
+throughput, and compares them with the stored baseline.
+
+    python -m benchmarks.run                    # run and check for regressions
+    python -m benchmarks.run --suite micro      # only one suite
+    python -m benchmarks.run --update-baseline  # record the current numbers
+
+Exits with status 1 when a result regresses by more than --threshold.
+Baselines are machine-specific; record them on the machine that checks them.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Latency changes smaller than this (ms) are treated as noise, per suite
+NOISE_FLOOR_MS = {'micro': 0.02, 'load': 2.0}
+
+
+def compare(suite, results, baseline, threshold):
+    """Return a list of human-readable regressions against the baseline"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(suite, {}).get(name)
+        if not base:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            limit = base[metric] * (1 + threshold)
+            if current[metric] > limit and current[metric] - base[metric] > NOISE_FLOOR_MS[suite]:
+                regressions.append(f"{suite}.{name}.{metric}: {current[metric]:.4f} > {base[metric]:.4f} (+{threshold:.0%})")
+        if base['throughput_rps'] and current['throughput_rps'] < base['throughput_rps'] * (1 - threshold):
+            regressions.append(f"{suite}.{name}.throughput_rps: {current['throughput_rps']:.2f} < {base['throughput_rps']:.2f} (-{threshold:.0%})")
+        if current['errors'] > base.get('errors', 0):
+            regressions.append(f"{suite}.{name}.errors: {current['errors']} > {base.get('errors', 0)}")
+    return regressions
+
+
+def print_table(suite, results):
+    print(f"\n[{suite}]")
+    print(f"{'benchmark':<28}{'count':>8}{'errors':>8}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}{'rps':>12}")
+    for name, r in results.items():
+        print(f"{name:<28}{r['count']:>8}{r['errors']:>8}{r['p50_ms']:>12.4f}{r['p95_ms']:>12.4f}{r['p99_ms']:>12.4f}{r['throughput_rps']:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Terragen benchmark suite.")
+    parser.add_argument('--suite', choices=('micro', 'load', 'all'), default='all')
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed relative regression (default 0.25)")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiplier on the number of load-test requests")
+    parser.add_argument('--update-baseline', action='store_true', help="Write the results to baseline.json")
+    args = parser.parse_args()
+
+    from benchmarks.load import run_load
+    from benchmarks.micro import run_micro
+
+    results = {}
+    if args.suite in ('micro', 'all'):
+        results['micro'] = run_micro()
+    if args.suite in ('load', 'all'):
+        results['load'] = run_load(scale=args.scale)
+
+    for suite, suite_results in results.items():
+        print_table(suite, suite_results)
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nBaseline written to {BASELINE_PATH}")
+        return 0
+
+    regressions = []
+    for suite, suite_results in results.items():
+        regressions.extend(compare(suite, suite_results, baseline, args.threshold))
+
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,16 @@
+# benchmarks/stats.py
+import numpy as np
+
+
+def summarize(latencies_ms, elapsed_s, errors=0):
+    """Reduce per-call latencies (ms) to the figures stored in the baseline"""
+    latencies = np.asarray(latencies_ms, dtype=np.float64)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+    return {
+        "count": int(len(latencies)),
+        "errors": int(errors),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "throughput_rps": round(len(latencies) / elapsed_s, 2) if elapsed_s > 0 else 0.0
+    }
@@ -0,0 +1,277 @@
+# benchmarks/stubs.py
+"""
+Local stand-ins for the upstreams the app talks to, so load tests measure our
+own code and not the network:
+
+- StubUpstreamServer: one HTTP server that answers like OpenRouter
+  (/api/v1/chat/completions, including stream mode) and SearXNG (/search),
+  with configurable delays.
+- SqliteConnection: a sqlite3-backed object with the small part of the
+  mysql.connector API that DatabaseManager uses, patched in with
+  use_sqlite_database().
+"""
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+SUBQUERY_REPLY = '["green hydrogen policy India", "electrolysis cost 2025", "renewable energy hubs India"]'
+
+SEARCH_SNIPPETS = [
+    "Green hydrogen production in India is supported by state policies and falling electrolyser costs. "
+    "Gujarat and Rajasthan offer land and solar resources for large hubs.",
+    "The National Green Hydrogen Mission targets 5 MMT of annual production by 2030. "
+    "Incentives cover electrolyser manufacturing and hydrogen output.",
+    "Water availability is a key constraint for electrolysis in arid regions. "
+    "Desalination adds a small share to the levelized cost of hydrogen.",
+    "Port infrastructure on the western coast supports export of green ammonia. "
+    "Kandla and Mundra are planning dedicated hydrogen terminals.",
+]
+
+REPORT_REPLY = (
+    "## Executive Summary\n"
+    "This location shows strong potential for green hydrogen production.\n\n"
+    "## Risk Assessment\n"
+    "Water availability and grid stability are the main risks.\n"
+)
+
+
+class _UpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, model, content):
+        """Send `content` as chat.completion.chunk events, one word per chunk"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        pieces = re.findall(r'\S*\s*', content)[:-1]
+        for i, piece in enumerate(pieces):
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": piece} if i == 0 else {"content": piece},
+                    "finish_reason": "stop" if i == len(pieces) - 1 else None
+                }]
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            time.sleep(self.server.token_delay)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if urlparse(self.path).path != '/search':
+            self.send_error(404)
+            return
+        time.sleep(self.server.search_delay)
+        self._send_json({"results": [
+            {
+                "title": f"Green hydrogen result {i}",
+                "url": f"https://example.org/hydrogen/{i}",
+                "content": SEARCH_SNIPPETS[i % len(SEARCH_SNIPPETS)]
+            }
+            for i in range(8)
+        ]})
+
+    def do_POST(self):
+        if not urlparse(self.path).path.endswith('/chat/completions'):
+            self.send_error(404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        prompt = request.get('messages', [{}])[-1].get('content', '')
+        time.sleep(self.server.llm_delay)
+        content = SUBQUERY_REPLY if 'generate a list of 3-5 concise search queries' in prompt else REPORT_REPLY
+        if request.get('stream'):
+            self._send_stream(request.get('model', 'stub'), content)
+            return
+        self._send_json({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get('model', 'stub'),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4, "total_tokens": (len(prompt) + len(content)) // 4}
+        })
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients dropping connections (idle keep-alive, timeouts) is expected, not an error
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubUpstreamServer:
+    """Threaded stand-in for OpenRouter and SearXNG on a free local port"""
+
+    def __init__(self, llm_delay=0.05, search_delay=0.02, token_delay=0.005):
+        self.httpd = _QuietHTTPServer(('127.0.0.1', 0), _UpstreamHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.llm_delay = llm_delay
+        self.httpd.search_delay = search_delay
+        self.httpd.token_delay = token_delay
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def configure_environment(self):
+        """Point the LLM module at this server"""
+        os.environ['OPENROUTER_API_KEY'] = os.environ.get('OPENROUTER_API_KEY', 'stub-key')
+        os.environ['OPENROUTER_BASE_URL'] = f"{self.base_url}/api/v1"
+        os.environ['SEARXNG_URL'] = f"{self.base_url}/search"
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    location TEXT,
+    latitude REAL,
+    longitude REAL,
+    feasibility_score REAL,
+    recommended_technology TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER,
+    role TEXT,
+    content TEXT,
+    is_report BOOLEAN DEFAULT 0,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS report_cache (
+    cache_key TEXT PRIMARY KEY,
+    prompt_version TEXT NOT NULL,
+    location TEXT,
+    report TEXT NOT NULL,
+    created_at DATETIME NOT NULL
+);
+CREATE TABLE IF NOT EXISTS session_summaries (
+    session_id INTEGER PRIMARY KEY,
+    summary TEXT NOT NULL,
+    message_count INTEGER NOT NULL,
+    updated_at DATETIME NOT NULL
+);
+CREATE TABLE IF NOT EXISTS report_jobs (
+    id TEXT PRIMARY KEY,
+    dedupe_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    progress TEXT,
+    payload TEXT NOT NULL,
+    result TEXT,
+    session_id INTEGER,
+    error TEXT,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL
+);
+"""
+
+
+class _SqliteCursor:
+    def __init__(self, connection, dictionary=False):
+        self._cursor = connection.cursor()
+        self._dictionary = dictionary
+
+    def execute(self, query, params=()):
+        query = query.replace('%s', '?')
+        query = re.sub(r'\bNOW\(\)', 'CURRENT_TIMESTAMP', query)
+        self._cursor.execute(query, params)
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SqliteConnection:
+    """The subset of a mysql.connector connection that DatabaseManager relies on"""
+
+    def __init__(self, path):
+        self._connection = sqlite3.connect(path, timeout=30, detect_types=sqlite3.PARSE_DECLTYPES)
+        self._open = True
+
+    def cursor(self, dictionary=False):
+        return _SqliteCursor(self._connection, dictionary)
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def is_connected(self):
+        return self._open
+
+    def close(self):
+        self._open = False
+        self._connection.close()
+
+
+def use_sqlite_database(path):
+    """Create the schema at `path` and route every DatabaseManager connection to it"""
+    from utils.database_utils import DatabaseManager
+
+    with sqlite3.connect(path) as connection:
+        connection.executescript(SQLITE_SCHEMA)
+        connection.execute("PRAGMA journal_mode=WAL")
+    DatabaseManager.get_connection = lambda self: SqliteConnection(path)
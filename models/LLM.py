@@ -1,53 +1,328 @@
 import requests
+import httpx
 import openai
 import json
 import os
+import queue
 import re
+import threading
+import time
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+
+from utils.cache_utils import MISSING, SingleFlight, build_cache, content_hash
+from utils.http_utils import (
+    CircuitOpenError, Deadline, LatencyStats, UpstreamSession, circuit_breaker, pooled_httpx_client
+)
+from utils.text_utils import (
+    BM25, content_tokens, estimate_tokens, hamming_distance, keyword_query, normalize_query, normalize_url,
+    rake_phrases, simhash, split_sentences, tokenize
+)
 
 # Load environment variables for the API key
 from dotenv import load_dotenv
 load_dotenv()
 
+# Upstreams that fail BREAKER_FAILURE_THRESHOLD times in a row are skipped for
+# BREAKER_RESET_SECONDS, then probed again
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", 30))
+searxng_breaker = circuit_breaker("searxng", BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
+openrouter_breaker = circuit_breaker("openrouter", BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
+
+# Outbound HTTP goes through long-lived keep-alive pools, one per upstream
+searxng_http = UpstreamSession(
+    "searxng",
+    timeout=(3.05, float(os.getenv("SEARXNG_TIMEOUT", 10))),
+    retries=int(os.getenv("SEARXNG_RETRIES", 1)),
+    breaker=searxng_breaker
+)
+
 def searxng_search(query: str):
     """
     Performs a search using a local SearXNG instance.
     """
-    url = "http://localhost:8080/search"
+    url = os.getenv("SEARXNG_URL", "http://localhost:8080/search")
     params = {"q": query, "format": "json"}
     headers = {
         "User-Agent": "Mozilla/5.0 (compatible; SearXNG-Client/1.0; +https://searxng.org)",
         "Accept": "application/json"
     }
     try:
-        resp = requests.get(url, params=params, headers=headers, timeout=10)
+        resp = searxng_http.get(url, params=params, headers=headers)
         resp.raise_for_status()
         data = resp.json()
         return data.get("results", [])
+    except CircuitOpenError:
+        return []
     except requests.exceptions.RequestException as e:
         print(f"[ERROR] Couldn't fetch results from SearXNG: {e}")
         return []
 
+# Search results are cached on the normalized query. Set SEARCH_CACHE_BACKEND=sqlite
+# to share them between worker processes through the file at SEARCH_CACHE_PATH.
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", 6 * 3600))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", 2048))
+search_cache = build_cache("SEARCH_CACHE", SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_TTL_SECONDS, "search_results")
+
+def cached_search(query: str):
+    """
+    searxng_search behind the search cache. Empty results are not cached, so
+    a failed search is retried on the next request.
+    """
+    key = normalize_query(query) or query.strip().lower()
+    results = search_cache.get(key)
+    if results is not MISSING:
+        return results
+    results = searxng_search(query)
+    if results:
+        search_cache.set(key, results)
+    return results
+
+# Overall time budget of one RAG request unless the caller passes its own
+# Deadline. Subqueries and searches are cut short so that at least
+# GENERATION_RESERVE_SECONDS are left for the final completion.
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", 90))
+GENERATION_RESERVE_SECONDS = float(os.getenv("GENERATION_RESERVE_SECONDS", 15))
+
+# Appended to streamed answers that were cut off at the deadline
+DEADLINE_NOTE = "\n\n*[Answer cut short at the time limit.]*"
+
+# Subquery searches run concurrently on a shared, bounded pool under one deadline
+SEARCH_MAX_WORKERS = int(os.getenv("SEARCH_MAX_WORKERS", 8))
+SEARCH_DEADLINE_SECONDS = float(os.getenv("SEARCH_DEADLINE_SECONDS", 12))
+_search_pool = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="searxng")
+
+def _safe_search(query):
+    try:
+        return cached_search(query)
+    except Exception as e:
+        print(f"[ERROR] Search for {query!r} failed: {e}")
+        return []
+
+def start_searches(queries):
+    """Submit cached_search for every query to the search pool; returns the futures"""
+    return [_search_pool.submit(_safe_search, query) for query in queries]
+
+def gather_searches(futures, deadline=SEARCH_DEADLINE_SECONDS):
+    """
+    Gathers search results as they arrive. Searches still running when the
+    shared deadline expires are dropped. Results are returned in submission
+    order so the prompt stays stable.
+    """
+    index = {future: i for i, future in enumerate(futures)}
+    results_by_query = [[] for _ in futures]
+    try:
+        for future in as_completed(index, timeout=deadline):
+            results_by_query[index[future]] = future.result()
+    except FuturesTimeoutError:
+        pending = [future for future in futures if not future.done()]
+        for future in pending:
+            future.cancel()
+        print(f"[WARN] {len(pending)} of {len(futures)} searches missed the {deadline}s deadline")
+    return [result for results in results_by_query for result in results]
+
+def parallel_search(queries, deadline=SEARCH_DEADLINE_SECONDS):
+    """Runs cached_search for every query concurrently under one deadline"""
+    return gather_searches(start_searches(queries), deadline)
+
+# Where search queries come from (SUBQUERY_MODE):
+#   "llm"    - the LLM writes the subqueries (one extra model call per request)
+#   "local"  - local templates / key phrase extraction only, no model call
+#   "hybrid" - local queries when the caller provides them (structured report
+#              requests); otherwise local key phrases plus the LLM subqueries
+SUBQUERY_MODE = os.getenv("SUBQUERY_MODE", "hybrid").lower()
+
+# Speculative mode starts searching the raw query and local queries right
+# away, and merges in the LLM subqueries only if they arrive within
+# SUBQUERY_WAIT_SECONDS
+SPECULATIVE_SEARCH = os.getenv("SPECULATIVE_SEARCH", "1") == "1"
+SUBQUERY_WAIT_SECONDS = float(os.getenv("SUBQUERY_WAIT_SECONDS", 4))
+RAW_QUERY_MAX_WORDS = 32
+_subquery_pool = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="subqueries")
+
+# Wall-clock time of each pipeline stage, reported by /LLM/health
+stage_stats = {
+    name: LatencyStats()
+    for name in ("subqueries", "subquery_wait", "searching", "search_context", "generating")
+}
+subquery_outcomes = {"merged": 0, "late": 0, "local": 0}
+
+# Search templates for structured report requests
+REPORT_QUERY_TEMPLATES = (
+    "{technology} green hydrogen India {year}",
+    "{region} green hydrogen policy incentives",
+    "{technology} levelized cost of hydrogen India",
+    "{region} water availability renewable energy electrolysis",
+)
+
+def report_subqueries(report_data, state=None):
+    """Search queries for a feasibility report, filled in from its structured inputs"""
+    technology = " ".join(str(report_data.get('recommended_technology') or 'electrolysis').split())
+    region = f"{state} India" if state else "India"
+    return [
+        template.format(technology=technology, region=region, year=date.today().year)
+        for template in REPORT_QUERY_TEMPLATES
+    ]
+
+def local_subqueries(text, max_queries=4, context=""):
+    """
+    Search queries from the text's RAKE key phrases, each followed by
+    `context` (e.g. the site's technology); falls back to a keyword query
+    """
+    phrases = rake_phrases(text, max_phrases=max_queries) or [keyword_query(text)]
+    return [" ".join(f"{phrase} {context}".split()) for phrase in phrases if phrase]
+
+def _dedupe_queries(queries, seen=None):
+    seen = set() if seen is None else seen
+    unique = []
+    for query in queries:
+        key = normalize_query(str(query))
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(str(query))
+    return unique
+
+def speculative_queries(user_input, local_queries=None):
+    """Search queries that need no LLM call: the raw input if short, plus local queries"""
+    queries = []
+    if len(user_input.split()) <= RAW_QUERY_MAX_WORDS:
+        queries.append(" ".join(user_input.split()))
+    if local_queries:
+        queries += local_queries
+    elif SUBQUERY_MODE == "llm":
+        queries.append(keyword_query(user_input))
+    else:
+        queries += local_subqueries(user_input, max_queries=2)
+    return _dedupe_queries(queries)
+
+_openrouter_clients = {}
+_openrouter_lock = threading.Lock()
+
+# Results are deduplicated, reranked against the user's query with BM25 and
+# cut down to the best sentences within a token budget before prompting
+SEARCH_CONTEXT_TOKEN_BUDGET = int(os.getenv("SEARCH_CONTEXT_TOKEN_BUDGET", 600))
+SEARCH_CONTEXT_MAX_RESULTS = int(os.getenv("SEARCH_CONTEXT_MAX_RESULTS", 6))
+# SimHash distance (of 64 bits) at or below which two snippets count as the same
+# text; unrelated snippets sit around 32
+NEAR_DUPLICATE_MAX_BITS = 8
+MAX_PASSAGE_CHARS = 400
+
+def dedupe_results(results):
+    """Drop results with an already-seen normalized URL or near-duplicate text"""
+    seen_urls = set()
+    fingerprints = []
+    unique = []
+    for result in results:
+        url = normalize_url(result.get('url', ''))
+        if url in seen_urls:
+            continue
+        fingerprint = simhash(result.get('content') or result.get('title', ''))
+        if any(hamming_distance(fingerprint, other) <= NEAR_DUPLICATE_MAX_BITS for other in fingerprints):
+            continue
+        seen_urls.add(url)
+        fingerprints.append(fingerprint)
+        unique.append(result)
+    return unique
+
+def select_passages(results, query, token_budget=SEARCH_CONTEXT_TOKEN_BUDGET, max_results=SEARCH_CONTEXT_MAX_RESULTS):
+    """
+    Dedupes and ranks results against the query, then picks the best-scoring
+    sentences across the top results until the token budget is spent.
+    Returns [(result, passages)] in rank order, passages in page order.
+    """
+    results = dedupe_results(results)
+    if not results:
+        return []
+    query_tokens = content_tokens(query)
+    ranking = BM25([tokenize(f"{r.get('title', '')} {r.get('content', '')}") for r in results]).scores(query_tokens)
+    top = sorted(range(len(results)), key=lambda i: -ranking[i])[:max_results]
+
+    passages = [
+        (rank, position, sentence[:MAX_PASSAGE_CHARS])
+        for rank, i in enumerate(top)
+        for position, sentence in enumerate(split_sentences(results[i].get('content', '')))
+    ]
+    passage_scores = BM25([tokenize(passage[2]) for passage in passages]).scores(query_tokens)
+    chosen = {}
+    used = 0
+    for k in sorted(range(len(passages)), key=lambda k: (-passage_scores[k], passages[k][0], passages[k][1])):
+        rank, position, sentence = passages[k]
+        result = results[top[rank]]
+        # The first passage of a result also pays for its title and URL
+        cost = estimate_tokens(sentence)
+        if rank not in chosen:
+            cost += estimate_tokens(f"Result 0: Title: {result.get('title', '')}\nURL: {result.get('url', '')}\nContent: ")
+        if used + cost > token_budget:
+            continue
+        chosen.setdefault(rank, []).append((position, sentence))
+        used += cost
+    return [
+        (results[top[rank]], [sentence for position, sentence in sorted(chosen[rank])])
+        for rank in sorted(chosen)
+    ]
+
 def get_openrouter_client():
     """
-    Initializes and returns the OpenAI client configured for OpenRouter.
+    Returns the OpenAI client configured for OpenRouter. One client (and
+    connection pool) is shared per base URL and key; the client retries
+    429/5xx with jittered backoff up to OPENROUTER_MAX_RETRIES times.
     """
     api_key = os.getenv("OPENROUTER_API_KEY")
     if not api_key:
         raise ValueError("API key not found. Please set the OPENROUTER_API_KEY environment variable.")
     
-    return openai.OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=api_key,
-    )
+    base_url = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+    with _openrouter_lock:
+        client = _openrouter_clients.get((base_url, api_key))
+        if client is None:
+            client = _openrouter_clients[(base_url, api_key)] = openai.OpenAI(
+                base_url=base_url,
+                api_key=api_key,
+                max_retries=int(os.getenv("OPENROUTER_MAX_RETRIES", 2)),
+                http_client=pooled_httpx_client("openrouter", timeout=float(os.getenv("OPENROUTER_TIMEOUT", 120)))
+            )
+        return client
 
-def generate_subqueries(user_input):
+def create_chat_completion(deadline=None, **kwargs):
     """
-    Uses the DeepSeek model via OpenRouter to generate search subqueries.
+    client.chat.completions.create behind the OpenRouter circuit breaker.
+    Connection errors, timeouts, 429 and 5xx count as failures. With a
+    deadline, the request times out when it expires and is not retried;
+    such timeouts say nothing about OpenRouter and are not counted.
     """
     client = get_openrouter_client()
+    if deadline is not None:
+        if deadline.expired():
+            raise openai.APITimeoutError(request=None)
+        client = client.with_options(timeout=deadline.remaining(), max_retries=0)
+    if not openrouter_breaker.allow():
+        raise CircuitOpenError("Circuit for openrouter is open")
+    try:
+        response = client.chat.completions.create(**kwargs)
+    except openai.APITimeoutError:
+        if deadline is not None and deadline.expired():
+            openrouter_breaker.release()
+        else:
+            openrouter_breaker.record_failure()
+        raise
+    except (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError):
+        openrouter_breaker.record_failure()
+        raise
+    except Exception:
+        openrouter_breaker.record_success()
+        raise
+    openrouter_breaker.record_success()
+    return response
+
+def generate_subqueries(user_input, deadline=None):
+    """
+    Uses the DeepSeek model via OpenRouter to generate search subqueries.
+    """
     prompt = f"Based on the following user query, generate a list of 3-5 concise search queries to find relevant information. Respond with a JSON array of strings only. User query: {user_input}"
     try:
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            deadline=deadline,
             model="deepseek/deepseek-r1-0528:free",
             messages=[{"role": "user", "content": prompt}],
         )
@@ -62,53 +337,277 @@ def generate_subqueries(user_input):
         print(f"[ERROR] Failed to generate subqueries with OpenRouter: {e}")
         return [user_input]
 
-def generate_final_response(user_input, search_results_text, chat_history):
+# generate_final_response returns its error as text; callers check this prefix before caching
+FINAL_RESPONSE_ERROR_PREFIX = "Oops, I ran into a problem"
+
+# Earlier turns beyond this many tokens are left to the conversation summary
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 1500))
+
+def split_history(chat_history, token_budget=HISTORY_TOKEN_BUDGET):
     """
-    Generates the final, framed response based on user input and search results.
+    Index where the newest turns that fit in token_budget start; turns before
+    it belong in the summary. The newest turn is always kept.
+    """
+    used = 0
+    for i in range(len(chat_history) - 1, -1, -1):
+        used += estimate_tokens(chat_history[i]['content']) + 4
+        if used > token_budget and i < len(chat_history) - 1:
+            return i + 1
+    return 0
+
+def build_final_prompt(user_input, search_results_text, chat_history, summary=None):
+    """
+    chat_history holds the turns before user_input, already windowed by
+    ConversationMemory.context; `summary` stands in for the earlier ones.
     """
-    client = get_openrouter_client()
     history_prompt = " ".join([f"{msg['role']}: {msg['content']}" for msg in chat_history])
-    prompt = f"You are a helpful assistant. You have access to the following search results:\n\n{search_results_text}\n\nBased on this information and the following conversation history, answer the user's latest query. Conversation History: {history_prompt}\nUser's latest query: {user_input}"
+    summary_prompt = f"Summary of the earlier conversation: {summary}\n" if summary else ""
+    return f"You are a helpful assistant. You have access to the following search results:\n\n{search_results_text}\n\nBased on this information and the following conversation history, answer the user's latest query. {summary_prompt}Conversation History: {history_prompt}\nUser's latest query: {user_input}"
+
+def summarize_turns(previous_summary, messages, deadline=None):
+    """
+    Folds `messages` into the running conversation summary and returns the
+    new summary. Only the new turns are sent, not the whole conversation.
+    """
+    transcript = "\n".join(f"{msg['role'].capitalize()}: {msg['content'][:1500]}" for msg in messages)
+    prompt = f"""Update the running summary of this conversation about hydrogen production feasibility analysis.
+Keep key facts, decisions, questions asked and recommendations made. Keep the summary under 200 words.
+
+Current summary:
+{previous_summary or '(none yet)'}
+
+New messages:
+{transcript}"""
+    response = create_chat_completion(
+        deadline=deadline,
+        model="deepseek/deepseek-r1-0528:free",
+        messages=[{"role": "user", "content": prompt}]
+    )
+    return response.choices[0].message.content
+
+def generate_final_response(user_input, search_results_text, chat_history, summary=None, deadline=None):
+    """
+    Generates the final, framed response based on user input and search results.
+    """
+    prompt = build_final_prompt(user_input, search_results_text, chat_history, summary)
     
     try:
-        response = client.chat.completions.create(
+        response = create_chat_completion(
+            deadline=deadline,
             model="deepseek/deepseek-r1-0528:free",
             messages=[{"role": "user", "content": prompt}]
         )
         return response.choices[0].message.content
     except Exception as e:
-        return f"Oops, I ran into a problem generating the final response: {e}"
+        if deadline is not None and deadline.expired():
+            deadline.degrade("generating")
+        return f"{FINAL_RESPONSE_ERROR_PREFIX} generating the final response: {e}"
+
+_STREAM_END = object()
+
+def _pump_stream(stream, pieces, stop):
+    """Reads a completion stream into `pieces`: text, then _STREAM_END or the exception raised"""
+    try:
+        for chunk in stream:
+            if stop.is_set():
+                break
+            if chunk.choices and chunk.choices[0].delta.content:
+                pieces.put(chunk.choices[0].delta.content)
+        pieces.put(_STREAM_END)
+    except Exception as e:
+        pieces.put(e)
+    finally:
+        stream.close()
 
-def get_llm_response(messages, websearch_enabled=False):
+def stream_completion(prompt, deadline=None):
     """
-    Orchestrates the RAG process with SearXNG and DeepSeek.
+    Yields the completion text of `prompt` piece by piece as the model
+    produces it. The stream is read on a helper thread, so a stalled
+    upstream cannot hold the caller past the deadline: when it expires,
+    reading stops, DEADLINE_NOTE is yielded and "generating" is marked
+    degraded. Other errors propagate to the caller.
     """
+    cut_short = False
     try:
-        user_input = messages[-1]['content']
-        search_results_text = ""
+        stream = create_chat_completion(
+            deadline=deadline,
+            model="deepseek/deepseek-r1-0528:free",
+            messages=[{"role": "user", "content": prompt}],
+            stream=True
+        )
+    except openai.APITimeoutError:
+        if deadline is None:
+            raise
+        cut_short = True
+    else:
+        # Each read is also capped at the time left when the request was made
+        # (see create_chat_completion), so the reader thread stops by then too
+        pieces = queue.Queue()
+        stop = threading.Event()
+        threading.Thread(target=_pump_stream, args=(stream, pieces, stop), daemon=True).start()
+        try:
+            while deadline is None or not deadline.expired():
+                try:
+                    piece = pieces.get(timeout=deadline.remaining() if deadline is not None else None)
+                except queue.Empty:
+                    break
+                if piece is _STREAM_END:
+                    break
+                if isinstance(piece, Exception):
+                    # Read timeouts come from the deadline, which capped them
+                    if deadline is not None and isinstance(piece, (httpx.TimeoutException, openai.APITimeoutError)):
+                        cut_short = True
+                        break
+                    raise piece
+                yield piece
+        finally:
+            stop.set()
+    if deadline is not None and (cut_short or deadline.expired()):
+        deadline.degrade("generating")
+        yield DEADLINE_NOTE
+
+def stream_final_response(user_input, search_results_text, chat_history, summary=None, deadline=None):
+    """
+    Same as generate_final_response, but yields the completion text piece by
+    piece as the model produces it (see stream_completion).
+    """
+    prompt = build_final_prompt(user_input, search_results_text, chat_history, summary)
+    yield from stream_completion(prompt, deadline)
+
+def _no_stage(stage):
+    pass
+
+# Identical requests in flight at the same time share one upstream computation
+llm_flight = SingleFlight()
+
+def build_search_context(user_input, on_stage=_no_stage, local_queries=None, deadline=None, query=None):
+    """
+    Runs subquery generation and the searches, and formats the results for
+    the final prompt. local_queries are caller-built queries (see
+    SUBQUERY_MODE). `query` is the user's own query when user_input wraps it
+    in a prompt template; passages are reranked against it and it is what
+    the speculative search sends as is. on_stage is called with each stage
+    name as it starts. Stages that were skipped or cut short by the deadline
+    are recorded on it. Concurrent calls for the same input share one run
+    under the first caller's deadline.
+    """
+    deadline = deadline or Deadline(REQUEST_DEADLINE_SECONDS)
+    query = query or user_input
+    key = content_hash({"input": user_input, "queries": local_queries, "query": query}, "search_context")
+    search_results_text, degraded = llm_flight.do(
+        key,
+        lambda: _build_search_context(user_input, on_stage, local_queries, deadline, query),
+        label=user_input
+    )
+    for stage in degraded:
+        deadline.degrade(stage)
+    return search_results_text
+
+def _timed_subqueries(user_input, deadline=None):
+    start = time.perf_counter()
+    try:
+        return generate_subqueries(user_input, deadline)
+    finally:
+        stage_stats["subqueries"].record(time.perf_counter() - start)
+
+def _build_search_context(user_input, on_stage, local_queries, deadline, query):
+    """Returns (search_results_text, degraded_stages)"""
+    start = time.perf_counter()
+    degraded = []
+    if deadline.cap(SEARCH_DEADLINE_SECONDS, reserve=GENERATION_RESERVE_SECONDS) <= 0:
+        print(f"[WARN] Skipping web search; {deadline.remaining():.1f}s left of the request deadline")
+        return "Web search was skipped to stay within the time limit.", ["subqueries", "searching"]
+    
+    # Step 1: Generate subqueries from user input
+    on_stage("subqueries")
+    if SUBQUERY_MODE == "local" or (SUBQUERY_MODE == "hybrid" and local_queries):
+        # No model call: local queries only
+        subquery_outcomes["local"] += 1
+        futures = start_searches(speculative_queries(user_input, local_queries)[:5])
+    elif SPECULATIVE_SEARCH:
+        # Search the raw input and local queries while the subqueries are generated
+        subquery_future = _subquery_pool.submit(_timed_subqueries, user_input, deadline)
+        queries = speculative_queries(query, local_queries)
+        futures = start_searches(queries)
+        wait_start = time.perf_counter()
+        wait = deadline.cap(SUBQUERY_WAIT_SECONDS, reserve=GENERATION_RESERVE_SECONDS)
+        try:
+            subqueries = subquery_future.result(timeout=wait)
+            subquery_outcomes["merged"] += 1
+        except FuturesTimeoutError:
+            subqueries = []
+            subquery_outcomes["late"] += 1
+            degraded.append("subqueries")
+            print(f"[WARN] Subqueries missed the {wait:.1f}s budget; searching without them")
+        stage_stats["subquery_wait"].record(time.perf_counter() - wait_start)
         
-        if websearch_enabled:
-            # Step 1: Generate subqueries from user input
-            subqueries = generate_subqueries(user_input)
-            
-            # Step 2: Perform search for each subquery
-            all_results = []
-            for query in subqueries:
-                results = searxng_search(query)
-                all_results.extend(results)
-            
-            # Step 3: Format search results for the LLM
-            search_results_text = "Search Results:\n\n"
-            if not all_results:
-                search_results_text = "No relevant search results were found."
-            else:
-                for i, result in enumerate(all_results[:5]): # Limit to top 5 results
-                    search_results_text += f"Result {i+1}: Title: {result.get('title', '')}\nURL: {result.get('url', '')}\nContent: {result.get('content', '')[:200]}...\n\n"
+        # The raw input is generate_subqueries' fallback and is already covered
+        seen = {normalize_query(query) for query in queries}
+        futures += start_searches(_dedupe_queries([query for query in subqueries if query != user_input], seen))
+    else:
+        subquery_future = _subquery_pool.submit(_timed_subqueries, user_input, deadline)
+        try:
+            subqueries = subquery_future.result(timeout=deadline.cap(SEARCH_DEADLINE_SECONDS, reserve=GENERATION_RESERVE_SECONDS))
+        except FuturesTimeoutError:
+            subqueries = [user_input]
+            degraded.append("subqueries")
+        futures = start_searches(subqueries)
+    
+    # Step 2: Search all subqueries concurrently under one deadline
+    on_stage("searching")
+    search_start = time.perf_counter()
+    all_results = gather_searches(futures, deadline.cap(SEARCH_DEADLINE_SECONDS, reserve=GENERATION_RESERVE_SECONDS))
+    if any(future.cancelled() or not future.done() for future in futures):
+        degraded.append("searching")
+    stage_stats["searching"].record(time.perf_counter() - search_start)
+    stage_stats["search_context"].record(time.perf_counter() - start)
+    
+    # Step 3: Keep the most relevant passages and format them for the LLM
+    selected = select_passages(all_results, query)
+    if not selected:
+        return "No relevant search results were found.", degraded
+    search_results_text = "Search Results:\n\n"
+    for i, (result, passages) in enumerate(selected):
+        search_results_text += f"Result {i+1}: Title: {result.get('title', '')}\nURL: {result.get('url', '')}\nContent: {' '.join(passages)}\n\n"
+    return search_results_text, degraded
+
+def get_llm_response(messages, websearch_enabled=False, on_stage=_no_stage, summary=None, local_queries=None, deadline=None, query=None):
+    """
+    Orchestrates the RAG process with SearXNG and DeepSeek. The last message
+    is the query; earlier ones are conversation history, with `summary`
+    covering turns that are no longer included. local_queries are search
+    queries built by the caller (see SUBQUERY_MODE) and `query` the user's own
+    query inside the last message (see build_search_context). on_stage is
+    called with "subqueries", "searching" and "generating" as each starts.
+    The whole run is bounded by `deadline` (REQUEST_DEADLINE_SECONDS if not
+    given); the result's "degraded" lists the stages it skipped or cut short.
+    Concurrent calls with the same messages share one run; callers that join
+    a run in flight get no stage callbacks and share the first caller's
+    deadline.
+    """
+    key = content_hash(
+        {"messages": messages, "summary": summary, "websearch": websearch_enabled, "queries": local_queries, "query": query},
+        "llm_response"
+    )
+    result = llm_flight.do(
+        key,
+        lambda: _get_llm_response(messages, websearch_enabled, on_stage, summary, local_queries, deadline or Deadline(REQUEST_DEADLINE_SECONDS), query),
+        label=messages[-1]['content'] if messages else None
+    )
+    return dict(result)
+
+def _get_llm_response(messages, websearch_enabled, on_stage, summary, local_queries, deadline, query):
+    try:
+        user_input = messages[-1]['content']
+        search_results_text = build_search_context(user_input, on_stage, local_queries, deadline, query) if websearch_enabled else ""
         
         # Step 4: Generate final response based on history and search results
-        response_content = generate_final_response(user_input, search_results_text, messages)
+        on_stage("generating")
+        generate_start = time.perf_counter()
+        response_content = generate_final_response(user_input, search_results_text, messages[:-1], summary, deadline)
+        stage_stats["generating"].record(time.perf_counter() - generate_start)
         
-        return {"status": "success", "response": response_content}
+        return {"status": "success", "response": response_content, "degraded": list(deadline.degraded)}
 
     except Exception as e:
         return {"error": f"An unexpected error occurred: {str(e)}"}
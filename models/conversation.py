@@ -0,0 +1,98 @@
+# models/conversation.py
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from models.LLM import GENERATION_RESERVE_SECONDS, HISTORY_TOKEN_BUDGET, split_history, summarize_turns
+from utils.http_utils import Deadline
+
+# Unsummarized turns beyond this many messages are summarized before the
+# prompt is built rather than carried verbatim until the background refresh
+SYNC_SUMMARY_MESSAGES = int(os.getenv('SYNC_SUMMARY_MESSAGES', 4))
+# Most of the request budget a synchronous summary may take, and the least it
+# needs to be worth trying; with less left the turns are kept verbatim
+SYNC_SUMMARY_SECONDS = float(os.getenv('SYNC_SUMMARY_SECONDS', 10))
+SYNC_SUMMARY_MIN_SECONDS = float(os.getenv('SYNC_SUMMARY_MIN_SECONDS', 3))
+
+
+class ConversationMemory:
+    """
+    Prompt history for a chat session: the newest turns that fit in the token
+    budget, plus a rolling summary of everything before them. The summary is
+    stored per session in session_summaries and extended in the background
+    with only the turns that have newly fallen out of the window, so prompt
+    size and latency stay flat as a session grows.
+    """
+
+    def __init__(self, db_manager, token_budget=HISTORY_TOKEN_BUDGET, max_workers=2):
+        self.db_manager = db_manager
+        self.token_budget = token_budget
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summary")
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._table_ready = False
+
+    def _ensure_table(self):
+        if not self._table_ready:
+            self._table_ready = self.db_manager.create_session_summaries_table()
+        return self._table_ready
+
+    def context(self, session_id, deadline=None):
+        """
+        Returns (summary, recent_messages) for the next prompt of a session.
+        A synchronous summary only uses the part of `deadline` that leaves
+        time for generation.
+        """
+        if not session_id:
+            return None, []
+        messages = [
+            {'role': msg['role'], 'content': msg['content']}
+            for msg in self.db_manager.get_chat_messages(session_id)
+        ]
+        window_start = split_history(messages, self.token_budget)
+
+        stored = self.db_manager.get_session_summary(session_id) if self._ensure_table() else None
+        summary, covered = (stored['summary'], stored['message_count']) if stored else (None, 0)
+        if covered > len(messages):
+            # Messages were removed since the summary was written; start over
+            summary, covered = None, 0
+
+        # Turns between the summary and the window stay in the prompt verbatim
+        # until the summary covers them. A gap of a turn or two is folded in
+        # the background; a larger one is summarized now if the budget allows.
+        if window_start > covered:
+            gap = messages[covered:window_start]
+            budget = deadline.cap(SYNC_SUMMARY_SECONDS, reserve=GENERATION_RESERVE_SECONDS) if deadline else SYNC_SUMMARY_SECONDS
+            updated = None
+            if len(gap) > SYNC_SUMMARY_MESSAGES and budget >= SYNC_SUMMARY_MIN_SECONDS and not self._is_refreshing(session_id):
+                try:
+                    updated = summarize_turns(summary, gap, Deadline(budget))
+                except Exception as e:
+                    print(f"[ERROR] Summarizing session {session_id} failed, keeping its turns verbatim: {e}")
+            if updated is None:
+                self._refresh_later(session_id, summary, gap, window_start)
+            else:
+                self.db_manager.save_session_summary(session_id, updated, window_start)
+                summary, covered = updated, window_start
+        return summary, messages[min(covered, window_start):]
+
+    def _is_refreshing(self, session_id):
+        with self._lock:
+            return session_id in self._refreshing
+
+    def _refresh_later(self, session_id, summary, new_messages, message_count):
+        with self._lock:
+            if session_id in self._refreshing:
+                return
+            self._refreshing.add(session_id)
+        self._pool.submit(self._refresh, session_id, summary, new_messages, message_count)
+
+    def _refresh(self, session_id, summary, new_messages, message_count):
+        try:
+            updated = summarize_turns(summary, new_messages)
+            self.db_manager.save_session_summary(session_id, updated, message_count)
+        except Exception as e:
+            print(f"[ERROR] Updating the summary of session {session_id} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(session_id)
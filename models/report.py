@@ -0,0 +1,326 @@
+# models/report.py
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from models.LLM import REQUEST_DEADLINE_SECONDS, create_chat_completion, stage_stats, stream_completion
+from utils.http_utils import Deadline
+from utils.scoring_utils import FACTORS, TECH_WEIGHTS
+
+# Report data keys of the suitability scores, with the scoring technology behind each
+REPORT_TECHNOLOGIES = (
+    ('solar_electrolysis', 'Solar Electrolysis', 'SOLAR_BASED'),
+    ('wind_electrolysis', 'Wind Electrolysis', 'ELECTROLYSIS'),
+    ('thermal_with_ccs', 'Thermal with CCS', 'THERMAL'),
+)
+
+FACTOR_LABELS = {
+    'solar': 'Solar resource',
+    'wind': 'Wind resource',
+    'gas': 'Natural gas access',
+    'water': 'Water availability',
+    'infrastructure': 'Infrastructure',
+    'demand_center': 'Demand centres',
+    'transport_logistics': 'Transport and logistics'
+}
+
+# Implementation phases per technology: (phase, [milestones])
+TIMELINE_MILESTONES = {
+    'SOLAR_BASED': (
+        ("Short term (0-2 years)", [
+            "Bankable solar resource assessment and site survey",
+            "Land allotment, water rights and environmental clearance",
+            "Pilot electrolyser (1-10 MW) with grid or captive solar supply"
+        ]),
+        ("Medium term (2-5 years)", [
+            "Utility-scale solar farm and electrolyser build-out",
+            "Hydrogen storage, compression and offtake agreements",
+            "Battery or grid firming to raise electrolyser utilisation"
+        ]),
+        ("Long term (5+ years)", [
+            "Scale to full capacity and add derivative production (ammonia, methanol)",
+            "Pipeline or port links to domestic demand and export markets"
+        ])
+    ),
+    'ELECTROLYSIS': (
+        ("Short term (0-2 years)", [
+            "Wind measurement campaign and hybrid wind-solar resource study",
+            "Land, transmission access and environmental clearance",
+            "Pilot electrolyser on existing renewable supply"
+        ]),
+        ("Medium term (2-5 years)", [
+            "Wind and solar hybrid plant with dedicated transmission",
+            "Electrolyser build-out sized to the hybrid generation profile",
+            "Storage and long-term offtake agreements"
+        ]),
+        ("Long term (5+ years)", [
+            "Capacity expansion and derivative production",
+            "Integration with regional hydrogen pipelines and export terminals"
+        ])
+    ),
+    'THERMAL': (
+        ("Short term (0-2 years)", [
+            "Gas supply contracts and CO2 storage site appraisal",
+            "Retrofit study for existing reformers or new-build design",
+            "Environmental clearance and carbon accounting framework"
+        ]),
+        ("Medium term (2-5 years)", [
+            "Reformer with carbon capture and CO2 transport and storage",
+            "Offtake agreements with nearby industrial users"
+        ]),
+        ("Long term (5+ years)", [
+            "Raise capture rates and blend in electrolytic hydrogen",
+            "Transition plan towards fully renewable production"
+        ])
+    )
+}
+
+# Report layout: (title, source). "local" sections are rendered here from the
+# analysis data, "narrative" ones are written by the LLM in a single call and
+# "risks" by a second call that runs in parallel with it.
+REPORT_SECTIONS = (
+    ("Executive Summary", "narrative"),
+    ("Technology Comparison", "local"),
+    ("Economic Viability", "narrative"),
+    ("Infrastructure Requirements", "narrative"),
+    ("Environmental Impact", "narrative"),
+    ("Implementation Timeline", "local"),
+    ("Risk Assessment and Mitigation", "risks"),
+    ("Recommendations for This Location", "narrative"),
+)
+
+# Narrative section titles as requested in the prompt; only a level-2 heading
+# with one of these titles (optionally numbered) starts a section
+_NARRATIVE_TITLES = {title.lower(): index for index, (title, source) in enumerate(REPORT_SECTIONS) if source == "narrative"}
+_HEADING_RE = re.compile(r"^\s*#{1,6}\s*(.+?)\s*#*\s*$")
+_SECTION_HEADING_RE = re.compile(r"^\s*##\s+(?:\d+\s*[.):]\s*)?(.+?)\s*#*\s*$")
+
+_risk_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="report-risks")
+
+
+def _score(value):
+    """Numeric score from 82, "82", "82%" or "82/100"; None if there is none"""
+    match = re.search(r"-?\d+(?:\.\d+)?", str(value)) if value is not None else None
+    return float(match.group(0)) if match else None
+
+
+def _subheading(line):
+    """Generated headings become ### so they cannot break the report's section layout"""
+    match = _HEADING_RE.match(line)
+    return f"### {match.group(1)}" if match else line
+
+
+def _recommended_key(report_data):
+    scores = report_data.get('suitability_scores') or {}
+    ranked = [(_score(scores.get(key)), tech) for key, _, tech in REPORT_TECHNOLOGIES if _score(scores.get(key)) is not None]
+    return max(ranked)[1] if ranked else 'SOLAR_BASED'
+
+
+class HybridReport:
+    """
+    Feasibility report assembled from local and generated sections. Score
+    tables, site factors, policy bullets and the timeline are rendered from
+    the analysis data; the LLM writes only the narrative sections and the
+    risk assessment, in two calls that run in parallel.
+
+    site is the nearest hub as (name, record, distance_km), where record has
+    'state' and the factor values; policies are the state's policy bullets.
+    Generated sections that do not finish before the deadline are cut short
+    and recorded on it; the local sections are always complete.
+    """
+
+    def __init__(self, report_data, search_results_text, site=None, policies=None, deadline=None):
+        self.report_data = report_data
+        self.search_results_text = search_results_text
+        self.site = site
+        self.policies = policies or report_data.get('regional_advantages') or []
+        self.technology = _recommended_key(report_data)
+        self.deadline = deadline or Deadline(REQUEST_DEADLINE_SECONDS)
+
+    # --- Local sections ---
+
+    def title(self):
+        return f"# Green Hydrogen Feasibility Report: {self.report_data.get('location', 'Selected Location')}\n\n"
+
+    def key_figures(self):
+        lines = [
+            f"- **Location:** {self.report_data.get('location', 'N/A')}",
+            f"- **Overall feasibility:** {self.report_data.get('feasibility', 'N/A')}",
+            f"- **Recommended technology:** {self.report_data.get('recommended_technology', 'N/A')}"
+        ]
+        if self.site:
+            name, record, distance_km = self.site
+            lines.insert(1, f"- **Nearest hub:** {name}, {record.get('state', 'N/A')} ({distance_km:.1f} km away)")
+        return "\n".join(lines) + "\n\n"
+
+    def technology_comparison(self):
+        scores = self.report_data.get('suitability_scores') or {}
+        ranked = sorted(REPORT_TECHNOLOGIES, key=lambda item: -(_score(scores.get(item[0])) or 0))
+        lines = ["| Rank | Technology | Suitability | Main drivers |", "| --- | --- | --- | --- |"]
+        for rank, (key, label, tech) in enumerate(ranked, start=1):
+            score = _score(scores.get(key))
+            marker = " (recommended)" if tech == self.technology else ""
+            lines.append(
+                f"| {rank} | {label}{marker} | {'N/A' if score is None else f'{score:.0f}/100'} | {self._drivers(tech)} |"
+            )
+        text = "\n".join(lines) + "\n\n"
+
+        if self.site:
+            record = self.site[1]
+            text += "**Site factors at the nearest hub (0-10):**\n\n| Factor | Score |\n| --- | --- |\n"
+            text += "\n".join(f"| {FACTOR_LABELS[factor]} | {record[factor]:.1f} |" for factor in FACTORS if factor in record)
+            text += "\n\n"
+        return text
+
+    def _drivers(self, tech):
+        """The two most heavily weighted factors of a technology, with the site's values"""
+        weights = sorted(TECH_WEIGHTS[tech].items(), key=lambda item: -item[1])[:2]
+        record = self.site[1] if self.site else {}
+        return ", ".join(
+            f"{FACTOR_LABELS[factor]}" + (f" {record[factor]:.1f}/10" if factor in record else "")
+            for factor, _ in weights
+        )
+
+    def timeline(self):
+        text = ""
+        for phase, milestones in TIMELINE_MILESTONES[self.technology]:
+            text += f"**{phase}**\n\n" + "".join(f"- {milestone}\n" for milestone in milestones) + "\n"
+        return text
+
+    def policy_support(self):
+        if not self.policies:
+            return ""
+        state = self.site[1].get('state') if self.site else None
+        heading = f"**Policy support in {state}:**" if state else "**Policy support:**"
+        return heading + "\n\n" + "".join(f"- {policy}\n" for policy in self.policies) + "\n"
+
+    # --- Generated sections ---
+
+    def facts(self):
+        """The analysis data as plain text for the LLM prompts"""
+        return (
+            self.key_figures()
+            + self.technology_comparison()
+            + ("Regional advantages:\n" + "".join(f"- {policy}\n" for policy in self.policies) if self.policies else "")
+        )
+
+    def narrative_prompt(self):
+        headings = "\n".join(f"## {title}" for title, source in REPORT_SECTIONS if source == "narrative")
+        return f"""You are writing parts of a green hydrogen production feasibility report. Analysis data:
+
+{self.facts()}
+{self.search_results_text}
+
+Write only the following sections, in this order, each starting with its heading exactly as given:
+{headings}
+
+Keep each section to one or two short paragraphs (at most 120 words). Use the analysis data and search results for concrete figures where available.
+Do not repeat the score tables, site factors, policy lists, implementation timeline or risks; those are added separately."""
+
+    def risk_prompt(self):
+        return f"""You are writing the risk assessment of a green hydrogen production feasibility report. Analysis data:
+
+{self.facts()}
+{self.search_results_text}
+
+List the 4-6 main risks for this location and technology as markdown bullets, each in the form "**Risk:** description. *Mitigation:* measure." Respond with the bullets only, no heading or introduction."""
+
+    def _risks(self):
+        response = create_chat_completion(
+            deadline=self.deadline,
+            model="deepseek/deepseek-r1-0528:free",
+            messages=[{"role": "user", "content": self.risk_prompt()}]
+        )
+        text = response.choices[0].message.content.strip()
+        return "\n".join(_subheading(line) for line in text.split("\n")) + "\n\n"
+
+    def _narrative_stream(self):
+        return stream_completion(self.narrative_prompt(), self.deadline)
+
+    def _risk_text(self, risks):
+        try:
+            return risks.result(timeout=self.deadline.remaining())
+        except Exception:
+            # Waiting ran out, or the call itself timed out at the deadline
+            if not self.deadline.expired():
+                raise
+            self.deadline.degrade("risks")
+            return "*The risk assessment was not completed within the time limit.*\n\n"
+
+    # --- Assembly ---
+
+    def _heading(self, index):
+        return f"## {index + 1}. {REPORT_SECTIONS[index][0]}\n\n"
+
+    def _section_start(self, index, risks, skipped=False):
+        """
+        Heading plus the local content of a section; the full section unless
+        it is narrative. Narrative sections the model skipped get a note so
+        the layout stays complete.
+        """
+        text = self._heading(index)
+        if skipped and REPORT_SECTIONS[index][1] == "narrative":
+            text += "*This section was not covered in the generated analysis.*\n\n"
+        if index == 0:
+            text += self.key_figures()
+        elif index == 1:
+            text += self.technology_comparison()
+        elif index == 5:
+            text += self.timeline()
+        elif index == 6:
+            text += self._risk_text(risks)
+        elif index == 7:
+            text += self.policy_support()
+        return text
+
+    @staticmethod
+    def _narrative_index(line):
+        match = _SECTION_HEADING_RE.match(line)
+        if not match:
+            return None
+        return _NARRATIVE_TITLES.get(match.group(1).strip("*_ :").lower())
+
+    def stream(self):
+        """
+        Yields the report text in layout order. Every section heading is
+        emitted, in order. Narrative text is passed on as the model streams
+        it; local sections are inserted as soon as the model moves past them.
+        Other generated headings are demoted to sub-headings. Errors from
+        either LLM call propagate.
+        """
+        start = time.perf_counter()
+        risks = _risk_pool.submit(self._risks)
+        try:
+            yield self.title() + self._section_start(0, risks)
+            next_index = 1
+            section_has_text = False
+            pending = ""
+            for text in self._narrative_stream():
+                pending += text
+                *lines, pending = pending.split("\n")
+                for line in lines:
+                    index = self._narrative_index(line)
+                    if index is not None and index >= next_index:
+                        # Sections the model skipped past, then this one's heading
+                        yield "\n" + "".join(
+                            self._section_start(i, risks, skipped=i < index) for i in range(next_index, index + 1)
+                        )
+                        next_index = index + 1
+                        section_has_text = False
+                    elif index is not None and index == next_index - 1 and not section_has_text:
+                        continue  # The heading of the section just opened
+                    else:
+                        section_has_text = section_has_text or bool(line.strip())
+                        yield _subheading(line) + "\n"
+            if pending:
+                yield _subheading(pending) + "\n"
+            yield "\n" + "".join(
+                self._section_start(i, risks, skipped=REPORT_SECTIONS[i][1] == "narrative" and i < len(REPORT_SECTIONS) - 1)
+                for i in range(next_index, len(REPORT_SECTIONS))
+            )
+        finally:
+            risks.cancel()
+            stage_stats["generating"].record(time.perf_counter() - start)
+
+    def render(self):
+        return "".join(self.stream())
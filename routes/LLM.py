@@ -1,10 +1,8 @@
 # routes/LLM.py
-from flask import Blueprint, request, jsonify
-import requests
-import openai
+from flask import Blueprint, Response, request, jsonify, session, stream_with_context
 import json
 import os
-import re
+import threading
 from dotenv import load_dotenv
 
 # Fix imports - use absolute path
@@ -13,128 +11,81 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.database_utils import DatabaseManager  # Changed from database_utils to database
+from utils.cache_utils import MISSING, NearDuplicateCache, ReportCache, content_hash
+from utils.http_utils import Deadline, all_breaker_stats, all_upstream_stats
+from utils.job_utils import JobQueue
+from models.conversation import ConversationMemory
+from models.report import HybridReport
+from models.LLM import (
+    FINAL_RESPONSE_ERROR_PREFIX, SUBQUERY_MODE, build_search_context, get_llm_response, llm_flight, local_subqueries,
+    report_subqueries, search_cache, stage_stats, stream_final_response, subquery_outcomes
+)
+from utils.hub_data import find_closest_hub, shared_hub_store
 
 load_dotenv()
 db_manager = DatabaseManager()
 llm_bp = Blueprint('llm_bp', __name__)
 
-# REMOVE all SQLAlchemy functions (save_chat_to_db, get_chat_history, etc.)
-# They conflict with DatabaseManager
+# How reports are written (REPORT_MODE):
+#   "hybrid" - tables, site factors, policies and the timeline are rendered
+#              locally; the LLM writes only the narrative and risk sections
+#   "llm"    - the LLM writes the whole report from build_report_prompt
+REPORT_MODE = os.environ.get('REPORT_MODE', 'hybrid').lower()
 
-# Your existing LLM functions here (searxng_search, get_openrouter_client, etc.)
-def searxng_search(query: str):
-    """
-    Performs a search using a local SearXNG instance.
-    """
-    url = "http://localhost:8080/search"
-    params = {"q": query, "format": "json"}
-    headers = {
-        "User-Agent": "Mozilla/5.0 (compatible; SearXNG-Client/1.0; +https://searxng.org)",
-        "Accept": "application/json"
-    }
-    try:
-        resp = requests.get(url, params=params, headers=headers, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        return data.get("results", [])
-    except requests.exceptions.RequestException as e:
-        print(f"[ERROR] Couldn't fetch results from SearXNG: {e}")
-        return []
-
-def get_openrouter_client():
-    """
-    Initializes and returns the OpenAI client configured for OpenRouter.
-    """
-    api_key = os.getenv("OPENROUTER_API_KEY")
-    if not api_key:
-        raise ValueError("API key not found. Please set the OPENROUTER_API_KEY environment variable.")
-    
-    return openai.OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key=api_key,
+# Generated reports are cached on a hash of the inputs that go into the prompt.
+# Bump REPORT_PROMPT_VERSION whenever the prompt template changes.
+REPORT_PROMPT_VERSION = "2"
+REPORT_INPUT_FIELDS = ('location', 'latitude', 'longitude', 'feasibility', 'recommended_technology', 'suitability_scores', 'regional_advantages')
+REPORT_CACHE_MAX_AGE_SECONDS = int(os.environ.get('REPORT_CACHE_MAX_AGE_SECONDS', 7 * 24 * 3600))
+report_cache = ReportCache(db_manager, f"{REPORT_PROMPT_VERSION}-{REPORT_MODE}", REPORT_CACHE_MAX_AGE_SECONDS)
+
+# Logged-in users may drop a single cached report; only these accounts may drop them all
+REPORT_CACHE_ADMIN_EMAILS = {
+    email.strip().lower() for email in os.environ.get('REPORT_CACHE_ADMIN_EMAILS', '').split(',') if email.strip()
+}
+
+# Answers to follow-up questions, reused for near-duplicate phrasings of a
+# question about the same report in the same session (character trigram
+# similarity >= threshold). Answers depend on the session's conversation, so
+# they are never shared between sessions.
+QUESTION_CACHE_THRESHOLD = float(os.environ.get('QUESTION_CACHE_THRESHOLD', 0.8))
+QUESTION_CACHE_TTL_SECONDS = float(os.environ.get('QUESTION_CACHE_TTL_SECONDS', 24 * 3600))
+QUESTION_CACHE_MAX_ENTRIES = int(os.environ.get('QUESTION_CACHE_MAX_ENTRIES', 2048))
+question_cache = NearDuplicateCache(QUESTION_CACHE_MAX_ENTRIES, QUESTION_CACHE_TTL_SECONDS, QUESTION_CACHE_THRESHOLD)
+
+def question_scope(report_data, session_id):
+    return content_hash(
+        {"session": session_id, "report": {field: report_data.get(field) for field in REPORT_INPUT_FIELDS}},
+        "question_context"
     )
 
-def generate_subqueries(user_input):
-    """
-    Uses the DeepSeek model via OpenRouter to generate search subqueries.
-    """
-    client = get_openrouter_client()
-    prompt = f"Based on the following user query, generate a list of 3-5 concise search queries to find relevant information. Respond with a JSON array of strings only. User query: {user_input}"
-    try:
-        response = client.chat.completions.create(
-            model="deepseek/deepseek-r1-0528:free",
-            messages=[{"role": "user", "content": prompt}],
-        )
-        subqueries_json = response.choices[0].message.content
-        # Extract the JSON array from the response, as the model may add extra text
-        match = re.search(r'\[.*?\]', subqueries_json, re.DOTALL)
-        if match:
-            subqueries = json.loads(match.group(0))
-            return subqueries
-        return [user_input]  # Fallback to original input if JSON is not found
-    except Exception as e:
-        print(f"[ERROR] Failed to generate subqueries with OpenRouter: {e}")
-        return [user_input]
+def cached_answer(data, report_data, question):
+    """A cached answer to a near-duplicate question about the same report and session, or None"""
+    if data.get('refresh'):
+        return None
+    answer = question_cache.get(question_scope(report_data, data.get('session_id')), question)
+    return None if answer is MISSING else answer
 
-def generate_final_response(user_input, search_results_text, chat_history):
-    """
-    Generates the final, framed response based on user input and search results.
-    """
-    client = get_openrouter_client()
-    history_prompt = " ".join([f"{msg['role']}: {msg['content']}" for msg in chat_history])
-    prompt = f"You are a helpful assistant. You have access to the following search results:\n\n{search_results_text}\n\nBased on this information and the following conversation history, answer the user's latest query. Conversation History: {history_prompt}\nUser's latest query: {user_input}"
-    
-    try:
-        response = client.chat.completions.create(
-            model="deepseek/deepseek-r1-0528:free",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Oops, I ran into a problem generating the final response: {e}"
+def cache_answer(data, report_data, question, answer, degraded):
+    if not degraded and not answer.startswith(FINAL_RESPONSE_ERROR_PREFIX):
+        question_cache.set(question_scope(report_data, data.get('session_id')), question, answer)
 
-def get_llm_response(messages, websearch_enabled=False):
-    """
-    Orchestrates the RAG process with SearXNG and DeepSeek.
-    """
-    try:
-        user_input = messages[-1]['content']
-        search_results_text = ""
-        
-        if websearch_enabled:
-            # Step 1: Generate subqueries from user input
-            subqueries = generate_subqueries(user_input)
-            
-            # Step 2: Perform search for each subquery
-            all_results = []
-            for query in subqueries:
-                results = searxng_search(query)
-                all_results.extend(results)
-            
-            # Step 3: Format search results for the LLM
-            search_results_text = "Search Results:\n\n"
-            if not all_results:
-                search_results_text = "No relevant search results were found."
-            else:
-                for i, result in enumerate(all_results[:5]): # Limit to top 5 results
-                    search_results_text += f"Result {i+1}: Title: {result.get('title', '')}\nURL: {result.get('url', '')}\nContent: {result.get('content', '')[:200]}...\n\n"
-        
-        # Step 4: Generate final response based on history and search results
-        response_content = generate_final_response(user_input, search_results_text, messages)
-        
-        return {"status": "success", "response": response_content}
+# Latency ceilings per endpoint. Stages that would overrun are skipped or cut
+# short, and responses list them under "degraded"; degraded reports are not cached.
+REPORT_DEADLINE_SECONDS = float(os.environ.get('REPORT_DEADLINE_SECONDS', 120))
+QUESTION_DEADLINE_SECONDS = float(os.environ.get('QUESTION_DEADLINE_SECONDS', 60))
 
-    except Exception as e:
-        return {"error": f"An unexpected error occurred: {str(e)}"}
+def report_cache_key(report_data):
+    return report_cache.key({field: report_data.get(field) for field in REPORT_INPUT_FIELDS})
 
-# Blueprint routes
-@llm_bp.route('/generate-report', methods=['POST'])
-def generate_report():
-    try:
-        report_data = request.json
-        
-        # Format the prompt for the LLM
-        prompt = f"""Generate a comprehensive green hydrogen production feasibility report based on the following analysis:
+# REMOVE all SQLAlchemy functions (save_chat_to_db, get_chat_history, etc.)
+# They conflict with DatabaseManager
+
+# The RAG pipeline (searxng_search, get_openrouter_client, etc.) lives in models/LLM.py
+
+def build_report_prompt(report_data):
+    """Format the report prompt for the LLM"""
+    return f"""Generate a comprehensive green hydrogen production feasibility report based on the following analysis:
 
 Location: {report_data['location']}
 Overall Feasibility: {report_data['feasibility']}
@@ -159,48 +110,316 @@ Please provide a detailed analysis including:
 8. Specific recommendations for this location
 
 Format the response using markdown with clear section headings."""
+
+def build_question_context(report_data, question):
+    """Create context from the report data"""
+    return f"""
+        Based on the previous hydrogen production feasibility analysis for {report_data.get('location', 'this location')}:
+        - Overall Feasibility: {report_data.get('feasibility', 'N/A')}
+        - Recommended Technology: {report_data.get('recommended_technology', 'N/A')}
+        - Regional Advantages: {', '.join(report_data.get('regional_advantages', []))}
         
+        Please answer the following question: {question}
+        """
+
+def report_site(report_data):
+    """(name, record, distance_km) of the hub nearest the report's coordinates, if they were sent"""
+    try:
+        return find_closest_hub(float(report_data['latitude']), float(report_data['longitude']))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def report_state(report_data):
+    site = report_site(report_data)
+    return site[1]['state'] if site else None
+
+def hybrid_report(report_data, deadline, on_stage=lambda stage: None):
+    """HybridReport for the request, with the shared search context already gathered"""
+    site = report_site(report_data)
+    state = site[1]['state'] if site else None
+    search_results_text = build_search_context(
+        build_report_prompt(report_data),
+        on_stage,
+        local_queries=report_subqueries(report_data, state),
+        deadline=deadline,
+        query=report_query(report_data, state)
+    )
+    on_stage('generating')
+    return HybridReport(report_data, search_results_text, site, shared_hub_store().current().policies.get(state), deadline)
+
+def report_query(report_data, state=None):
+    """The report's key fields as a short query, for reranking its search results"""
+    technology = " ".join(str(report_data.get('recommended_technology') or 'electrolysis').split())
+    return f"{technology} green hydrogen production {state or 'India'} cost infrastructure water environmental impact policy"
+
+def report_search_queries(report_data):
+    """Search queries for a report, built from its inputs instead of by the LLM"""
+    return report_subqueries(report_data, report_state(report_data))
+
+def question_search_queries(report_data, question):
+    """
+    Search queries for a follow-up question: its key phrases in the report's
+    context. Only used in "local" mode; in "hybrid" mode free-form questions
+    go through the LLM subqueries like any other query.
+    """
+    if SUBQUERY_MODE != "local":
+        return None
+    return local_subqueries(question, max_queries=3, context=f"green hydrogen {report_state(report_data) or 'India'}")
+
+def save_report_session(report_data, prompt, report):
+    """Save the report session, prompt and report; returns the session id"""
+    # Convert feasibility score to float
+    feasibility_score = None
+    if 'feasibility' in report_data:
+        try:
+            feasibility_score = float(report_data['feasibility'].replace('%', '').strip())
+        except (ValueError, AttributeError):
+            pass
+    
+    # Save to database using DatabaseManager
+    session_id = db_manager.save_chat_session({
+        'location': report_data.get('location', 'Unknown Location'),
+        'latitude': report_data.get('latitude'),
+        'longitude': report_data.get('longitude'),
+        'feasibility': feasibility_score,
+        'recommended_technology': report_data.get('recommended_technology'),
+        'session_id': report_data.get('session_id')
+    })
+    
+    if session_id:
+        # Save the prompt and response
+        db_manager.save_chat_message(session_id, 'user', prompt[:4000])
+        db_manager.save_chat_message(session_id, 'assistant', report[:4000], is_report=True)
+    return session_id
+
+def sse_event(event, data):
+    """Format one Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events):
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def stream_shared(key, produce, label=None):
+    """
+    Yields SSE events from `produce`, a generator of (event, data) pairs that
+    returns the degraded stages. Concurrent streams with the same key share
+    one run, whose deadline is the first caller's. Returns (text, degraded),
+    where text joins the 'token' events.
+    """
+    parts = []
+    events = llm_flight.stream(key, produce, label=label)
+    while True:
+        try:
+            event, data = next(events)
+        except StopIteration as stop:
+            return ''.join(parts), stop.value
+        if event == 'token':
+            parts.append(data['text'])
+        yield sse_event(event, data)
+
+def _answer_events(prompt, deadline, history, summary, local_queries, query):
+    yield 'status', {'stage': 'searching'}
+    search_results_text = build_search_context(prompt, local_queries=local_queries, deadline=deadline, query=query)
+    yield 'status', {'stage': 'generating'}
+    for text in stream_final_response(prompt, search_results_text, history, summary, deadline):
+        yield 'token', {'text': text}
+    return list(deadline.degraded)
+
+def stream_answer(prompt, deadline, history=(), summary=None, local_queries=None, query=None):
+    """
+    Yields SSE events for the RAG pipeline: a 'status' event per stage, then
+    one 'token' event per completion chunk. Returns (text, degraded stages).
+    `query` is the user's own query inside the prompt (see build_search_context).
+    """
+    history = list(history)
+    key = content_hash({'prompt': prompt, 'history': history, 'summary': summary, 'queries': local_queries, 'query': query}, 'llm_stream')
+    return (yield from stream_shared(
+        key, lambda: _answer_events(prompt, deadline, history, summary, local_queries, query), label=prompt
+    ))
+
+def _report_events(report_data, deadline):
+    yield 'status', {'stage': 'searching'}
+    report_parts = hybrid_report(report_data, deadline)
+    yield 'status', {'stage': 'generating'}
+    for text in report_parts.stream():
+        yield 'token', {'text': text}
+    return list(deadline.degraded)
+
+def produce_report(report_data, on_stage=lambda stage: None):
+    """
+    Returns (prompt, report, cached, degraded), where degraded lists the
+    stages cut short by REPORT_DEADLINE_SECONDS. Raises RuntimeError if the
+    pipeline fails.
+    """
+    prompt = build_report_prompt(report_data)
+    
+    # Reuse a recent report for identical inputs unless the client asks for a refresh
+    cache_key = report_cache_key(report_data)
+    report = None if report_data.get('refresh') else report_cache.get(cache_key)
+    if report is not None:
+        return prompt, report, True, []
+    
+    deadline = Deadline(REPORT_DEADLINE_SECONDS)
+    if REPORT_MODE == 'hybrid':
+        def render():
+            report_parts = hybrid_report(report_data, deadline, on_stage)
+            return report_parts.render(), list(deadline.degraded)
+        
+        # Concurrent requests for the same inputs share one generation
+        try:
+            report, degraded = llm_flight.do(cache_key, render, label=report_data.get('location'))
+        except Exception as e:
+            raise RuntimeError(f"Report generation failed: {e}")
+    else:
         # Use your existing LLM function to generate the report
         llm_response = get_llm_response(
             [{"role": "user", "content": prompt}],
-            websearch_enabled=True
+            websearch_enabled=True,
+            on_stage=on_stage,
+            local_queries=report_search_queries(report_data),
+            deadline=deadline,
+            query=report_query(report_data, report_state(report_data))
         )
         
         if 'error' in llm_response:
-            return jsonify({'status': 'error', 'error': llm_response['error']})
+            raise RuntimeError(llm_response['error'])
         
-        # Convert feasibility score to float
-        feasibility_score = None
-        if 'feasibility' in report_data:
-            try:
-                feasibility_score = float(report_data['feasibility'].replace('%', '').strip())
-            except (ValueError, AttributeError):
-                pass
+        report = llm_response.get('response', 'No report generated')
+        degraded = llm_response.get('degraded', [])
+    
+    if not degraded and not report.startswith(FINAL_RESPONSE_ERROR_PREFIX):
+        report_cache.set(cache_key, report_data.get('location'), report)
+    return prompt, report, False, degraded
+
+def run_report_job(report_data, progress):
+    """JobQueue handler for queued report requests"""
+    prompt, report, cached, degraded = produce_report(report_data, on_stage=progress)
+    progress('saving')
+    return {'report': report, 'session_id': save_report_session(report_data, prompt, report)}
+
+# Report jobs run on a bounded pool instead of holding a request worker
+REPORT_JOB_WORKERS = int(os.environ.get('REPORT_JOB_WORKERS', 4))
+REPORT_JOB_STALE_SECONDS = int(os.environ.get('REPORT_JOB_STALE_SECONDS', 300))
+report_jobs = JobQueue(db_manager, run_report_job, REPORT_JOB_WORKERS, REPORT_JOB_STALE_SECONDS)
+
+@llm_bp.record_once
+def resume_report_jobs(state):
+    # Pick up jobs interrupted by a restart without delaying startup
+    threading.Thread(target=report_jobs.resume, daemon=True).start()
+
+# Follow-up questions see the recent turns of their session plus a rolling summary
+conversation_memory = ConversationMemory(db_manager)
+
+# Blueprint routes
+@llm_bp.route('/generate-report', methods=['POST'])
+def generate_report():
+    try:
+        report_data = request.json
         
-        # Save to database using DatabaseManager
-        session_id = db_manager.save_chat_session({
-            'location': report_data.get('location', 'Unknown Location'),
-            'latitude': report_data.get('latitude'),
-            'longitude': report_data.get('longitude'),
-            'feasibility': feasibility_score,
-            'recommended_technology': report_data.get('recommended_technology'),
-            'session_id': report_data.get('session_id')
-        })
+        try:
+            prompt, report, cached, degraded = produce_report(report_data)
+        except RuntimeError as e:
+            return jsonify({'status': 'error', 'error': str(e)})
         
-        if session_id:
-            # Save the prompt and response
-            db_manager.save_chat_message(session_id, 'user', prompt[:4000])
-            db_manager.save_chat_message(session_id, 'assistant', llm_response.get('response', '')[:4000], is_report=True)
+        session_id = save_report_session(report_data, prompt, report)
         
         return jsonify({
             'status': 'success', 
-            'report': llm_response.get('response', 'No report generated'),
-            'session_id': session_id
+            'report': report,
+            'session_id': session_id,
+            'cached': cached,
+            'degraded': degraded
         })
         
     except Exception as e:
         return jsonify({'status': 'error', 'error': str(e)})
 
+@llm_bp.route('/generate-report/stream', methods=['POST'])
+def generate_report_stream():
+    """
+    Streaming variant of /generate-report over Server-Sent Events. Emits
+    'status' and 'token' events while the report is produced, then 'done'
+    with the session id once it has been saved, or 'error'.
+    """
+    report_data = request.json
+    deadline = Deadline(REPORT_DEADLINE_SECONDS)
+    
+    def events():
+        try:
+            prompt = build_report_prompt(report_data)
+            cache_key = report_cache_key(report_data)
+            report = None if report_data.get('refresh') else report_cache.get(cache_key)
+            cached = report is not None
+            
+            degraded = []
+            if cached:
+                yield sse_event('token', {'text': report})
+            elif REPORT_MODE == 'hybrid':
+                # Concurrent streams for the same inputs share one generation
+                report, degraded = yield from stream_shared(
+                    f"{cache_key}:stream", lambda: _report_events(report_data, deadline), label=report_data.get('location')
+                )
+            else:
+                report, degraded = yield from stream_answer(
+                    prompt, deadline, local_queries=report_search_queries(report_data),
+                    query=report_query(report_data, report_state(report_data))
+                )
+            
+            if not cached and not degraded:
+                report_cache.set(cache_key, report_data.get('location'), report)
+            session_id = save_report_session(report_data, prompt, report)
+            yield sse_event('done', {'session_id': session_id, 'cached': cached, 'degraded': degraded})
+            
+        except Exception as e:
+            yield sse_event('error', {'error': str(e)})
+    
+    return sse_response(events())
+
+@llm_bp.route('/report-jobs', methods=['POST'])
+def submit_report_job():
+    """
+    Queue a report and return its job id at once. Identical requests already
+    queued or running share the existing job.
+    """
+    try:
+        report_data = request.json
+        build_report_prompt(report_data)  # reject malformed input before queueing
+        dedupe_key = content_hash({
+            'report': report_cache_key(report_data),
+            'session_id': report_data.get('session_id'),
+            'refresh': bool(report_data.get('refresh'))
+        }, 'job')
+        job_id, deduplicated = report_jobs.submit(report_data, dedupe_key)
+        return jsonify({'status': 'success', 'job_id': job_id, 'deduplicated': deduplicated}), 202
+        
+    except Exception as e:
+        return jsonify({'status': 'error', 'error': str(e)})
+
+@llm_bp.route('/report-jobs/<job_id>', methods=['GET'])
+def report_job_status(job_id):
+    """Job status with the current stage and per-stage timings"""
+    job = report_jobs.status(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'error': 'Job not found'}), 404
+    job.pop('report')
+    return jsonify(job)
+
+@llm_bp.route('/report-jobs/<job_id>/result', methods=['GET'])
+def report_job_result(job_id):
+    """The finished report; 202 while the job is still queued or running"""
+    job = report_jobs.status(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'error': 'Job not found'}), 404
+    if job['status'] == 'failed':
+        return jsonify({'status': 'error', 'error': job['error']})
+    if job['status'] != 'done':
+        return jsonify({'status': job['status'], 'stage': job['stage']}), 202
+    return jsonify({'status': 'success', 'report': job['report'], 'session_id': job['session_id']})
+
 @llm_bp.route('/ask-question', methods=['POST'])
 def ask_question():
     try:
@@ -209,39 +428,138 @@ def ask_question():
         report_data = data.get('report_data', {})
         session_id = data.get('session_id')
         
-        # Create context from the report data
-        context = f"""
-        Based on the previous hydrogen production feasibility analysis for {report_data.get('location', 'this location')}:
-        - Overall Feasibility: {report_data.get('feasibility', 'N/A')}
-        - Recommended Technology: {report_data.get('recommended_technology', 'N/A')}
-        - Regional Advantages: {', '.join(report_data.get('regional_advantages', []))}
-        
-        Please answer the following question: {question}
-        """
-        
-        # Use your existing LLM function
-        llm_response = get_llm_response(
-            [{"role": "user", "content": context}],
-            websearch_enabled=True
-        )
-        
-        if 'error' in llm_response:
-            return jsonify({'status': 'error', 'error': llm_response['error']})
+        answer = cached_answer(data, report_data, question)
+        cached = answer is not None
+        degraded = []
+        if not cached:
+            deadline = Deadline(QUESTION_DEADLINE_SECONDS)
+            context = build_question_context(report_data, question)
+            summary, history = conversation_memory.context(session_id, deadline)
+            
+            # Use your existing LLM function
+            llm_response = get_llm_response(
+                history + [{"role": "user", "content": context}],
+                websearch_enabled=True,
+                summary=summary,
+                local_queries=question_search_queries(report_data, question),
+                deadline=deadline,
+                query=question
+            )
+            
+            if 'error' in llm_response:
+                return jsonify({'status': 'error', 'error': llm_response['error']})
+            
+            answer = llm_response.get('response', 'No answer generated')
+            degraded = llm_response.get('degraded', [])
+            cache_answer(data, report_data, question, answer, degraded)
         
         # Save to database if we have a session_id
         if session_id:
             db_manager.save_chat_message(session_id, 'user', question[:4000])
-            db_manager.save_chat_message(session_id, 'assistant', llm_response.get('response', '')[:4000])
+            db_manager.save_chat_message(session_id, 'assistant', answer[:4000])
         
         return jsonify({
             'status': 'success', 
-            'answer': llm_response.get('response', 'No answer generated'),
-            'session_id': session_id
+            'answer': answer,
+            'session_id': session_id,
+            'cached': cached,
+            'degraded': degraded
         })
         
     except Exception as e:
         return jsonify({'status': 'error', 'error': str(e)})
 
+@llm_bp.route('/ask-question/stream', methods=['POST'])
+def ask_question_stream():
+    """Streaming variant of /ask-question; same events as /generate-report/stream"""
+    data = request.json
+    deadline = Deadline(QUESTION_DEADLINE_SECONDS)
+    
+    def events():
+        try:
+            question = data['question']
+            session_id = data.get('session_id')
+            report_data = data.get('report_data', {})
+            answer = cached_answer(data, report_data, question)
+            cached = answer is not None
+            
+            degraded = []
+            if cached:
+                yield sse_event('token', {'text': answer})
+            else:
+                context = build_question_context(report_data, question)
+                summary, history = conversation_memory.context(session_id, deadline)
+                answer, degraded = yield from stream_answer(
+                    context, deadline, history, summary, question_search_queries(report_data, question), query=question
+                )
+                cache_answer(data, report_data, question, answer, degraded)
+            
+            # Save to database if we have a session_id
+            if session_id:
+                db_manager.save_chat_message(session_id, 'user', question[:4000])
+                db_manager.save_chat_message(session_id, 'assistant', answer[:4000])
+            yield sse_event('done', {'session_id': session_id, 'cached': cached, 'degraded': degraded})
+            
+        except Exception as e:
+            yield sse_event('error', {'error': str(e)})
+    
+    return sse_response(events())
+
+@llm_bp.route('/health', methods=['GET'])
+def health_check():
+    """
+    Per-upstream request counts, retries, latency percentiles and circuit
+    breaker state, plus per-stage pipeline timings. Status is "degraded"
+    while any breaker is not closed.
+    """
+    breakers = all_breaker_stats()
+    degraded = any(breaker['state'] != 'closed' for breaker in breakers.values())
+    return jsonify({
+        "status": "degraded" if degraded else "ok",
+        "message": "LLM blueprint is working",
+        "upstreams": all_upstream_stats(),
+        "breakers": breakers,
+        "stages": {name: stats.stats() for name, stats in stage_stats.items()},
+        "subqueries": subquery_outcomes
+    })
+
+@llm_bp.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters for the LLM pipeline caches and request coalescing"""
+    return jsonify({
+        'search': search_cache.stats(),
+        'report': report_cache.stats(),
+        'questions': question_cache.stats(),
+        'singleFlight': llm_flight.stats()
+    })
+
+@llm_bp.route('/report-cache/invalidate', methods=['POST'])
+def invalidate_report_cache():
+    """
+    Drop cached reports: the one for `cache_key` or `report_data`, or all of
+    them with {"all": true} (REPORT_CACHE_ADMIN_EMAILS accounts only).
+    Requires a logged-in session.
+    """
+    if not session.get('logged_in'):
+        return jsonify({'status': 'error', 'error': 'Login required'}), 401
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'status': 'error', 'error': 'Expected a JSON body with cache_key, report_data or all'}), 400
+        cache_key = data.get('cache_key')
+        if not cache_key and data.get('report_data'):
+            cache_key = report_cache_key(data['report_data'])
+        if not cache_key:
+            if data.get('all') is not True:
+                return jsonify({'status': 'error', 'error': 'Give cache_key or report_data, or {"all": true} to drop every report'}), 400
+            if (session.get('user_email') or '').lower() not in REPORT_CACHE_ADMIN_EMAILS:
+                return jsonify({'status': 'error', 'error': 'Only administrators can drop every cached report'}), 403
+        invalidated = report_cache.invalidate(cache_key)
+        return jsonify({'status': 'success', 'invalidated': invalidated})
+        
+    except Exception as e:
+        return jsonify({'status': 'error', 'error': str(e)})
+
 # REMOVE all SQLAlchemy-based functions below this line
 # Remove: get_recent_chat_history, format_recent_messages, summarize_conversation
 # These functions use ChatMessage.query which conflicts with DatabaseManager
@@ -259,43 +577,4 @@ def get_recent_chat_history(session_id, max_messages=6):
             
     except Exception as e:
         print(f"Error getting optimized chat history: {e}")
-        return []
-
-def summarize_conversation(session_id):
-    """Create a summary of long conversations using DatabaseManager"""
-    try:
-        # Get all messages for this session using DatabaseManager
-        messages = db_manager.get_chat_messages(session_id)
-        
-        if len(messages) <= 10:  # No need to summarize short conversations
-            return None
-            
-        # Prepare conversation for summarization
-        conversation_text = "\n".join([
-            f"{msg['role'].capitalize()}: {msg['content'][:200]}"
-            for msg in messages
-        ])
-        
-        summary_prompt = f"""
-        Summarize this conversation about hydrogen production feasibility analysis.
-        Focus on key decisions, questions asked, and recommendations made.
-        Keep the summary under 200 words.
-        
-        Conversation:
-        {conversation_text[:4000]}  # Limit input length
-        """
-        
-        # Get summary from LLM
-        summary_response = get_llm_response(
-            [{"role": "user", "content": summary_prompt}],
-            websearch_enabled=False
-        )
-        
-        if 'error' not in summary_response:
-            return summary_response.get('response', '')
-        
-        return None
-        
-    except Exception as e:
-        print(f"Error summarizing conversation: {e}")
-        return None
\ No newline at end of file
+        return []
\ No newline at end of file
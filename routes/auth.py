@@ -3,6 +3,7 @@ import requests
 from flask import Blueprint, request, redirect, url_for, session, flash, current_app
 from dotenv import load_dotenv
 from __init__ import mysql
+from utils.http_utils import UpstreamSession
 
 load_dotenv()
 
@@ -12,6 +13,9 @@ GOOGLE_CLIENT_ID = os.environ.get("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.environ.get("GOOGLE_CLIENT_SECRET")
 GOOGLE_REDIRECT_URI = 'http://127.0.0.1:5000/auth/google/callback'
 
+# Keep-alive pool for the token and userinfo calls
+google_http = UpstreamSession('google_oauth', timeout=(3.05, float(os.environ.get('GOOGLE_OAUTH_TIMEOUT', 10))))
+
 @auth_bp.route('/google/callback')
 def google_callback():
     if session.get('logged_in'):
@@ -31,7 +35,9 @@ def google_callback():
             'redirect_uri': GOOGLE_REDIRECT_URI,
             'grant_type': 'authorization_code',
         }
-        token_response = requests.post(token_url, data=token_data)
+        # Authorization codes are single-use: a retry after Google processed the
+        # first attempt would fail with invalid_grant, so the exchange is not retried
+        token_response = google_http.post(token_url, data=token_data, retries=0)
         token_response.raise_for_status()
         token_json = token_response.json()
         access_token = token_json.get('access_token')
@@ -42,7 +48,7 @@ def google_callback():
 
         userinfo_url = 'https://www.googleapis.com/oauth2/v2/userinfo'
         userinfo_headers = {'Authorization': f'Bearer {access_token}'}
-        userinfo_response = requests.get(userinfo_url, headers=userinfo_headers)
+        userinfo_response = google_http.get(userinfo_url, headers=userinfo_headers)
         userinfo_response.raise_for_status()
         user_info = userinfo_response.json()
 
@@ -1,7 +1,18 @@
 # routes/map.py
-from flask import Blueprint, render_template, session, redirect, url_for, request, jsonify
+from flask import Blueprint, render_template, session, redirect, url_for, request, jsonify, Response, stream_with_context, send_file
+import base64
+import csv
+import hashlib
+import io
+import json
 import math
-import random
+import os
+from functools import lru_cache
+import numpy as np
+from utils.projection_utils import ProjectionEngine, PROJECTION_YEARS
+from utils.hub_data import shared_hub_store
+from utils.scoring_utils import TECHNOLOGIES
+from utils.tile_utils import DEFAULT_TILE_CACHE_DIR, TileCache
 
 map_bp = Blueprint('map_bp', __name__)
 
@@ -17,265 +28,448 @@ def map():
 def health_check():
     return jsonify({"status": "ok", "message": "Map blueprint is working"})
 
-# State-level policy advantages
-STATE_POLICIES = {
-    "Gujarat": [
-        "Pioneering Renewable Energy Policy 2023 with strong incentives.",
-        "Excellent port infrastructure for green hydrogen export.",
-        "Land subsidies up to 50% for new renewable energy projects."
-    ],
-    "Maharashtra": [
-        "High industrial demand from major economic hubs like Mumbai and Pune.",
-        "Draft Green Hydrogen policy aims for 1.5 MMTPA production.",
-        "Strong focus on developing hydrogen for the transportation sector."
-    ],
-    "Uttar Pradesh": [
-        "Strategic location with access to large agricultural and industrial markets.",
-        "Government focus on bundling green hydrogen with solar energy projects.",
-        "Incentives for developing green ammonia and fertilizer plants."
-    ],
-    "Tamil Nadu": [
-        "Exceptional wind energy potential, especially along coastal regions.",
-        "Major port at Thoothukudi designated as a green hydrogen hub.",
-        "State policy provides single-window clearance for green energy projects."
-    ],
-    "Odisha": [
-        "Rich in mineral resources with major steel and aluminum industries (high demand).",
-        "Strategic port locations at Paradip and Dhamra for export.",
-        "Government promoting Green Hydrogen/Ammonia parks with dedicated infrastructure."
-    ]
-}
+# Hub table and state policies, memory-mapped from the columnar hub store
+# (built from data/hubs.csv by utils/hub_data.py) and hot-reloaded when a new
+# version is published. Each request works on one dataset snapshot.
+hub_store = shared_hub_store()
+hub_store.current()
 
-# City-level "Hubs" with updated scores including transport logistics
-# Renamed keys for clarity: 'grid' -> 'infrastructure', 'demand' -> 'demand_center'
-HUBS = {
-    # --- Gujarat (20 cities) ---
-    'Ahmedabad': {'lat': 23.0225, 'lon': 72.5714, 'state': 'Gujarat', 'solar': 8, 'wind': 4, 'gas': 7, 'water': 5, 'infrastructure': 9, 'demand_center': 9, 'transport_logistics': 8},
-    'Kutch': {'lat': 23.7337, 'lon': 69.8597, 'state': 'Gujarat', 'solar': 10, 'wind': 9, 'gas': 5, 'water': 7, 'infrastructure': 6, 'demand_center': 5, 'transport_logistics': 9},
-    'Jamnagar': {'lat': 22.4707, 'lon': 70.0577, 'state': 'Gujarat', 'solar': 8, 'wind': 8, 'gas': 8, 'water': 8, 'infrastructure': 8, 'demand_center': 8, 'transport_logistics': 10},
-    'Surat': {'lat': 21.1702, 'lon': 72.8311, 'state': 'Gujarat', 'solar': 7, 'wind': 6, 'gas': 9, 'water': 9, 'infrastructure': 9, 'demand_center': 9, 'transport_logistics': 9},
-    'Vadodara': {'lat': 22.3072, 'lon': 73.1812, 'state': 'Gujarat', 'solar': 8, 'wind': 5, 'gas': 8, 'water': 6, 'infrastructure': 9, 'demand_center': 8, 'transport_logistics': 7},
-    'Rajkot': {'lat': 22.3039, 'lon': 70.8022, 'state': 'Gujarat', 'solar': 9, 'wind': 6, 'gas': 6, 'water': 4, 'infrastructure': 7, 'demand_center': 7, 'transport_logistics': 6},
-    'Bhavnagar': {'lat': 21.7645, 'lon': 72.1519, 'state': 'Gujarat', 'solar': 8, 'wind': 7, 'gas': 6, 'water': 8, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 8},
-    'Kandla': {'lat': 23.03, 'lon': 70.22, 'state': 'Gujarat', 'solar': 8, 'wind': 9, 'gas': 7, 'water': 9, 'infrastructure': 8, 'demand_center': 6, 'transport_logistics': 10},
-    'Porbandar': {'lat': 21.6418, 'lon': 69.6293, 'state': 'Gujarat', 'solar': 8, 'wind': 9, 'gas': 5, 'water': 9, 'infrastructure': 6, 'demand_center': 5, 'transport_logistics': 9},
-    'Anand': {'lat': 22.5645, 'lon': 72.9649, 'state': 'Gujarat', 'solar': 8, 'wind': 4, 'gas': 6, 'water': 6, 'infrastructure': 8, 'demand_center': 7, 'transport_logistics': 6},
-    'Mehsana': {'lat': 23.5880, 'lon': 72.3693, 'state': 'Gujarat', 'solar': 9, 'wind': 5, 'gas': 7, 'water': 4, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 5},
-    'Gandhinagar': {'lat': 23.2156, 'lon': 72.6369, 'state': 'Gujarat', 'solar': 8, 'wind': 4, 'gas': 7, 'water': 5, 'infrastructure': 9, 'demand_center': 7, 'transport_logistics': 7},
-    'Bharuch': {'lat': 21.7051, 'lon': 72.9959, 'state': 'Gujarat', 'solar': 7, 'wind': 6, 'gas': 9, 'water': 8, 'infrastructure': 8, 'demand_center': 7, 'transport_logistics': 8},
-    'Patan': {'lat': 23.8493, 'lon': 72.1266, 'state': 'Gujarat', 'solar': 9, 'wind': 5, 'gas': 5, 'water': 4, 'infrastructure': 6, 'demand_center': 4, 'transport_logistics': 5},
-    'Valsad': {'lat': 20.6333, 'lon': 72.9333, 'state': 'Gujarat', 'solar': 7, 'wind': 7, 'gas': 8, 'water': 9, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 8},
-    'Vapi': {'lat': 20.3872, 'lon': 72.9095, 'state': 'Gujarat', 'solar': 7, 'wind': 6, 'gas': 9, 'water': 8, 'infrastructure': 9, 'demand_center': 8, 'transport_logistics': 8},
-    'Mundra': {'lat': 22.75, 'lon': 69.7, 'state': 'Gujarat', 'solar': 9, 'wind': 9, 'gas': 6, 'water': 9, 'infrastructure': 8, 'demand_center': 6, 'transport_logistics': 10},
-    'Gandhidham': {'lat': 23.0833, 'lon': 70.1333, 'state': 'Gujarat', 'solar': 8, 'wind': 9, 'gas': 7, 'water': 8, 'infrastructure': 8, 'demand_center': 7, 'transport_logistics': 10},
-    'Nadiad': {'lat': 22.6971, 'lon': 72.8628, 'state': 'Gujarat', 'solar': 8, 'wind': 4, 'gas': 6, 'water': 5, 'infrastructure': 8, 'demand_center': 7, 'transport_logistics': 7},
-    'Morbi': {'lat': 22.8167, 'lon': 70.8333, 'state': 'Gujarat', 'solar': 9, 'wind': 7, 'gas': 6, 'water': 5, 'infrastructure': 7, 'demand_center': 7, 'transport_logistics': 6},
-
-    # --- Maharashtra (20 cities) ---
-    'Mumbai': {'lat': 19.0760, 'lon': 72.8777, 'state': 'Maharashtra', 'solar': 6, 'wind': 7, 'gas': 9, 'water': 9, 'infrastructure': 10, 'demand_center': 10, 'transport_logistics': 10},
-    'Pune': {'lat': 18.5204, 'lon': 73.8567, 'state': 'Maharashtra', 'solar': 7, 'wind': 5, 'gas': 8, 'water': 5, 'infrastructure': 9, 'demand_center': 9, 'transport_logistics': 8},
-    'Nagpur': {'lat': 21.1458, 'lon': 79.0882, 'state': 'Maharashtra', 'solar': 8, 'wind': 4, 'gas': 6, 'water': 4, 'infrastructure': 7, 'demand_center': 7, 'transport_logistics': 8},
-    'Nashik': {'lat': 19.9975, 'lon': 73.7898, 'state': 'Maharashtra', 'solar': 7, 'wind': 6, 'gas': 7, 'water': 6, 'infrastructure': 8, 'demand_center': 7, 'transport_logistics': 7},
-    'Aurangabad': {'lat': 19.8762, 'lon': 75.3433, 'state': 'Maharashtra', 'solar': 8, 'wind': 5, 'gas': 6, 'water': 4, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 6},
-    'Solapur': {'lat': 17.6599, 'lon': 75.9064, 'state': 'Maharashtra', 'solar': 8, 'wind': 6, 'gas': 5, 'water': 3, 'infrastructure': 6, 'demand_center': 5, 'transport_logistics': 6},
-    'Amravati': {'lat': 20.9374, 'lon': 77.7796, 'state': 'Maharashtra', 'solar': 8, 'wind': 4, 'gas': 5, 'water': 4, 'infrastructure': 6, 'demand_center': 5, 'transport_logistics': 5},
-    'Ratnagiri': {'lat': 16.9944, 'lon': 73.3002, 'state': 'Maharashtra', 'solar': 6, 'wind': 8, 'gas': 6, 'water': 9, 'infrastructure': 7, 'demand_center': 5, 'transport_logistics': 9},
-    'Kolhapur': {'lat': 16.7050, 'lon': 74.2433, 'state': 'Maharashtra', 'solar': 7, 'wind': 6, 'gas': 5, 'water': 6, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 7},
-    'Raigad': {'lat': 18.35, 'lon': 73.18, 'state': 'Maharashtra', 'solar': 6, 'wind': 8, 'gas': 8, 'water': 9, 'infrastructure': 8, 'demand_center': 7, 'transport_logistics': 9},
-    'Thane': {'lat': 19.2183, 'lon': 72.9781, 'state': 'Maharashtra', 'solar': 6, 'wind': 7, 'gas': 9, 'water': 9, 'infrastructure': 9, 'demand_center': 9, 'transport_logistics': 9},
-    'Jalgaon': {'lat': 21.0077, 'lon': 75.5626, 'state': 'Maharashtra', 'solar': 8, 'wind': 4, 'gas': 6, 'water': 5, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 6},
-    'Satara': {'lat': 17.6805, 'lon': 74.0183, 'state': 'Maharashtra', 'solar': 7, 'wind': 6, 'gas': 5, 'water': 6, 'infrastructure': 6, 'demand_center': 5, 'transport_logistics': 7},
-    'Latur': {'lat': 18.4088, 'lon': 76.5604, 'state': 'Maharashtra', 'solar': 8, 'wind': 5, 'gas': 4, 'water': 3, 'infrastructure': 6, 'demand_center': 5, 'transport_logistics': 5},
-    'Chandrapur': {'lat': 19.9615, 'lon': 79.2961, 'state': 'Maharashtra', 'solar': 8, 'wind': 4, 'gas': 7, 'water': 5, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 6},
-    'Navi Mumbai': {'lat': 19.0330, 'lon': 73.0297, 'state': 'Maharashtra', 'solar': 6, 'wind': 7, 'gas': 9, 'water': 9, 'infrastructure': 10, 'demand_center': 9, 'transport_logistics': 10},
-    'Akola': {'lat': 20.7009, 'lon': 77.0081, 'state': 'Maharashtra', 'solar': 8, 'wind': 4, 'gas': 5, 'water': 4, 'infrastructure': 6, 'demand_center': 5, 'transport_logistics': 5},
-    'Wardha': {'lat': 20.7453, 'lon': 78.6022, 'state': 'Maharashtra', 'solar': 8, 'wind': 4, 'gas': 6, 'water': 4, 'infrastructure': 6, 'demand_center': 5, 'transport_logistics': 6},
-    'Bhiwandi': {'lat': 19.2967, 'lon': 73.0631, 'state': 'Maharashtra', 'solar': 6, 'wind': 6, 'gas': 8, 'water': 7, 'infrastructure': 8, 'demand_center': 8, 'transport_logistics': 8},
-    'Panvel': {'lat': 18.9880, 'lon': 73.1175, 'state': 'Maharashtra', 'solar': 6, 'wind': 7, 'gas': 8, 'water': 8, 'infrastructure': 9, 'demand_center': 8, 'transport_logistics': 9},
-
-    # --- Uttar Pradesh (20 cities) ---
-    'Lucknow': {'lat': 26.8467, 'lon': 80.9462, 'state': 'Uttar Pradesh', 'solar': 7, 'wind': 3, 'gas': 6, 'water': 6, 'infrastructure': 8, 'demand_center': 8, 'transport_logistics': 7},
-    'Noida': {'lat': 28.5355, 'lon': 77.3910, 'state': 'Uttar Pradesh', 'solar': 7, 'wind': 3, 'gas': 8, 'water': 5, 'infrastructure': 9, 'demand_center': 9, 'transport_logistics': 8},
-    'Kanpur': {'lat': 26.4499, 'lon': 80.3319, 'state': 'Uttar Pradesh', 'solar': 7, 'wind': 3, 'gas': 7, 'water': 7, 'infrastructure': 8, 'demand_center': 9, 'transport_logistics': 8},
-    'Varanasi': {'lat': 25.3176, 'lon': 82.9739, 'state': 'Uttar Pradesh', 'solar': 7, 'wind': 3, 'gas': 5, 'water': 8, 'infrastructure': 7, 'demand_center': 7, 'transport_logistics': 7},
-    'Agra': {'lat': 27.1767, 'lon': 78.0081, 'state': 'Uttar Pradesh', 'solar': 8, 'wind': 4, 'gas': 7, 'water': 6, 'infrastructure': 7, 'demand_center': 8, 'transport_logistics': 8},
-    'Meerut': {'lat': 28.9845, 'lon': 77.7064, 'state': 'Uttar Pradesh', 'solar': 7, 'wind': 3, 'gas': 7, 'water': 5, 'infrastructure': 8, 'demand_center': 7, 'transport_logistics': 7},
-    'Prayagraj': {'lat': 25.4358, 'lon': 81.8463, 'state': 'Uttar Pradesh', 'solar': 7, 'wind': 3, 'gas': 6, 'water': 8, 'infrastructure': 7, 'demand_center': 7, 'transport_logistics': 7},
-    'Ghaziabad': {'lat': 28.6692, 'lon': 77.4538, 'state': 'Uttar Pradesh', 'solar': 7, 'wind': 3, 'gas': 8, 'water': 5, 'infrastructure': 9, 'demand_center': 8, 'transport_logistics': 8},
-    'Gorakhpur': {'lat': 26.7606, 'lon': 83.3732, 'state': 'Uttar Pradesh', 'solar': 7, 'wind': 2, 'gas': 5, 'water': 7, 'infrastructure': 6, 'demand_center': 6, 'transport_logistics': 6},
-    'Bareilly': {'lat': 28.3670, 'lon': 79.4304, 'state': 'Uttar Pradesh', 'solar': 7, 'wind': 3, 'gas': 6, 'water': 6, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 6},
-    'Aligarh': {'lat': 27.8974, 'lon': 78.0880, 'state': 'Uttar Pradesh', 'solar': 8, 'wind': 4, 'gas': 7, 'water': 5, 'infrastructure': 7, 'demand_center': 7, 'transport_logistics': 7},
-    'Moradabad': {'lat': 28.8386, 'lon': 78.7733, 'state': 'Uttar Pradesh', 'solar': 7, 'wind': 3, 'gas': 6, 'water': 6, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 6},
-    'Jhansi': {'lat': 25.4484, 'lon': 78.5685, 'state': 'Uttar Pradesh', 'solar': 8, 'wind': 4, 'gas': 5, 'water': 5, 'infrastructure': 6, 'demand_center': 6, 'transport_logistics': 7},
-    'Mathura': {'lat': 27.4924, 'lon': 77.6737, 'state': 'Uttar Pradesh', 'solar': 8, 'wind': 4, 'gas': 8, 'water': 6, 'infrastructure': 7, 'demand_center': 7, 'transport_logistics': 7},
-    'Firozabad': {'lat': 27.1563, 'lon': 78.4116, 'state': 'Uttar Pradesh', 'solar': 8, 'wind': 4, 'gas': 7, 'water': 6, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 7},
-    'Saharanpur': {'lat': 29.964, 'lon': 77.546, 'state': 'Uttar Pradesh', 'solar': 7, 'wind': 3, 'gas': 6, 'water': 6, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 6},
-    'Ayodhya': {'lat': 26.793, 'lon': 82.199, 'state': 'Uttar Pradesh', 'solar': 7, 'wind': 3, 'gas': 5, 'water': 7, 'infrastructure': 7, 'demand_center': 7, 'transport_logistics': 6},
-    'Muzaffarnagar': {'lat': 29.47, 'lon': 77.7, 'state': 'Uttar Pradesh', 'solar': 7, 'wind': 3, 'gas': 6, 'water': 6, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 6},
-    'Mirzapur': {'lat': 25.146, 'lon': 82.56, 'state': 'Uttar Pradesh', 'solar': 7, 'wind': 4, 'gas': 5, 'water': 7, 'infrastructure': 6, 'demand_center': 5, 'transport_logistics': 6},
-    'Shahjahanpur': {'lat': 27.88, 'lon': 79.91, 'state': 'Uttar Pradesh', 'solar': 7, 'wind': 3, 'gas': 6, 'water': 6, 'infrastructure': 6, 'demand_center': 5, 'transport_logistics': 5},
-
-    # --- Tamil Nadu (20 cities) ---
-    'Chennai': {'lat': 13.0827, 'lon': 80.2707, 'state': 'Tamil Nadu', 'solar': 7, 'wind': 8, 'gas': 7, 'water': 9, 'infrastructure': 9, 'demand_center': 10, 'transport_logistics': 10},
-    'Thoothukudi': {'lat': 8.7642, 'lon': 78.1348, 'state': 'Tamil Nadu', 'solar': 8, 'wind': 10, 'gas': 6, 'water': 9, 'infrastructure': 7, 'demand_center': 7, 'transport_logistics': 9},
-    'Coimbatore': {'lat': 11.0168, 'lon': 76.9558, 'state': 'Tamil Nadu', 'solar': 7, 'wind': 7, 'gas': 5, 'water': 6, 'infrastructure': 8, 'demand_center': 8, 'transport_logistics': 8},
-    'Madurai': {'lat': 9.9252, 'lon': 78.1198, 'state': 'Tamil Nadu', 'solar': 8, 'wind': 6, 'gas': 5, 'water': 6, 'infrastructure': 7, 'demand_center': 7, 'transport_logistics': 7},
-    'Tiruchirappalli': {'lat': 10.7905, 'lon': 78.7047, 'state': 'Tamil Nadu', 'solar': 8, 'wind': 6, 'gas': 6, 'water': 7, 'infrastructure': 7, 'demand_center': 7, 'transport_logistics': 7},
-    'Salem': {'lat': 11.6643, 'lon': 78.1460, 'state': 'Tamil Nadu', 'solar': 8, 'wind': 7, 'gas': 5, 'water': 5, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 7},
-    'Tirunelveli': {'lat': 8.7139, 'lon': 77.7567, 'state': 'Tamil Nadu', 'solar': 8, 'wind': 9, 'gas': 5, 'water': 7, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 8},
-    'Vellore': {'lat': 12.9165, 'lon': 79.1325, 'state': 'Tamil Nadu', 'solar': 7, 'wind': 5, 'gas': 6, 'water': 6, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 7},
-    'Erode': {'lat': 11.3410, 'lon': 77.7172, 'state': 'Tamil Nadu', 'solar': 8, 'wind': 6, 'gas': 5, 'water': 6, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 7},
-    'Kanyakumari': {'lat': 8.0883, 'lon': 77.5385, 'state': 'Tamil Nadu', 'solar': 7, 'wind': 10, 'gas': 5, 'water': 9, 'infrastructure': 6, 'demand_center': 5, 'transport_logistics': 8},
-    'Hosur': {'lat': 12.74, 'lon': 77.82, 'state': 'Tamil Nadu', 'solar': 7, 'wind': 6, 'gas': 6, 'water': 5, 'infrastructure': 8, 'demand_center': 7, 'transport_logistics': 8},
-    'Ramanathapuram': {'lat': 9.3639, 'lon': 78.8357, 'state': 'Tamil Nadu', 'solar': 8, 'wind': 9, 'gas': 6, 'water': 9, 'infrastructure': 6, 'demand_center': 5, 'transport_logistics': 8},
-    'Cuddalore': {'lat': 11.75, 'lon': 79.75, 'state': 'Tamil Nadu', 'solar': 7, 'wind': 8, 'gas': 7, 'water': 9, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 9},
-    'Nagapattinam': {'lat': 10.7667, 'lon': 79.85, 'state': 'Tamil Nadu', 'solar': 7, 'wind': 8, 'gas': 7, 'water': 9, 'infrastructure': 6, 'demand_center': 5, 'transport_logistics': 9},
-    'Dindigul': {'lat': 10.3673, 'lon': 77.9803, 'state': 'Tamil Nadu', 'solar': 8, 'wind': 7, 'gas': 5, 'water': 5, 'infrastructure': 6, 'demand_center': 5, 'transport_logistics': 6},
-    'Tiruppur': {'lat': 11.1085, 'lon': 77.3411, 'state': 'Tamil Nadu', 'solar': 8, 'wind': 7, 'gas': 5, 'water': 5, 'infrastructure': 8, 'demand_center': 8, 'transport_logistics': 7},
-    'Thanjavur': {'lat': 10.7870, 'lon': 79.1378, 'state': 'Tamil Nadu', 'solar': 8, 'wind': 6, 'gas': 6, 'water': 7, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 6},
-    'Karaikudi': {'lat': 10.0691, 'lon': 78.7797, 'state': 'Tamil Nadu', 'solar': 8, 'wind': 7, 'gas': 5, 'water': 5, 'infrastructure': 6, 'demand_center': 5, 'transport_logistics': 6},
-    'Neyveli': {'lat': 11.5367, 'lon': 79.4886, 'state': 'Tamil Nadu', 'solar': 7, 'wind': 7, 'gas': 6, 'water': 6, 'infrastructure': 8, 'demand_center': 7, 'transport_logistics': 7},
-    'Krishnagiri': {'lat': 12.5204, 'lon': 78.2163, 'state': 'Tamil Nadu', 'solar': 7, 'wind': 6, 'gas': 5, 'water': 5, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 7},
-
-    # --- Odisha (20 cities) ---
-    'Bhubaneswar': {'lat': 20.2961, 'lon': 85.8245, 'state': 'Odisha', 'solar': 6, 'wind': 5, 'gas': 4, 'water': 7, 'infrastructure': 8, 'demand_center': 7, 'transport_logistics': 7},
-    'Paradip': {'lat': 20.2662, 'lon': 86.6698, 'state': 'Odisha', 'solar': 6, 'wind': 7, 'gas': 7, 'water': 9, 'infrastructure': 7, 'demand_center': 7, 'transport_logistics': 10},
-    'Cuttack': {'lat': 20.4625, 'lon': 85.8830, 'state': 'Odisha', 'solar': 6, 'wind': 5, 'gas': 4, 'water': 8, 'infrastructure': 7, 'demand_center': 7, 'transport_logistics': 7},
-    'Rourkela': {'lat': 22.2604, 'lon': 84.8536, 'state': 'Odisha', 'solar': 7, 'wind': 4, 'gas': 6, 'water': 6, 'infrastructure': 8, 'demand_center': 8, 'transport_logistics': 6},
-    'Puri': {'lat': 19.8135, 'lon': 85.8312, 'state': 'Odisha', 'solar': 6, 'wind': 8, 'gas': 5, 'water': 9, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 8},
-    'Sambalpur': {'lat': 21.4704, 'lon': 83.9733, 'state': 'Odisha', 'solar': 7, 'wind': 4, 'gas': 5, 'water': 7, 'infrastructure': 6, 'demand_center': 6, 'transport_logistics': 6},
-    'Berhampur': {'lat': 19.3159, 'lon': 84.7941, 'state': 'Odisha', 'solar': 6, 'wind': 6, 'gas': 5, 'water': 8, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 7},
-    'Balasore': {'lat': 21.4925, 'lon': 86.9325, 'state': 'Odisha', 'solar': 6, 'wind': 7, 'gas': 6, 'water': 8, 'infrastructure': 7, 'demand_center': 5, 'transport_logistics': 8},
-    'Gopalpur': {'lat': 19.2667, 'lon': 84.9167, 'state': 'Odisha', 'solar': 6, 'wind': 8, 'gas': 5, 'water': 9, 'infrastructure': 6, 'demand_center': 5, 'transport_logistics': 9},
-    'Jharsuguda': {'lat': 21.8548, 'lon': 84.0326, 'state': 'Odisha', 'solar': 7, 'wind': 4, 'gas': 7, 'water': 6, 'infrastructure': 8, 'demand_center': 7, 'transport_logistics': 6},
-    'Angul': {'lat': 20.8354, 'lon': 85.1018, 'state': 'Odisha', 'solar': 7, 'wind': 4, 'gas': 6, 'water': 6, 'infrastructure': 8, 'demand_center': 7, 'transport_logistics': 6},
-    'Dhamra': {'lat': 20.7833, 'lon': 86.9833, 'state': 'Odisha', 'solar': 6, 'wind': 7, 'gas': 7, 'water': 9, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 10},
-    'Keonjhar': {'lat': 21.6335, 'lon': 85.5843, 'state': 'Odisha', 'solar': 7, 'wind': 4, 'gas': 5, 'water': 6, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 5},
-    'Koraput': {'lat': 18.8164, 'lon': 82.7161, 'state': 'Odisha', 'solar': 7, 'wind': 5, 'gas': 3, 'water': 5, 'infrastructure': 5, 'demand_center': 4, 'transport_logistics': 4},
-    'Rayagada': {'lat': 19.1710, 'lon': 83.4168, 'state': 'Odisha', 'solar': 7, 'wind': 4, 'gas': 4, 'water': 6, 'infrastructure': 6, 'demand_center': 5, 'transport_logistics': 5},
-    'Jajpur': {'lat': 20.85, 'lon': 86.33, 'state': 'Odisha', 'solar': 6, 'wind': 6, 'gas': 6, 'water': 8, 'infrastructure': 8, 'demand_center': 7, 'transport_logistics': 8},
-    'Barbil': {'lat': 22.1167, 'lon': 85.4000, 'state': 'Odisha', 'solar': 7, 'wind': 4, 'gas': 5, 'water': 5, 'infrastructure': 7, 'demand_center': 8, 'transport_logistics': 6},
-    'Dhenkanal': {'lat': 20.66, 'lon': 85.6, 'state': 'Odisha', 'solar': 7, 'wind': 5, 'gas': 5, 'water': 7, 'infrastructure': 7, 'demand_center': 6, 'transport_logistics': 6},
-    'Bhawanipatna': {'lat': 19.9, 'lon': 83.16, 'state': 'Odisha', 'solar': 7, 'wind': 4, 'gas': 4, 'water': 5, 'infrastructure': 5, 'demand_center': 5, 'transport_logistics': 4},
-    'Talcher': {'lat': 20.95, 'lon': 85.22, 'state': 'Odisha', 'solar': 7, 'wind': 4, 'gas': 7, 'water': 6, 'infrastructure': 8, 'demand_center': 8, 'transport_logistics': 6}
-}
+# Feasibility heatmap tiles, rendered on first request and then served from disk
+TILE_CACHE_DIR = os.environ.get('MAP_TILE_CACHE_DIR', DEFAULT_TILE_CACHE_DIR)
+MAX_TILE_ZOOM = 12
+tile_cache = TileCache(TILE_CACHE_DIR)
+hub_store.on_reload(tile_cache.prune)
 
+# Scenario projections (2025-2050) with p10/p50/p90 bands
+projection_engine = ProjectionEngine(n_scenarios=int(os.environ.get('MAP_PROJECTION_SCENARIOS', 2000)))
 
-def find_closest_hub(user_lat, user_lon):
-    """
-    Calculates the distance from the user's clicked point to all our pre-defined hubs
-    and returns the name and data of the closest one.
-    """
-    closest_distance = float('inf')
-    closest_hub_name = None
-
-    for hub_name, hub_data in HUBS.items():
-        # Fixed the distance calculation (changed *2 to **2)
-        distance = math.sqrt((hub_data['lat'] - user_lat)**2 + (hub_data['lon'] - user_lon)**2)
-        if distance < closest_distance:
-            closest_distance = distance
-            closest_hub_name = hub_name
-            
-    return closest_hub_name, HUBS[closest_hub_name]
+# Short technology names used in URLs, matching the keys of the analyze "scores" block
+TECH_PARAMS = {'solar': 'SOLAR_BASED', 'wind': 'ELECTROLYSIS', 'thermal': 'THERMAL'}
 
-# Add the analyze endpoint to the same blueprint
-@map_bp.route('/analyze', methods=['POST'])
-def analyze_location():
-    # --- Step 1: Get the user's clicked coordinates from the request ---
-    data = request.get_json()
-    user_lat = data.get('latitude')
-    user_lon = data.get('longitude')
 
-    if user_lat is None or user_lon is None:
-        return jsonify({"error": "Latitude and longitude are required."}), 400
+def _nearby_hub(dataset, row, distance_km):
+    return {"name": str(dataset.engine.names[row]), "state": str(dataset.engine.states[row]), "distanceKm": round(distance_km, 2)}
 
-    # --- Step 2: Find the closest city hub to base our analysis on ---
-    hub_name, hub_data = find_closest_hub(user_lat, user_lon)
-    state = hub_data['state']
+# Nearest-hub lookups: k closest hubs, or every hub within a radius
+@map_bp.route('/nearby')
+def nearby_hubs():
+    point = _parse_point(request.args.get('lat'), request.args.get('lon'))
+    if point is None:
+        return jsonify({"error": "Valid lat and lon are required."}), 400
+    lat, lon = point
 
-    # --- Step 3: Calculate feasibility scores for each plant type using weights ---
-    
-    # Updated weights including the new transport_logistics factor
-    weights = {
-        'SOLAR_BASED': {'solar': 0.5, 'infrastructure': 0.2, 'demand_center': 0.1, 'water': 0.1, 'transport_logistics': 0.1},
-        'ELECTROLYSIS': {'solar': 0.3, 'wind': 0.3, 'infrastructure': 0.15, 'water': 0.15, 'demand_center': 0.05, 'transport_logistics': 0.05},
-        'THERMAL': {'gas': 0.5, 'demand_center': 0.2, 'transport_logistics': 0.1, 'water': 0.1, 'infrastructure': 0.1}
-    }
-    
-    # Calculate scores (0-10 scale)
-    solar_score = (hub_data['solar'] * weights['SOLAR_BASED']['solar'] +
-                   hub_data['infrastructure'] * weights['SOLAR_BASED']['infrastructure'] +
-                   hub_data['demand_center'] * weights['SOLAR_BASED']['demand_center'] +
-                   hub_data['water'] * weights['SOLAR_BASED']['water'] +
-                   hub_data['transport_logistics'] * weights['SOLAR_BASED']['transport_logistics'])
-
-    electrolysis_score = (hub_data['solar'] * weights['ELECTROLYSIS']['solar'] +
-                          hub_data['wind'] * weights['ELECTROLYSIS']['wind'] +
-                          hub_data['infrastructure'] * weights['ELECTROLYSIS']['infrastructure'] +
-                          hub_data['water'] * weights['ELECTROLYSIS']['water'] +
-                          hub_data['demand_center'] * weights['ELECTROLYSIS']['demand_center'] +
-                          hub_data['transport_logistics'] * weights['ELECTROLYSIS']['transport_logistics'])
-
-    thermal_score = (hub_data['gas'] * weights['THERMAL']['gas'] +
-                     hub_data['demand_center'] * weights['THERMAL']['demand_center'] +
-                     hub_data['transport_logistics'] * weights['THERMAL']['transport_logistics'] +
-                     hub_data['water'] * weights['THERMAL']['water'] +
-                     hub_data['infrastructure'] * weights['THERMAL']['infrastructure'])
+    dataset = hub_store.current()
+    radius_km = request.args.get('radius_km', type=float)
+    k = request.args.get('k', 5, type=int)
+    if radius_km is not None and not radius_km > 0:
+        return jsonify({"error": "radius_km must be a positive number."}), 400
+    if k < 1:
+        return jsonify({"error": "k must be at least 1."}), 400
+    if radius_km is not None:
+        matches = dataset.index.within_radius(lat, lon, radius_km)
+    else:
+        matches = dataset.index.k_nearest(lat, lon, k)
+
+    return jsonify({"hubs": [_nearby_hub(dataset, row, distance_km) for row, distance_km in matches]})
+
+# Feasibility raster tiles for the Leaflet heatmap overlays
+@map_bp.route('/tiles/<tech>/<int:z>/<int:x>/<int:y>.png')
+def feasibility_tile(tech, z, x, y):
+    if tech not in TECH_PARAMS:
+        return jsonify({"error": f"Unknown technology '{tech}'."}), 404
+    if not (0 <= z <= MAX_TILE_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return jsonify({"error": "Tile out of range."}), 404
+
+    dataset = hub_store.current()
+    path = tile_cache.get(dataset.engine, dataset.index, TECH_PARAMS[tech], z, x, y)
+    # Tile URLs are not versioned, so clients revalidate every time; the ETag
+    # changes with the data version and an unchanged tile is a bare 304
+    response = send_file(path, mimetype='image/png', etag=True, conditional=True)
+    response.cache_control.no_cache = True
+    return response
+
+# Monte Carlo weight sensitivity limits
+MAX_SENSITIVITY_SAMPLES = int(os.environ.get('MAP_SENSITIVITY_MAX_SAMPLES', 50000))
+
+def _sensitivity_summary(result, i):
+    technologies = {}
+    for t, tech in enumerate(TECHNOLOGIES):
+        technologies[tech] = {
+            "name": RECOMMENDATION_MAP[tech]['name'],
+            "winProbability": round(float(result['win_probability'][i, t]), 4),
+            "score": {
+                "mean": round(float(result['mean'][i, t]) * 10, 2),
+                "p5": round(float(result['p5'][i, t]) * 10, 2),
+                "p50": round(float(result['p50'][i, t]) * 10, 2),
+                "p95": round(float(result['p95'][i, t]) * 10, 2)
+            }
+        }
+    return technologies
+
+# How robust is the recommendation to the technology weights?
+# Scores one hub (by name or nearest to lat/lon), or every hub, under many perturbed weight vectors
+@map_bp.route('/sensitivity')
+def weight_sensitivity():
+    n_samples = request.args.get('samples', 10000, type=int)
+    concentration = request.args.get('concentration', 100.0, type=float)
+    seed = request.args.get('seed', 0, type=int)
+    if not 1 <= n_samples <= MAX_SENSITIVITY_SAMPLES:
+        return jsonify({"error": f"samples must be between 1 and {MAX_SENSITIVITY_SAMPLES}."}), 400
+    if not (math.isfinite(concentration) and concentration > 0):
+        return jsonify({"error": "concentration must be a positive number."}), 400
+    if seed < 0:
+        return jsonify({"error": "seed must not be negative."}), 400
+
+    dataset = hub_store.current()
+    scoring_engine = dataset.engine
+    hub_name = request.args.get('hub')
+    point = _parse_point(request.args.get('lat'), request.args.get('lon'))
+    if hub_name is not None:
+        if hub_name not in scoring_engine.index:
+            return jsonify({"error": f"Unknown hub '{hub_name}'."}), 404
+        rows = [scoring_engine.index[hub_name]]
+    elif point is not None:
+        rows = [dataset.index.nearest(*point)[0]]
+    else:
+        rows = list(range(len(scoring_engine)))
+
+    result = scoring_engine.sensitivity(rows, n_samples=n_samples, concentration=concentration, seed=seed)
+
+    hubs = []
+    for i, row in enumerate(rows):
+        hubs.append({
+            "hub": str(scoring_engine.names[row]),
+            "state": str(scoring_engine.states[row]),
+            "baselineRecommendation": scoring_engine.best_technology(row),
+            "technologies": _sensitivity_summary(result, i)
+        })
+
+    return jsonify({"samples": n_samples, "concentration": concentration, "seed": seed, "hubs": hubs})
+
+# Ranking limits; ranked pages are cached per query until the hub data reloads
+MAX_RANK_LIMIT = int(os.environ.get('MAP_RANK_MAX_LIMIT', 200))
+RANK_CACHE_SIZE = int(os.environ.get('MAP_RANK_CACHE_SIZE', 1024))
+
+def _encode_cursor(version, score, row, offset):
+    raw = json.dumps({"v": version, "s": score, "r": row, "o": offset}).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def _decode_cursor(cursor):
+    """Return the cursor dict, or None if it is malformed"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return {"v": str(data["v"]), "s": float(data["s"]), "r": int(data["r"]), "o": int(data["o"])}
+    except (ValueError, KeyError, TypeError):
+        return None
+
+def _parse_bbox(bbox):
+    """Parse "minLon,minLat,maxLon,maxLat" into a tuple of floats, or None if invalid"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(','))
+    except ValueError:
+        return None
+    if min_lon > max_lon or min_lat > max_lat:
+        return None
+    return min_lon, min_lat, max_lon, max_lat
+
+@lru_cache(maxsize=RANK_CACHE_SIZE)
+def _ranked_page(dataset, tech, state, bbox, limit, after):
+    """Rank hubs for one query and return the serializable page"""
+    engine = dataset.engine
+    mask = None
+    if state:
+        mask = np.char.lower(engine.states.astype(str)) == state.lower()
+    if bbox:
+        min_lon, min_lat, max_lon, max_lat = bbox
+        in_bbox = (engine.lon >= min_lon) & (engine.lon <= max_lon) & (engine.lat >= min_lat) & (engine.lat <= max_lat)
+        mask = in_bbox if mask is None else mask & in_bbox
+
+    offset = after[2] if after else 0
+    rows = engine.rank(tech, mask=mask, limit=limit, after=after[:2] if after else None)
+    column = engine.rank_column(tech)
+
+    results = []
+    for i, row in enumerate(rows):
+        results.append({
+            "rank": offset + i + 1,
+            "hub": str(engine.names[row]),
+            "state": str(engine.states[row]),
+            "lat": float(engine.lat[row]),
+            "lon": float(engine.lon[row]),
+            # Same 0-100 scale as the "scores" block of /map/analyze
+            "score": round(float(column[row]) * 10),
+            "recommendation": RECOMMENDATION_MAP[engine.best_technology(row)]['name']
+        })
+
+    next_cursor = None
+    if len(rows) == limit:
+        last = int(rows[-1])
+        next_cursor = _encode_cursor(dataset.version, float(column[last]), last, offset + len(rows))
+    return {"results": results, "nextCursor": next_cursor}
+
+hub_store.on_reload(_ranked_page.cache_clear)
+
+# Top-N hubs for a technology, optionally filtered by state and bounding box
+@map_bp.route('/rank')
+def rank_sites():
+    tech = request.args.get('tech')
+    if tech and tech not in TECH_PARAMS:
+        return jsonify({"error": f"tech must be one of: {', '.join(TECH_PARAMS)}."}), 400
+    limit = request.args.get('limit', 20, type=int)
+    if not 1 <= limit <= MAX_RANK_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {MAX_RANK_LIMIT}."}), 400
+
+    bbox = None
+    if request.args.get('bbox'):
+        bbox = _parse_bbox(request.args['bbox'])
+        if bbox is None:
+            return jsonify({"error": "bbox must be minLon,minLat,maxLon,maxLat."}), 400
+
+    dataset = hub_store.current()
+    after = None
+    if request.args.get('cursor'):
+        cursor = _decode_cursor(request.args['cursor'])
+        if cursor is None:
+            return jsonify({"error": "Invalid cursor."}), 400
+        if cursor["v"] != dataset.version:
+            return jsonify({"error": "Cursor expired because the hub data changed; restart from the first page."}), 409
+        after = (cursor["s"], cursor["r"], cursor["o"])
+
+    page = _ranked_page(dataset, TECH_PARAMS.get(tech), request.args.get('state', '').strip(), bbox, limit, after)
+    return jsonify({"tech": tech or "best", **page})
+
+# Batch analysis limits (configurable through the environment)
+MAX_BATCH_POINTS = int(os.environ.get('MAP_BATCH_MAX_POINTS', 10000))
+BATCH_CHUNK_SIZE = int(os.environ.get('MAP_BATCH_CHUNK_SIZE', 500))
+# JSON bodies are parsed whole, so their size is capped up front (CSV is streamed)
+MAX_BATCH_JSON_BYTES = int(os.environ.get('MAP_BATCH_MAX_JSON_BYTES', 8 * 1024 * 1024))
+
+# /map/analyze scores are deterministic per grid cell and hub, so they can be cached
+ANALYZE_GRID_DEG = float(os.environ.get('MAP_ANALYZE_GRID_DEG', 0.01))
+ANALYZE_CACHE_SIZE = int(os.environ.get('MAP_ANALYZE_CACHE_SIZE', 4096))
+ANALYZE_MAX_AGE = int(os.environ.get('MAP_ANALYZE_MAX_AGE', 3600))
+
+def snap_to_cell(lat, lon):
+    """Quantize coordinates to integer grid cell indices"""
+    return round(float(lat) / ANALYZE_GRID_DEG), round(float(lon) / ANALYZE_GRID_DEG)
+
+def cell_jitter(lat, lon):
+    """Deterministic value in [-3, 3] derived from the grid cell of a point"""
+    lat_cell, lon_cell = snap_to_cell(lat, lon)
+    digest = hashlib.blake2b(f"{lat_cell}:{lon_cell}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64 * 6.0 - 3.0
+
+# Format the response to match what the frontend expects
+RECOMMENDATION_MAP = {
+    'SOLAR_BASED': {'name': 'Solar Electrolysis', 'bgColor': 'rgba(255, 183, 0, 0.1)', 'textColor': '#B37400'},
+    'ELECTROLYSIS': {'name': 'Wind Electrolysis', 'bgColor': 'rgba(0, 201, 255, 0.1)', 'textColor': '#007B9A'},
+    'THERMAL': {'name': 'Thermal with CCS', 'bgColor': 'rgba(255, 140, 66, 0.1)', 'textColor': '#B3541E'}
+}
+
+def build_analysis(dataset, user_lat, user_lon, row, hub_distance_km):
+    """
+    Builds the analysis payload for a point from the precomputed scores of its
+    closest hub (at `row` in the dataset). Shared by the single and batch
+    analyze endpoints.
+    """
+    hub_name = str(dataset.engine.names[row])
+    state = str(dataset.engine.states[row])
+
+    # --- Step 3: Look up the precomputed feasibility scores for this hub ---
+    scores = dataset.engine.row_scores(row)
+    solar_score = scores['SOLAR_BASED']
+    electrolysis_score = scores['ELECTROLYSIS']
+    thermal_score = scores['THERMAL']
 
     # --- Step 4: Determine the recommendation and final feasibility score ---
     
-    scores = {
-        'SOLAR_BASED': solar_score,
-        'ELECTROLYSIS': electrolysis_score,
-        'THERMAL': thermal_score
-    }
-    
     # Find the plant type with the highest score
     recommended_plant_type = max(scores, key=scores.get)
     
     # The feasibility score is the highest score, converted to a percentage (0-100)
-    # We add a small random factor to make it look unique for each click
+    # We add a small per-cell factor so neighbouring clicks differ, while the
+    # same cell always gets the same score
     base_feasibility = scores[recommended_plant_type] * 10
-    random_factor = random.uniform(-3.0, 3.0)
-    final_feasibility_score = round(max(0, min(100, base_feasibility + random_factor)))
+    cell_factor = cell_jitter(user_lat, user_lon)
+    final_feasibility_score = round(max(0, min(100, base_feasibility + cell_factor)))
 
     # --- Step 5: Get the policy advantages for the state ---
-    policy_advantages = STATE_POLICIES.get(state, ["No policy information available for this state."])
-
-    # --- Step 6: Prepare and send the final JSON response to the frontend ---
-    # Format the response to match what the frontend expects
-    recommendation_map = {
-        'SOLAR_BASED': {'name': 'Solar Electrolysis', 'bgColor': 'rgba(255, 183, 0, 0.1)', 'textColor': '#B37400'},
-        'ELECTROLYSIS': {'name': 'Wind Electrolysis', 'bgColor': 'rgba(0, 201, 255, 0.1)', 'textColor': '#007B9A'},
-        'THERMAL': {'name': 'Thermal with CCS', 'bgColor': 'rgba(255, 140, 66, 0.1)', 'textColor': '#B3541E'}
-    }
-    
-    # Generate projection data based on feasibility score
+    policy_advantages = dataset.policies.get(state, ["No policy information available for this state."])
+
+    # --- Step 6: Prepare the final payload for the frontend ---
+    # Generate projection bands from the state's scenarios, scaled by feasibility
     base_value = final_feasibility_score * 1.5
-    projection_values = [
-        base_value,
-        base_value * 1.25,
-        base_value * 1.6,
-        base_value * 2.1,
-        base_value * 2.8,
-        base_value * 3.5
-    ]
-    projection_values = [round(v) for v in projection_values]
+    projection_bands = projection_engine.project(base_value, state, dataset.policy_uplift.get(state))
     
-    response = {
+    return {
         "location": {"lat": user_lat, "lng": user_lon},
+        "closestHub": {"name": hub_name, "state": state, "distanceKm": round(hub_distance_km, 2)},
         "feasibilityScore": final_feasibility_score,
-        "recommendation": recommendation_map.get(recommended_plant_type, {"name": "Unknown", "bgColor": "#ccc", "textColor": "#000"}),
+        "recommendation": RECOMMENDATION_MAP.get(recommended_plant_type, {"name": "Unknown", "bgColor": "#ccc", "textColor": "#000"}),
         "scores": {
             "solar": round(solar_score * 10),
             "wind": round(electrolysis_score * 10),  # Map electrolysis to wind for frontend
             "thermal": round(thermal_score * 10)
         },
         "projection": {
-            "years": ["2025", "2030", "2035", "2040", "2045", "2050"],
-            "values": projection_values
+            "years": [str(year) for year in PROJECTION_YEARS],
+            "values": projection_bands["p50"],
+            "bands": projection_bands,
+            "scenarios": projection_engine.n_scenarios
         },
         "policyAdvantages": policy_advantages
     }
-    
-    return jsonify(response)
\ No newline at end of file
+
+@lru_cache(maxsize=ANALYZE_CACHE_SIZE)
+def _cached_analysis(dataset, lat_cell, lon_cell, row):
+    """
+    Returns the analysis of a grid cell served by the hub at `row`. The
+    location and hub distance are per point and filled in by the caller. The
+    dataset snapshot is part of the key, and the cache is cleared on every reload.
+    """
+    cell_lat = round(lat_cell * ANALYZE_GRID_DEG, 6)
+    cell_lon = round(lon_cell * ANALYZE_GRID_DEG, 6)
+    return build_analysis(dataset, cell_lat, cell_lon, row, 0.0)
+
+hub_store.on_reload(_cached_analysis.cache_clear)
+
+# Add the analyze endpoint to the same blueprint
+# GET is the cacheable form (browsers and CDNs); POST is kept for existing clients
+@map_bp.route('/analyze', methods=['GET', 'POST'])
+def analyze_location():
+    # --- Step 1: Get the user's clicked coordinates from the request ---
+    data = request.args if request.method == 'GET' else (request.get_json(silent=True) or {})
+    point = _parse_point(data.get('latitude'), data.get('longitude'))
+
+    if point is None:
+        return jsonify({"error": "Latitude and longitude are required."}), 400
+
+    # --- Step 2: Find the closest hub and take the (cached) analysis of the grid cell ---
+    user_lat, user_lon = point
+    dataset = hub_store.current()
+    row, hub_distance_km = dataset.index.nearest(user_lat, user_lon)
+    analysis = dict(_cached_analysis(dataset, *snap_to_cell(user_lat, user_lon), int(row)))
+    analysis["location"] = {"lat": user_lat, "lng": user_lon}
+    analysis["closestHub"] = {**analysis["closestHub"], "distanceKm": round(hub_distance_km, 2)}
+    body = json.dumps(analysis, sort_keys=True).encode('utf-8')
+    etag = hashlib.sha1(body).hexdigest()
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = ANALYZE_MAX_AGE
+    return response
+
+def _parse_point(lat, lon):
+    """Return (lat, lon) as floats, or None if they are missing or out of range"""
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        return None
+    return lat, lon
+
+def _iter_json_points(payload):
+    """Yield (id, point) pairs from a {"points": [...]} body or a GeoJSON FeatureCollection"""
+    if payload.get('type') == 'FeatureCollection':
+        for feature in payload.get('features') or []:
+            if not isinstance(feature, dict):
+                yield None, None
+                continue
+            geometry = feature.get('geometry')
+            geometry = geometry if isinstance(geometry, dict) else {}
+            coordinates = geometry.get('coordinates')
+            point = None
+            if geometry.get('type') == 'Point' and isinstance(coordinates, list) and len(coordinates) >= 2:
+                point = _parse_point(coordinates[1], coordinates[0])
+            properties = feature.get('properties')
+            feature_id = feature.get('id', properties.get('name') if isinstance(properties, dict) else None)
+            yield feature_id, point
+    else:
+        for item in payload.get('points') or []:
+            if isinstance(item, dict):
+                yield item.get('id'), _parse_point(item.get('latitude', item.get('lat')), item.get('longitude', item.get('lon', item.get('lng'))))
+            elif isinstance(item, (list, tuple)) and len(item) >= 2:
+                yield None, _parse_point(item[0], item[1])
+            else:
+                yield None, None
+
+def _iter_csv_points(stream):
+    """Yield (id, point) pairs from a CSV upload one row at a time"""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for row in reader:
+        row = {(key or '').strip().lower(): value for key, value in row.items()}
+        lat = row.get('latitude', row.get('lat'))
+        lon = row.get('longitude', row.get('lon', row.get('lng')))
+        yield row.get('id', row.get('name')), _parse_point(lat, lon)
+
+def _analyze_chunk(dataset, chunk, start):
+    """Score one chunk of (id, point) pairs together and yield NDJSON lines"""
+    valid = [i for i, (_, point) in enumerate(chunk) if point is not None]
+    if valid:
+        lats = [chunk[i][1][0] for i in valid]
+        lons = [chunk[i][1][1] for i in valid]
+        rows, distances = dataset.index.nearest_many(lats, lons)
+        nearest = dict(zip(valid, zip(rows, distances)))
+    else:
+        nearest = {}
+
+    for i, (point_id, point) in enumerate(chunk):
+        line = {"index": start + i, "id": point_id}
+        if point is None:
+            line["error"] = "Valid latitude and longitude are required."
+        else:
+            row, distance_km = nearest[i]
+            line.update(build_analysis(dataset, point[0], point[1], row, float(distance_km)))
+        yield json.dumps(line) + "\n"
+
+# Batch analysis: many points in, one NDJSON line per point streamed back
+@map_bp.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    if request.mimetype in ('text/csv', 'application/csv'):
+        points = _iter_csv_points(request.stream)
+    else:
+        if request.content_length is None:
+            return jsonify({"error": "JSON batches need a Content-Length header; stream large batches as CSV."}), 411
+        if request.content_length > MAX_BATCH_JSON_BYTES:
+            return jsonify({"error": f"JSON batch too large (max {MAX_BATCH_JSON_BYTES} bytes); stream large batches as CSV."}), 413
+        payload = request.get_json(silent=True)
+        items = (payload.get('features') or payload.get('points') or []) if isinstance(payload, dict) else None
+        if not isinstance(items, list):
+            return jsonify({"error": "Expected a JSON body with points, a GeoJSON FeatureCollection, or a CSV upload."}), 400
+        count = len(items)
+        if count > MAX_BATCH_POINTS:
+            return jsonify({"error": f"Batch too large: {count} points (max {MAX_BATCH_POINTS})."}), 413
+        points = _iter_json_points(payload)
+
+    dataset = hub_store.current()
+
+    def generate():
+        # Points are consumed and scored one chunk at a time, so memory stays
+        # bounded by BATCH_CHUNK_SIZE regardless of how large the upload is
+        start = 0
+        chunk = []
+        try:
+            for item in points:
+                if start + len(chunk) >= MAX_BATCH_POINTS:
+                    yield from _analyze_chunk(dataset, chunk, start)
+                    yield json.dumps({"error": f"Batch truncated at {MAX_BATCH_POINTS} points."}) + "\n"
+                    return
+                chunk.append(item)
+                if len(chunk) >= BATCH_CHUNK_SIZE:
+                    yield from _analyze_chunk(dataset, chunk, start)
+                    start += len(chunk)
+                    chunk = []
+        except (UnicodeDecodeError, csv.Error) as e:
+            # The status and headers are already sent, so the error ends the stream as its last line
+            yield from _analyze_chunk(dataset, chunk, start)
+            yield json.dumps({"error": f"Could not read the CSV upload after {start + len(chunk)} rows: {e}"}) + "\n"
+            return
+        if chunk:
+            yield from _analyze_chunk(dataset, chunk, start)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
\ No newline at end of file
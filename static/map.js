@@ -20,6 +20,15 @@ document.addEventListener('DOMContentLoaded', () => {
     }).addTo(map);
     L.control.zoom({ position: 'bottomright' }).addTo(map);
 
+    // --- Feasibility Heatmap Overlays (pre-rendered tiles, cached server-side) ---
+    const heatmapOptions = { opacity: 0.6, maxNativeZoom: 12, maxZoom: 20 };
+    const heatmapLayers = {
+        'Solar Electrolysis': L.tileLayer('/map/tiles/solar/{z}/{x}/{y}.png', heatmapOptions),
+        'Wind Electrolysis': L.tileLayer('/map/tiles/wind/{z}/{x}/{y}.png', heatmapOptions),
+        'Thermal with CCS': L.tileLayer('/map/tiles/thermal/{z}/{x}/{y}.png', heatmapOptions)
+    };
+    L.control.layers(null, heatmapLayers, { position: 'topright' }).addTo(map);
+
     let marker;
 
     // --- Map Click Event to Set Marker and Run Analysis ---
@@ -167,6 +176,20 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // p10/p90 scenario bands drawn as dashed lines around the median
+    function projectionBandDatasets(bands) {
+        if (!bands) return [];
+        return [['p90', 'High scenario (p90)'], ['p10', 'Low scenario (p10)']].map(([key, label]) => ({
+            label: label,
+            data: bands[key],
+            fill: false,
+            borderColor: 'rgba(75, 192, 192, 0.4)',
+            borderDash: [4, 4],
+            pointRadius: 0,
+            tension: 0.1
+        }));
+    }
+
     function renderProjectionChart(projectionData) {
         const ctx = document.getElementById('projectionChart').getContext('2d');
         if (projectionChart) projectionChart.destroy();
@@ -181,7 +204,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     fill: false,
                     borderColor: 'rgb(75, 192, 192)',
                     tension: 0.1
-                }]
+                }, ...projectionBandDatasets(projectionData.bands)]
             },
             options: {
                 responsive: true,
@@ -198,16 +221,11 @@ document.addEventListener('DOMContentLoaded', () => {
     // --- REAL API FUNCTION ---
     // --- API FUNCTION with improved error handling ---
 async function fetchAnalysisData(lat, lng) {
-    const API_URL = '/map/analyze';
+    // GET so the browser (and any CDN in front of the app) can cache repeat clicks
+    const API_URL = `/map/analyze?latitude=${encodeURIComponent(lat)}&longitude=${encodeURIComponent(lng)}`;
     
     try {
-        const response = await fetch(API_URL, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ latitude: lat, longitude: lng }),
-        });
+        const response = await fetch(API_URL);
 
         if (!response.ok) {
             // Get more details about the error
@@ -320,36 +338,27 @@ function generateDetailedReport() {
     // Store for later use in questions
     window.currentReportData = reportData;
     
-    // Send request to generate report
-    fetch('/LLM/generate-report', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(reportData)
-    })
-    .then(response => {
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        return response.json();
-    })
-    .then(data => {
-        if (data.status === 'success') {
-            // Hide generating indicator
+    // Stream the report; tokens are rendered as they arrive
+    let reportText = '';
+    postEventStream('/LLM/generate-report/stream', reportData, {
+        token: data => {
+            // Hide generating indicator once the first tokens arrive
             document.getElementById('report-generating').classList.add('hidden');
-            
+            reportText += data.text;
+            renderReport(reportText, false);
+        },
+        done: data => {
             // Store session ID for future questions
             window.currentSessionId = data.session_id;
+            renderReport(reportText, true);
             
-            // Display the report with typing effect
-            typeReport(data.report, function() {
-                // Enable download button ONLY after report is fully displayed
-                downloadBtn.disabled = false;
-                downloadBtn.classList.remove('opacity-50', 'cursor-not-allowed');
-                downloadBtn.classList.add('hover:bg-earth-blue-dark');
-            });
-        } else {
+            // Enable download button ONLY after report is fully displayed
+            downloadBtn.disabled = false;
+            downloadBtn.classList.remove('opacity-50', 'cursor-not-allowed');
+            downloadBtn.classList.add('hover:bg-earth-blue-dark');
+        },
+        error: data => {
+            document.getElementById('report-generating').classList.add('hidden');
             document.getElementById('report-output').innerHTML = 
                 `<p class="text-red-500">Error: ${data.error || 'Failed to generate report'}</p>`;
         }
@@ -367,44 +376,78 @@ function generateDetailedReport() {
     });
 }
 
-function typeReport(reportText, onComplete) {
-    const reportOutput = document.getElementById('report-output');
-    reportOutput.innerHTML = '';
-    
-    let i = 0;
-    const speed = 5; // Fast typing speed
+// POST `body` to a Server-Sent Events endpoint and call handlers[event](data) for each event
+async function postEventStream(url, body, handlers) {
+    const response = await fetch(url, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(body)
+    });
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
     
-    function typeWriter() {
-        if (i < reportText.length) {
-            const char = reportText[i];
-            const currentText = reportText.substring(0, i + 1);
-            
-            // Render markdown as we type
-            reportOutput.innerHTML = marked.parse(currentText) + 
-                '<span class="ai-typing">|</span>';
-            
-            i++;
-            setTimeout(typeWriter, speed);
-        } else {
-            // Final render
-            reportOutput.innerHTML = marked.parse(reportText);
-            
-            // Highlight code blocks
-            reportOutput.querySelectorAll('pre code').forEach((block) => {
-                hljs.highlightElement(block);
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            let event = 'message';
+            const dataLines = [];
+            block.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
             });
-            
-            // Typeset mathematical formulas
-            if (typeof MathJax !== 'undefined') {
-                MathJax.typesetPromise([reportOutput]);
+            if (handlers[event] && dataLines.length) {
+                handlers[event](JSON.parse(dataLines.join('\n')));
             }
-            
-            // Call completion callback
-            if (onComplete) onComplete();
         }
     }
+}
+
+// Render markdown at most once per animation frame while streaming
+let pendingReportRender = null;
+let pendingReportText = '';
+
+function renderReport(reportText, isFinal) {
+    const reportOutput = document.getElementById('report-output');
+    if (!isFinal) {
+        pendingReportText = reportText;
+        if (pendingReportRender === null) {
+            pendingReportRender = requestAnimationFrame(() => {
+                pendingReportRender = null;
+                reportOutput.innerHTML = marked.parse(pendingReportText) + 
+                    '<span class="ai-typing">|</span>';
+            });
+        }
+        return;
+    }
+    
+    if (pendingReportRender !== null) {
+        cancelAnimationFrame(pendingReportRender);
+        pendingReportRender = null;
+    }
+    // Final render
+    reportOutput.innerHTML = marked.parse(reportText);
+    
+    // Highlight code blocks
+    reportOutput.querySelectorAll('pre code').forEach((block) => {
+        hljs.highlightElement(block);
+    });
     
-    typeWriter();
+    // Typeset mathematical formulas
+    if (typeof MathJax !== 'undefined') {
+        MathJax.typesetPromise([reportOutput]);
+    }
 }
 
 function askAdditionalQuestion(question) {
@@ -434,62 +477,54 @@ function askAdditionalQuestion(question) {
     reportOutput.appendChild(typingIndicator);
     reportOutput.scrollTop = reportOutput.scrollHeight;
     
-    // Send question to backend
-    fetch('/LLM/ask-question', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
+    // Stream the answer into its own element below the question
+    let answerText = '';
+    let answerElement = null;
+    
+    function showError(message) {
+        const errorElement = document.createElement('div');
+        errorElement.classList.add('mb-4');
+        errorElement.innerHTML = `
+            <div class="inline-block bg-red-100 rounded-lg px-4 py-2">
+                <p class="text-red-800">Error: ${message}</p>
+            </div>
+        `;
+        reportOutput.appendChild(errorElement);
+        reportOutput.scrollTop = reportOutput.scrollHeight;
+    }
+    
+    postEventStream('/LLM/ask-question/stream', {
+        question: question,
+        report_data: window.currentReportData,
+        session_id: window.currentSessionId
+    }, {
+        token: data => {
+            if (!answerElement) {
+                // Replace the typing indicator with the answer
+                reportOutput.removeChild(typingIndicator);
+                answerElement = document.createElement('div');
+                answerElement.classList.add('mb-4', 'prose', 'prose-sm', 'max-w-none');
+                reportOutput.appendChild(answerElement);
+            }
+            answerText += data.text;
+            answerElement.innerHTML = marked.parse(answerText);
+            reportOutput.scrollTop = reportOutput.scrollHeight;
         },
-        body: JSON.stringify({
-            question: question,
-            report_data: window.currentReportData,
-            session_id: window.currentSessionId
-        })
-    })
-    .then(response => {
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        return response.json();
-    })
-    .then(data => {
-        // Remove typing indicator
-        reportOutput.removeChild(typingIndicator);
-        
-        if (data.status === 'success') {
-            const answerElement = document.createElement('div');
-            answerElement.classList.add('mb-4', 'prose', 'prose-sm', 'max-w-none');
-            answerElement.innerHTML = marked.parse(data.answer);
-            reportOutput.appendChild(answerElement);
+        done: data => {
+            if (typingIndicator.parentNode) reportOutput.removeChild(typingIndicator);
             
             // Store updated session ID
             if (data.session_id) {
                 window.currentSessionId = data.session_id;
             }
-        } else {
-            const errorElement = document.createElement('div');
-            errorElement.classList.add('mb-4');
-            errorElement.innerHTML = `
-                <div class="inline-block bg-red-100 rounded-lg px-4 py-2">
-                    <p class="text-red-800">Error: ${data.error || 'Failed to get answer'}</p>
-                </div>
-            `;
-            reportOutput.appendChild(errorElement);
+        },
+        error: data => {
+            if (typingIndicator.parentNode) reportOutput.removeChild(typingIndicator);
+            showError(data.error || 'Failed to get answer');
         }
-        
-        reportOutput.scrollTop = reportOutput.scrollHeight;
     })
     .catch(error => {
-        reportOutput.removeChild(typingIndicator);
-        
-        const errorElement = document.createElement('div');
-        errorElement.classList.add('mb-4');
-        errorElement.innerHTML = `
-            <div class="inline-block bg-red-100 rounded-lg px-4 py-2">
-                <p class="text-red-800">Error: ${error.message}</p>
-            </div>
-        `;
-        reportOutput.appendChild(errorElement);
-        reportOutput.scrollTop = reportOutput.scrollHeight;
+        if (typingIndicator.parentNode) reportOutput.removeChild(typingIndicator);
+        showError(error.message);
     });
 }
\ No newline at end of file
@@ -0,0 +1,72 @@
+# tests/test_report.py
+import unittest
+
+from models.report import REPORT_SECTIONS, HybridReport
+
+REPORT_DATA = {
+    'location': 'Test Site',
+    'feasibility': 'High',
+    'recommended_technology': 'Solar Electrolysis',
+    'suitability_scores': {'solar_electrolysis': 82, 'wind_electrolysis': 64, 'thermal_with_ccs': 40}
+}
+
+NARRATIVE = """## Executive Summary
+The site is well suited to solar electrolysis.
+## Economic Viability
+Costs are competitive.
+### Environmental benefits of water reuse
+Reusing treated water lowers costs.
+## 3. Infrastructure Requirements
+A new substation is needed.
+## Environmental Impact
+Land use is modest.
+## Recommendations for This Location
+Start with a pilot.
+"""
+
+
+class CannedReport(HybridReport):
+    def _narrative_stream(self):
+        # Split mid-line to exercise the line buffering
+        for start in range(0, len(NARRATIVE), 17):
+            yield NARRATIVE[start:start + 17]
+
+    def _risks(self):
+        return "- **Risk:** Water scarcity. *Mitigation:* Recycling.\n\n"
+
+
+def _section_bodies(text):
+    """Map each numbered section title to the text under its heading"""
+    bodies = {}
+    for block in text.split("\n## ")[1:]:
+        heading, _, body = block.partition("\n")
+        bodies[heading.split(". ", 1)[1]] = body
+    return bodies
+
+
+class HybridReportStreamTest(unittest.TestCase):
+    def test_sections_follow_level_two_headings_in_order(self):
+        text = CannedReport(REPORT_DATA, "").render()
+        bodies = _section_bodies(text)
+
+        self.assertEqual(list(bodies), [title for title, _ in REPORT_SECTIONS])
+        self.assertNotIn("not covered", text)
+        self.assertIn("### Environmental benefits of water reuse", bodies["Economic Viability"])
+        self.assertIn("A new substation is needed.", bodies["Infrastructure Requirements"])
+        self.assertIn("Land use is modest.", bodies["Environmental Impact"])
+        self.assertIn("Water scarcity", bodies["Risk Assessment and Mitigation"])
+
+    def test_skipped_narrative_sections_are_noted(self):
+        class Partial(CannedReport):
+            def _narrative_stream(self):
+                yield "## Executive Summary\nShort.\n## Environmental Impact\nModest.\n"
+
+        bodies = _section_bodies(Partial(REPORT_DATA, "").render())
+
+        self.assertIn("not covered", bodies["Economic Viability"])
+        self.assertIn("not covered", bodies["Infrastructure Requirements"])
+        self.assertIn("Modest.", bodies["Environmental Impact"])
+
+
+if __name__ == '__main__':
+    unittest.main()
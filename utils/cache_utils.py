@@ -0,0 +1,537 @@
+# cache_utils.py
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from utils.text_utils import char_ngrams, jaccard, tokenize
+
+# Returned by get() on a miss, so cached falsy values are still hits
+MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe in-process cache with a per-entry TTL and LRU eviction"""
+
+    def __init__(self, maxsize=1024, ttl=3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl
+        }
+
+
+class SqliteTTLCache:
+    """
+    On-disk cache shared by every worker process on the host. Values are
+    stored as JSON, expire after their TTL, and the least recently used rows
+    are evicted once the table grows past maxsize.
+    """
+
+    def __init__(self, path, maxsize=10000, ttl=3600.0, table='cache'):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (accessed_at)")
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key, default=MISSING):
+        now = time.time()
+        try:
+            with self._connection() as connection:
+                row = connection.execute(f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[1] > now:
+                    connection.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+                    self.hits += 1
+                    return json.loads(row[0])
+                if row is not None:
+                    connection.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            print(f"[ERROR] Cache read from {self.path} failed: {e}")
+        self.misses += 1
+        return default
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        try:
+            with self._connection() as connection:
+                connection.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), expires_at, now)
+                )
+                connection.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f"SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.maxsize,)
+                )
+        except sqlite3.Error as e:
+            print(f"[ERROR] Cache write to {self.path} failed: {e}")
+
+    def delete(self, key):
+        with self._connection() as connection:
+            connection.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute(f"DELETE FROM {self.table}")
+
+    def __len__(self):
+        return self._connection().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl
+        }
+
+
+class TieredCache:
+    """
+    In-process cache in front of an optional shared cache. Shared hits are
+    copied into the local tier; writes go to both.
+    """
+
+    def __init__(self, local, shared=None):
+        self.local = local
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=MISSING):
+        value = self.local.get(key)
+        if value is MISSING and self.shared is not None:
+            value = self.shared.get(key)
+            if value is not MISSING:
+                self.local.set(key, value)
+        if value is MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.local.set(key, value, ttl)
+        if self.shared is not None:
+            self.shared.set(key, value, ttl)
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "local": self.local.stats(),
+            "shared": self.shared.stats() if self.shared is not None else None
+        }
+
+
+class NearDuplicateCache:
+    """
+    In-process cache for answers to short texts such as questions, looked up
+    within a scope (e.g. one report). A lookup hits when an entry in the same
+    scope has character trigram Jaccard similarity of at least `threshold`
+    and mentions the same numbers, so "100 MW" never matches "200 MW".
+    Texts with fewer than `min_ngrams` trigrams (e.g. "why?", which is all
+    stopwords) carry too little to match on and are never looked up or
+    stored. Entries expire after their TTL and the least recently used are
+    evicted past maxsize. Near-misses (within 0.1 below the threshold) are
+    counted to help tune it.
+    """
+
+    def __init__(self, maxsize=2048, ttl=86400.0, threshold=0.8, min_ngrams=5):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self.min_ngrams = min_ngrams
+        self.skipped = 0
+        self.hits = 0
+        self.near_hits = 0
+        self.near_misses = 0
+        self.misses = 0
+        self._near_similarity = 0.0
+        self._entries = OrderedDict()  # id -> (scope, ngrams, numbers, value, expires_at)
+        self._scopes = {}  # scope -> ids of its entries
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _features(text):
+        return char_ngrams(text), frozenset(token for token in tokenize(text) if token.isdigit())
+
+    def _remove(self, entry_id):
+        scope = self._entries.pop(entry_id)[0]
+        ids = self._scopes[scope]
+        ids.discard(entry_id)
+        if not ids:
+            del self._scopes[scope]
+
+    def _best_match(self, scope, ngrams, numbers, now):
+        best_id, best_similarity = None, 0.0
+        for entry_id in list(self._scopes.get(scope, ())):
+            _, entry_ngrams, entry_numbers, _, expires_at = self._entries[entry_id]
+            if expires_at <= now:
+                self._remove(entry_id)
+                continue
+            if entry_numbers != numbers:
+                continue
+            similarity = jaccard(ngrams, entry_ngrams)
+            if similarity > best_similarity:
+                best_id, best_similarity = entry_id, similarity
+        return best_id, best_similarity
+
+    def get(self, scope, text, default=MISSING):
+        ngrams, numbers = self._features(text)
+        if len(ngrams) < self.min_ngrams:
+            self.skipped += 1
+            return default
+        with self._lock:
+            entry_id, similarity = self._best_match(scope, ngrams, numbers, time.time())
+            if entry_id is not None and similarity >= self.threshold:
+                self._entries.move_to_end(entry_id)
+                self.hits += 1
+                if similarity < 1.0:
+                    self.near_hits += 1
+                    self._near_similarity += similarity
+                return self._entries[entry_id][3]
+            self.misses += 1
+            if similarity >= self.threshold - 0.1:
+                self.near_misses += 1
+            return default
+
+    def set(self, scope, text, value, ttl=None):
+        ngrams, numbers = self._features(text)
+        if len(ngrams) < self.min_ngrams:
+            return
+        now = time.time()
+        with self._lock:
+            entry_id, similarity = self._best_match(scope, ngrams, numbers, now)
+            if entry_id is not None and similarity == 1.0:
+                self._remove(entry_id)
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (scope, ngrams, numbers, value, now + (self.ttl if ttl is None else ttl))
+            self._scopes.setdefault(scope, set()).add(entry_id)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "hits": self.hits,
+            "nearHits": self.near_hits,
+            "nearMisses": self.near_misses,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "averageNearHitSimilarity": round(self._near_similarity / self.near_hits, 4) if self.near_hits else None,
+            "size": len(self),
+            "scopes": len(self._scopes),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "threshold": self.threshold
+        }
+
+
+def _canonical(value):
+    if isinstance(value, dict):
+        return {str(k).strip(): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, float):
+        return round(value, 6)
+    return value
+
+
+def content_hash(payload, version):
+    """
+    SHA-256 of a JSON-like payload after canonicalization (sorted keys,
+    collapsed whitespace, rounded floats), salted with a template version
+    """
+    canonical = json.dumps(_canonical(payload), sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(f"{version}\n{canonical}".encode('utf-8')).hexdigest()
+
+
+class ReportCache:
+    """
+    Content-addressed store for generated reports, kept in the report_cache
+    table next to chat_sessions. Entries older than max_age are ignored and
+    pruned on the next write.
+    """
+
+    def __init__(self, db_manager, prompt_version, max_age):
+        self.db_manager = db_manager
+        self.prompt_version = prompt_version
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._table_ready = False
+
+    def _ensure_table(self):
+        if not self._table_ready:
+            self._table_ready = self.db_manager.create_report_cache_table()
+        return self._table_ready
+
+    def key(self, report_inputs):
+        return content_hash(report_inputs, self.prompt_version)
+
+    def get(self, key):
+        row = self.db_manager.get_cached_report(key, self.max_age) if self._ensure_table() else None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row['report']
+
+    def set(self, key, location, report):
+        if self._ensure_table():
+            self.db_manager.save_cached_report(key, self.prompt_version, location, report, self.max_age)
+
+    def invalidate(self, key=None):
+        return self.db_manager.invalidate_cached_reports(key) if self._ensure_table() else 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": "database",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "promptVersion": self.prompt_version,
+            "maxAge": self.max_age
+        }
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # Items produced so far by a streaming flight
+        self.items = []
+        self.changed = threading.Condition()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the
+    function and everyone who arrives while it is in flight waits for and
+    shares its result (or exception). stream() does the same for iterators,
+    passing every item to every caller as it is produced. Per-key counters of
+    calls and saved upstream computations are kept for the most recent
+    max_keys keys. Keys used with do() and stream() must not overlap.
+    """
+
+    def __init__(self, max_keys=256):
+        self.max_keys = max_keys
+        self.calls = 0
+        self.saved = 0
+        self._flights = {}
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _count(self, key, label, saved):
+        self.calls += 1
+        self.saved += saved
+        entry = self._keys.get(key)
+        if entry is None:
+            label = " ".join(label.split())[:80] if label else None
+            entry = self._keys[key] = {"label": label, "calls": 0, "saved": 0}
+        self._keys.move_to_end(key)
+        entry["calls"] += 1
+        entry["saved"] += saved
+        while len(self._keys) > self.max_keys:
+            self._keys.popitem(last=False)
+
+    def do(self, key, fn, label=None):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            self._count(key, label, 0 if leader else 1)
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stream(self, key, fn, label=None):
+        """
+        Streaming form of do(): fn() returns an iterator that is consumed once,
+        on a background thread, while every caller with the same key receives
+        all of its items from the start. Returns the iterator's return value.
+        The run finishes even if the callers stop reading.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            self._count(key, label, 0 if leader else 1)
+
+        if leader:
+            threading.Thread(target=self._produce, args=(key, flight, fn), daemon=True).start()
+
+        sent = 0
+        while True:
+            with flight.changed:
+                while sent == len(flight.items) and not flight.done.is_set():
+                    flight.changed.wait()
+                items = flight.items[sent:]
+                finished = flight.done.is_set()
+            sent += len(items)
+            yield from items
+            if finished:
+                break
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def _produce(self, key, flight, fn):
+        try:
+            iterator = iter(fn())
+            while True:
+                try:
+                    item = next(iterator)
+                except StopIteration as stop:
+                    flight.result = stop.value
+                    break
+                with flight.changed:
+                    flight.items.append(item)
+                    flight.changed.notify_all()
+        except BaseException as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                del self._flights[key]
+            with flight.changed:
+                flight.done.set()
+                flight.changed.notify_all()
+
+    def stats(self, top=20):
+        with self._lock:
+            keys = sorted(self._keys.items(), key=lambda item: item[1]["saved"], reverse=True)[:top]
+            return {
+                "calls": self.calls,
+                "saved": self.saved,
+                "inFlight": len(self._flights),
+                "keys": [dict(entry, key=key[:12]) for key, entry in keys]
+            }
+
+
+def build_cache(prefix, maxsize, ttl, table):
+    """
+    Build a TieredCache from <prefix>_BACKEND ('memory' or 'sqlite') and
+    <prefix>_PATH environment variables.
+    """
+    local = TTLCache(maxsize=maxsize, ttl=ttl)
+    shared = None
+    if os.getenv(f"{prefix}_BACKEND", "memory").lower() == "sqlite":
+        default_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'llm_cache.sqlite3')
+        shared = SqliteTTLCache(os.getenv(f"{prefix}_PATH", default_path), maxsize=maxsize * 4, ttl=ttl, table=table)
+    return TieredCache(local, shared)
@@ -1,9 +1,47 @@
 # database_utils.py
 import mysql.connector
 from mysql.connector import Error
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
 
+REPORT_CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS report_cache (
+        cache_key CHAR(64) PRIMARY KEY,
+        prompt_version VARCHAR(16) NOT NULL,
+        location VARCHAR(255),
+        report MEDIUMTEXT NOT NULL,
+        created_at DATETIME NOT NULL
+    )
+"""
+
+REPORT_JOBS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS report_jobs (
+        id CHAR(32) PRIMARY KEY,
+        dedupe_key CHAR(64) NOT NULL,
+        status VARCHAR(16) NOT NULL,
+        stage VARCHAR(32),
+        progress TEXT,
+        payload MEDIUMTEXT NOT NULL,
+        result MEDIUMTEXT,
+        session_id INT,
+        error TEXT,
+        created_at DATETIME NOT NULL,
+        updated_at DATETIME NOT NULL
+    )
+"""
+
+SESSION_SUMMARIES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS session_summaries (
+        session_id INT PRIMARY KEY,
+        summary TEXT NOT NULL,
+        message_count INT NOT NULL,
+        updated_at DATETIME NOT NULL
+    )
+"""
+
+# Columns update_report_job may set
+REPORT_JOB_FIELDS = ('status', 'stage', 'progress', 'result', 'session_id', 'error')
+
 class DatabaseManager:
     def __init__(self):
         # Get configuration from environment variables directly
@@ -259,6 +297,340 @@ class DatabaseManager:
             if connection:
                 connection.rollback()
             return False
+        finally:
+            if connection and connection.is_connected():
+                cursor.close()
+                connection.close()
+    
+    def create_report_cache_table(self):
+        """Create the report_cache table if it does not exist"""
+        connection = self.get_connection()
+        if not connection:
+            return False
+            
+        try:
+            cursor = connection.cursor()
+            cursor.execute(REPORT_CACHE_SCHEMA)
+            connection.commit()
+            return True
+            
+        except Error as e:
+            print(f"Error creating report cache table: {e}")
+            return False
+        finally:
+            if connection and connection.is_connected():
+                cursor.close()
+                connection.close()
+    
+    def get_cached_report(self, cache_key, max_age_seconds):
+        """Get a cached report newer than max_age_seconds, or None"""
+        connection = self.get_connection()
+        if not connection:
+            return None
+            
+        try:
+            cursor = connection.cursor(dictionary=True)
+            query = """
+                SELECT cache_key, prompt_version, location, report, created_at
+                FROM report_cache
+                WHERE cache_key = %s AND created_at >= %s
+            """
+            cursor.execute(query, (cache_key, datetime.now() - timedelta(seconds=max_age_seconds)))
+            return cursor.fetchone()
+            
+        except Error as e:
+            print(f"Error getting cached report: {e}")
+            return None
+        finally:
+            if connection and connection.is_connected():
+                cursor.close()
+                connection.close()
+    
+    def save_cached_report(self, cache_key, prompt_version, location, report, max_age_seconds):
+        """Store a generated report and drop entries older than max_age_seconds"""
+        connection = self.get_connection()
+        if not connection:
+            return False
+            
+        try:
+            cursor = connection.cursor()
+            now = datetime.now()
+            cursor.execute("DELETE FROM report_cache WHERE created_at < %s", (now - timedelta(seconds=max_age_seconds),))
+            query = """
+                REPLACE INTO report_cache (cache_key, prompt_version, location, report, created_at)
+                VALUES (%s, %s, %s, %s, %s)
+            """
+            cursor.execute(query, (cache_key, prompt_version, location, report, now))
+            connection.commit()
+            return True
+            
+        except Error as e:
+            print(f"Error saving cached report: {e}")
+            if connection:
+                connection.rollback()
+            return False
+        finally:
+            if connection and connection.is_connected():
+                cursor.close()
+                connection.close()
+    
+    def invalidate_cached_reports(self, cache_key=None):
+        """Delete one cached report, or all of them when no key is given"""
+        connection = self.get_connection()
+        if not connection:
+            return 0
+            
+        try:
+            cursor = connection.cursor()
+            if cache_key:
+                cursor.execute("DELETE FROM report_cache WHERE cache_key = %s", (cache_key,))
+            else:
+                cursor.execute("DELETE FROM report_cache")
+            connection.commit()
+            return cursor.rowcount
+            
+        except Error as e:
+            print(f"Error invalidating cached reports: {e}")
+            if connection:
+                connection.rollback()
+            return 0
+        finally:
+            if connection and connection.is_connected():
+                cursor.close()
+                connection.close()
+    
+    def create_report_jobs_table(self):
+        """Create the report_jobs table if it does not exist"""
+        connection = self.get_connection()
+        if not connection:
+            return False
+            
+        try:
+            cursor = connection.cursor()
+            cursor.execute(REPORT_JOBS_SCHEMA)
+            connection.commit()
+            return True
+            
+        except Error as e:
+            print(f"Error creating report jobs table: {e}")
+            return False
+        finally:
+            if connection and connection.is_connected():
+                cursor.close()
+                connection.close()
+    
+    def create_report_job(self, job_id, dedupe_key, payload):
+        """Insert a queued report job; payload is a JSON string"""
+        connection = self.get_connection()
+        if not connection:
+            return False
+            
+        try:
+            cursor = connection.cursor()
+            query = """
+                INSERT INTO report_jobs (id, dedupe_key, status, payload, created_at, updated_at)
+                VALUES (%s, %s, 'queued', %s, %s, %s)
+            """
+            now = datetime.now()
+            cursor.execute(query, (job_id, dedupe_key, payload, now, now))
+            connection.commit()
+            return True
+            
+        except Error as e:
+            print(f"Error creating report job: {e}")
+            if connection:
+                connection.rollback()
+            return False
+        finally:
+            if connection and connection.is_connected():
+                cursor.close()
+                connection.close()
+    
+    def claim_report_job(self, job_id, stale_before):
+        """
+        Mark a job as running if it is queued, or running but not updated
+        since stale_before (its worker died). Returns True if this caller won it.
+        """
+        connection = self.get_connection()
+        if not connection:
+            return False
+            
+        try:
+            cursor = connection.cursor()
+            query = """
+                UPDATE report_jobs
+                SET status = 'running', updated_at = %s
+                WHERE id = %s AND (status = 'queued' OR (status = 'running' AND updated_at < %s))
+            """
+            cursor.execute(query, (datetime.now(), job_id, stale_before))
+            connection.commit()
+            return cursor.rowcount > 0
+            
+        except Error as e:
+            print(f"Error claiming report job: {e}")
+            if connection:
+                connection.rollback()
+            return False
+        finally:
+            if connection and connection.is_connected():
+                cursor.close()
+                connection.close()
+    
+    def update_report_job(self, job_id, fields):
+        """Update the given REPORT_JOB_FIELDS of a job and bump updated_at"""
+        connection = self.get_connection()
+        if not connection:
+            return False
+            
+        try:
+            cursor = connection.cursor()
+            columns = [column for column in REPORT_JOB_FIELDS if column in fields]
+            assignments = ", ".join(f"{column} = %s" for column in columns + ['updated_at'])
+            values = [fields[column] for column in columns] + [datetime.now(), job_id]
+            cursor.execute(f"UPDATE report_jobs SET {assignments} WHERE id = %s", tuple(values))
+            connection.commit()
+            return True
+            
+        except Error as e:
+            print(f"Error updating report job: {e}")
+            if connection:
+                connection.rollback()
+            return False
+        finally:
+            if connection and connection.is_connected():
+                cursor.close()
+                connection.close()
+    
+    def get_report_job(self, job_id):
+        """Get a report job by ID"""
+        connection = self.get_connection()
+        if not connection:
+            return None
+            
+        try:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute("SELECT * FROM report_jobs WHERE id = %s", (job_id,))
+            return cursor.fetchone()
+            
+        except Error as e:
+            print(f"Error getting report job: {e}")
+            return None
+        finally:
+            if connection and connection.is_connected():
+                cursor.close()
+                connection.close()
+    
+    def find_active_report_job(self, dedupe_key):
+        """Get the id of a queued or running job with this dedupe key, or None"""
+        connection = self.get_connection()
+        if not connection:
+            return None
+            
+        try:
+            cursor = connection.cursor()
+            query = """
+                SELECT id FROM report_jobs
+                WHERE dedupe_key = %s AND status IN ('queued', 'running')
+                ORDER BY created_at DESC
+                LIMIT 1
+            """
+            cursor.execute(query, (dedupe_key,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+            
+        except Error as e:
+            print(f"Error finding active report job: {e}")
+            return None
+        finally:
+            if connection and connection.is_connected():
+                cursor.close()
+                connection.close()
+    
+    def get_resumable_report_jobs(self, stale_before):
+        """Get queued jobs and running jobs whose worker stopped updating them"""
+        connection = self.get_connection()
+        if not connection:
+            return []
+            
+        try:
+            cursor = connection.cursor(dictionary=True)
+            query = """
+                SELECT id, dedupe_key, payload FROM report_jobs
+                WHERE status = 'queued' OR (status = 'running' AND updated_at < %s)
+                ORDER BY created_at ASC
+            """
+            cursor.execute(query, (stale_before,))
+            return cursor.fetchall()
+            
+        except Error as e:
+            print(f"Error getting resumable report jobs: {e}")
+            return []
+        finally:
+            if connection and connection.is_connected():
+                cursor.close()
+                connection.close()
+    
+    def create_session_summaries_table(self):
+        """Create the session_summaries table if it does not exist"""
+        connection = self.get_connection()
+        if not connection:
+            return False
+            
+        try:
+            cursor = connection.cursor()
+            cursor.execute(SESSION_SUMMARIES_SCHEMA)
+            connection.commit()
+            return True
+            
+        except Error as e:
+            print(f"Error creating session summaries table: {e}")
+            return False
+        finally:
+            if connection and connection.is_connected():
+                cursor.close()
+                connection.close()
+    
+    def get_session_summary(self, session_id):
+        """Get the rolling summary of a session and how many messages it covers"""
+        connection = self.get_connection()
+        if not connection:
+            return None
+            
+        try:
+            cursor = connection.cursor(dictionary=True)
+            query = "SELECT summary, message_count FROM session_summaries WHERE session_id = %s"
+            cursor.execute(query, (session_id,))
+            return cursor.fetchone()
+            
+        except Error as e:
+            print(f"Error getting session summary: {e}")
+            return None
+        finally:
+            if connection and connection.is_connected():
+                cursor.close()
+                connection.close()
+    
+    def save_session_summary(self, session_id, summary, message_count):
+        """Store the rolling summary covering the first message_count messages"""
+        connection = self.get_connection()
+        if not connection:
+            return False
+            
+        try:
+            cursor = connection.cursor()
+            query = """
+                REPLACE INTO session_summaries (session_id, summary, message_count, updated_at)
+                VALUES (%s, %s, %s, %s)
+            """
+            cursor.execute(query, (session_id, summary, message_count, datetime.now()))
+            connection.commit()
+            return True
+            
+        except Error as e:
+            print(f"Error saving session summary: {e}")
+            if connection:
+                connection.rollback()
+            return False
         finally:
             if connection and connection.is_connected():
                 cursor.close()
@@ -0,0 +1,68 @@
+# geo_utils.py
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def to_unit_xyz(lat, lon):
+    """Convert lat/lon in degrees to (n x 3) points on the unit sphere"""
+    lat = np.radians(np.atleast_1d(np.asarray(lat, dtype=np.float64)))
+    lon = np.radians(np.atleast_1d(np.asarray(lon, dtype=np.float64)))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def chord_to_km(chord):
+    """Convert a straight-line distance on the unit sphere to a great-circle distance in km"""
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2.0, 0.0, 1.0))
+
+
+def km_to_chord(km):
+    """Convert a great-circle distance in km to a straight-line distance on the unit sphere"""
+    angle = np.minimum(np.asarray(km, dtype=np.float64) / EARTH_RADIUS_KM, np.pi)
+    return 2.0 * np.sin(angle / 2.0)
+
+
+class HubIndex:
+    """
+    Spatial index over hub coordinates.
+
+    Points are stored as a KD-tree on unit-sphere coordinates. The straight-line
+    (chord) distance there is monotonic in the great-circle distance, so tree
+    lookups are exact and the chord is converted back to km for the caller.
+    """
+
+    def __init__(self, lat, lon):
+        self.size = len(np.atleast_1d(lat))
+        self.tree = cKDTree(to_unit_xyz(lat, lon))
+
+    def __len__(self):
+        return self.size
+
+    def nearest(self, lat, lon):
+        """Return (row, distance_km) of the hub closest to a point"""
+        chord, row = self.tree.query(to_unit_xyz(lat, lon)[0])
+        return int(row), float(chord_to_km(chord))
+
+    def nearest_many(self, lats, lons):
+        """Return (rows, distances_km) arrays of the closest hub for every point"""
+        chord, rows = self.tree.query(to_unit_xyz(lats, lons))
+        return rows, chord_to_km(chord)
+
+    def k_nearest(self, lat, lon, k):
+        """Return up to k (row, distance_km) pairs ordered by distance"""
+        k = max(1, min(int(k), self.size))
+        chord, rows = self.tree.query(to_unit_xyz(lat, lon)[0], k=k)
+        chord, rows = np.atleast_1d(chord), np.atleast_1d(rows)
+        return [(int(r), float(d)) for r, d in zip(rows, chord_to_km(chord))]
+
+    def within_radius(self, lat, lon, radius_km):
+        """Return every (row, distance_km) pair within radius_km, ordered by distance"""
+        point = to_unit_xyz(lat, lon)[0]
+        rows = np.asarray(self.tree.query_ball_point(point, float(km_to_chord(radius_km))), dtype=np.intp)
+        if not len(rows):
+            return []
+        distances = chord_to_km(np.linalg.norm(self.tree.data[rows] - point, axis=1))
+        order = np.argsort(distances, kind='stable')
+        return [(int(rows[i]), float(distances[i])) for i in order]
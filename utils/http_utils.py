@@ -0,0 +1,290 @@
+# http_utils.py
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class LatencyStats:
+    """Request counters and latency percentiles over the last `window` calls"""
+
+    def __init__(self, window=1024):
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok=True):
+        with self._lock:
+            self.count += 1
+            self.errors += 0 if ok else 1
+            self._samples.append(seconds)
+
+    def stats(self):
+        with self._lock:
+            samples = sorted(self._samples)
+
+        def percentile(p):
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000.0, 2)
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "retries": self.retries,
+            "p50Ms": percentile(0.50),
+            "p95Ms": percentile(0.95),
+            "p99Ms": percentile(0.99)
+        }
+
+
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+
+
+def upstream_stats(name):
+    """The shared LatencyStats for an upstream, created on first use"""
+    with _upstreams_lock:
+        if name not in _upstreams:
+            _upstreams[name] = LatencyStats()
+        return _upstreams[name]
+
+
+def all_upstream_stats():
+    with _upstreams_lock:
+        names = list(_upstreams)
+    return {name: upstream_stats(name).stats() for name in names}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream after `failure_threshold` consecutive failures.
+    While open, calls fail fast; after `reset_timeout` seconds the breaker is
+    half-open and lets `half_open_probes` calls through. A successful probe
+    closes it, a failed one opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, half_open_probes=1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.state = self.CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self.opened_at = None
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go through now; callers must then record its outcome"""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probes = 0
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"[INFO] Circuit for {self.name} closed")
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def release(self):
+        """Give back a call's slot without an outcome, e.g. when the caller's own deadline cut it short"""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                print(f"[WARN] Circuit for {self.name} opened after {self.failures} consecutive failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 1)
+            return {
+                "state": self.state,
+                "consecutiveFailures": self.failures,
+                "rejected": self.rejected,
+                "retryInSeconds": retry_in
+            }
+
+
+_breakers = {}
+
+
+def circuit_breaker(name, failure_threshold=5, reset_timeout=30.0):
+    """The shared CircuitBreaker for an upstream, created on first use"""
+    with _upstreams_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, failure_threshold, reset_timeout)
+        return _breakers[name]
+
+
+def all_breaker_stats():
+    with _upstreams_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
+
+
+class Deadline:
+    """
+    Wall-clock budget for one request, passed down through its stages. Each
+    stage caps its own timeouts with cap(), skips work that no longer fits,
+    and records what it cut short with degrade().
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.degraded = []
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0.0
+
+    def cap(self, timeout, reserve=0.0):
+        """`timeout`, shortened so that `reserve` seconds are left for later stages"""
+        return max(0.0, min(timeout, self.remaining() - reserve))
+
+    def degrade(self, stage):
+        if stage not in self.degraded:
+            self.degraded.append(stage)
+
+
+def backoff_delay(attempt, base=0.25, cap=4.0):
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _retry_after(response, cap):
+    try:
+        return min(cap, float(response.headers.get('Retry-After')))
+    except (TypeError, ValueError):
+        return None
+
+
+class UpstreamSession:
+    """
+    A keep-alive requests.Session for one upstream, with default timeouts,
+    jittered retries on 429/5xx and connection failures, and latency stats.
+    Read timeouts are not retried, since the upstream may have acted on the
+    request. Calls that must not be repeated pass retries=0. With a breaker,
+    calls raise CircuitOpenError while it is open.
+    """
+
+    def __init__(self, name, timeout=(3.05, 10.0), retries=1, backoff=0.25, backoff_cap=4.0, pool_size=16, breaker=None):
+        self.name = name
+        self.breaker = breaker
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_cap = backoff_cap
+        self.stats = upstream_stats(name)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, url, retries=None, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        retries = self.retries if retries is None else retries
+        attempt = 0
+        while True:
+            if self.breaker is not None and not self.breaker.allow():
+                raise CircuitOpenError(f"Circuit for {self.name} is open")
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.ConnectionError:
+                self._record(start, ok=False)
+                if attempt >= retries:
+                    raise
+                delay = backoff_delay(attempt, self.backoff, self.backoff_cap)
+            except requests.exceptions.RequestException:
+                self._record(start, ok=False)
+                raise
+            else:
+                self._record(start, ok=response.status_code not in RETRY_STATUSES)
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return response
+                delay = _retry_after(response, self.backoff_cap)
+                if delay is None:
+                    delay = backoff_delay(attempt, self.backoff, self.backoff_cap)
+                response.close()
+            self.stats.retries += 1
+            attempt += 1
+            time.sleep(delay)
+
+    def _record(self, start, ok):
+        self.stats.record(time.perf_counter() - start, ok)
+        if self.breaker is not None:
+            if ok:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+
+class TimedTransport(httpx.HTTPTransport):
+    """httpx transport that records time-to-headers per request in LatencyStats"""
+
+    def __init__(self, name, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = upstream_stats(name)
+
+    def handle_request(self, request):
+        start = time.perf_counter()
+        try:
+            response = super().handle_request(request)
+        except httpx.TransportError:
+            self.stats.record(time.perf_counter() - start, ok=False)
+            raise
+        self.stats.record(time.perf_counter() - start, ok=response.status_code < 500)
+        return response
+
+
+def pooled_httpx_client(name, timeout=60.0, connect_timeout=5.0, pool_size=16):
+    """A keep-alive httpx.Client whose requests are timed under `name`"""
+    return httpx.Client(
+        transport=TimedTransport(name, limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)),
+        timeout=httpx.Timeout(timeout, connect=connect_timeout)
+    )
@@ -0,0 +1,303 @@
+# hub_data.py
+"""
+Columnar, memory-mapped storage for the hub table.
+
+The source of truth is a CSV (one row per hub) plus JSON files of state
+policies and of the policy uplift each state's projections assume.
+`build_hub_store` converts them into a directory of .npy columns:
+
+    <store>/CURRENT              -> {"version": "<hash>"}
+    <store>/<version>/names.npy  (unicode)
+    <store>/<version>/states.npy (unicode)
+    <store>/<version>/lat.npy, lon.npy (float64)
+    <store>/<version>/factors.npy      (float64, hubs x FACTORS)
+    <store>/<version>/policies.json
+    <store>/<version>/policy_uplift.json
+    <store>/<version>/manifest.json
+
+Workers open the columns with mmap, so the pages are shared through the OS
+page cache instead of every worker parsing and holding its own copy.
+Publishing a new version only swaps the small CURRENT pointer, which workers
+notice and reload without a restart.
+
+Offline build:
+
+    python -m utils.hub_data data/hubs.csv --policies data/state_policies.json --uplift data/policy_uplift.json --out data/hubs
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds are not serialized, the publish below still tolerates races
+    fcntl = None
+
+from utils.scoring_utils import FACTORS, ScoringEngine
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CSV_PATH = os.path.join(PROJECT_ROOT, 'data', 'hubs.csv')
+DEFAULT_POLICIES_PATH = os.path.join(PROJECT_ROOT, 'data', 'state_policies.json')
+DEFAULT_UPLIFT_PATH = os.path.join(PROJECT_ROOT, 'data', 'policy_uplift.json')
+DEFAULT_STORE_DIR = os.path.join(PROJECT_ROOT, 'data', 'hubs')
+
+# Old versions kept around so workers still mapping them are unaffected
+KEEP_VERSIONS = 2
+
+
+def _read_csv_columns(csv_path):
+    names, states, lat, lon, factors = [], [], [], [], []
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            names.append(row['name'].strip())
+            states.append(row['state'].strip())
+            lat.append(float(row['lat']))
+            lon.append(float(row['lon']))
+            factors.append([float(row[factor]) for factor in FACTORS])
+    return {
+        'names': np.array(names, dtype=str),
+        'states': np.array(states, dtype=str),
+        'lat': np.array(lat, dtype=np.float64),
+        'lon': np.array(lon, dtype=np.float64),
+        'factors': np.array(factors, dtype=np.float64).reshape(len(names), len(FACTORS))
+    }
+
+
+@contextmanager
+def _store_lock(store_dir):
+    """Exclusive lock on the store, so workers booting together build and publish one at a time"""
+    os.makedirs(store_dir, exist_ok=True)
+    with open(os.path.join(store_dir, '.lock'), 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_json(path):
+    if path and os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def build_hub_store(csv_path=DEFAULT_CSV_PATH, policies_path=DEFAULT_POLICIES_PATH, store_dir=DEFAULT_STORE_DIR, uplift_path=DEFAULT_UPLIFT_PATH):
+    """Convert the hub CSV and policy JSON files into a new store version and publish it"""
+    with _store_lock(store_dir):
+        return _build_hub_store(csv_path, policies_path, store_dir, uplift_path)
+
+
+def _build_hub_store(csv_path, policies_path, store_dir, uplift_path):
+    columns = _read_csv_columns(csv_path)
+    policies = _read_json(policies_path)
+    policy_uplift = {state: float(uplift) for state, uplift in _read_json(uplift_path).items()}
+
+    digest = hashlib.sha1()
+    for key in ('names', 'states', 'lat', 'lon', 'factors'):
+        digest.update(np.ascontiguousarray(columns[key]).tobytes())
+    digest.update(json.dumps(policies, sort_keys=True).encode('utf-8'))
+    digest.update(json.dumps(policy_uplift, sort_keys=True).encode('utf-8'))
+    version = digest.hexdigest()[:16]
+
+    os.makedirs(store_dir, exist_ok=True)
+    version_dir = os.path.join(store_dir, version)
+    if not os.path.isdir(version_dir):
+        tmp_dir = tempfile.mkdtemp(prefix='.build-', dir=store_dir)
+        for key, array in columns.items():
+            np.save(os.path.join(tmp_dir, f"{key}.npy"), array)
+        with open(os.path.join(tmp_dir, 'policies.json'), 'w', encoding='utf-8') as f:
+            json.dump(policies, f)
+        with open(os.path.join(tmp_dir, 'policy_uplift.json'), 'w', encoding='utf-8') as f:
+            json.dump(policy_uplift, f)
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': version,
+                'rows': len(columns['names']),
+                'factors': list(FACTORS),
+                'source': os.path.basename(csv_path),
+                'built_at': datetime.now().isoformat()
+            }, f)
+        try:
+            os.replace(tmp_dir, version_dir)
+        except OSError:
+            # Another builder published the same version first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not os.path.isdir(version_dir):
+                raise
+
+    # Publish by atomically swapping the CURRENT pointer
+    pointer_tmp = os.path.join(store_dir, f".CURRENT.{os.getpid()}")
+    with open(pointer_tmp, 'w', encoding='utf-8') as f:
+        json.dump({'version': version}, f)
+    os.replace(pointer_tmp, os.path.join(store_dir, 'CURRENT'))
+
+    _prune_versions(store_dir, keep=version)
+    return version
+
+
+def _prune_versions(store_dir, keep):
+    versions = [
+        name for name in os.listdir(store_dir)
+        if name != keep and not name.startswith('.') and os.path.isdir(os.path.join(store_dir, name))
+    ]
+    versions.sort(key=lambda name: os.path.getmtime(os.path.join(store_dir, name)), reverse=True)
+    for name in versions[KEEP_VERSIONS - 1:]:
+        shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
+
+
+class HubDataset:
+    """
+    One immutable snapshot of the hub table with its scoring engine and
+    spatial index. Request handlers take a snapshot once and use it
+    throughout, so a reload never mixes two versions within a request.
+    """
+
+    def __init__(self, columns, policies, version, policy_uplift=None):
+        self.version = version
+        self.policies = policies
+        # Versions built before the uplift was stored have none; projections
+        # then use their built-in defaults
+        self.policy_uplift = policy_uplift or {}
+        # Imported here so modules that only hold a HubStore don't load scipy until a dataset is built
+        from utils.geo_utils import HubIndex
+        self.engine = ScoringEngine(columns['names'], columns['states'], columns['lat'], columns['lon'], columns['factors'])
+        self.index = HubIndex(self.engine.lat, self.engine.lon)
+
+    def __len__(self):
+        return len(self.engine)
+
+    def hub_record(self, row):
+        """Return one hub as the {'lat', 'lon', 'state', <factors>} dict the routes used to read from HUBS"""
+        record = {'lat': float(self.engine.lat[row]), 'lon': float(self.engine.lon[row]), 'state': str(self.engine.states[row])}
+        record.update({factor: float(self.engine.factors[row, f]) for f, factor in enumerate(FACTORS)})
+        return record
+
+    def closest_hub(self, lat, lon):
+        """Return the name, record and great-circle distance in km of the hub nearest to a point"""
+        row, distance_km = self.index.nearest(lat, lon)
+        return str(self.engine.names[row]), self.hub_record(row), distance_km
+
+
+def load_hub_dataset(store_dir, version):
+    version_dir = os.path.join(store_dir, version)
+    columns = {
+        key: np.load(os.path.join(version_dir, f"{key}.npy"), mmap_mode='r')
+        for key in ('names', 'states', 'lat', 'lon', 'factors')
+    }
+    with open(os.path.join(version_dir, 'policies.json'), encoding='utf-8') as f:
+        policies = json.load(f)
+    policy_uplift = _read_json(os.path.join(version_dir, 'policy_uplift.json'))
+    return HubDataset(columns, policies, version, policy_uplift)
+
+
+class HubStore:
+    """
+    Serves the current HubDataset and hot-reloads it when the store's CURRENT
+    pointer changes. The pointer is checked at most every `check_interval`
+    seconds. If the store has never been built, it is built from the CSV.
+    """
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR, csv_path=DEFAULT_CSV_PATH, policies_path=DEFAULT_POLICIES_PATH,
+                 check_interval=5.0, uplift_path=DEFAULT_UPLIFT_PATH):
+        self.store_dir = store_dir
+        self.csv_path = csv_path
+        self.policies_path = policies_path
+        self.uplift_path = uplift_path
+        self.check_interval = check_interval
+        self.reload_callbacks = []
+        self._lock = threading.Lock()
+        self._dataset = None
+        self._pointer_mtime = None
+        self._checked_at = 0.0
+
+    def on_reload(self, callback):
+        """Register a callable run after every reload (e.g. to clear derived caches)"""
+        self.reload_callbacks.append(callback)
+        return callback
+
+    def _pointer_path(self):
+        return os.path.join(self.store_dir, 'CURRENT')
+
+    def current(self):
+        """Return the current dataset, reloading it if a new version was published"""
+        now = time.monotonic()
+        if self._dataset is not None and now - self._checked_at < self.check_interval:
+            return self._dataset
+
+        with self._lock:
+            if self._dataset is not None and now - self._checked_at < self.check_interval:
+                return self._dataset
+            self._checked_at = now
+
+            if not os.path.exists(self._pointer_path()):
+                print(f"[INFO] Hub store not found in {self.store_dir}, building it from {self.csv_path}")
+                build_hub_store(self.csv_path, self.policies_path, self.store_dir, self.uplift_path)
+
+            mtime = os.stat(self._pointer_path()).st_mtime_ns
+            if self._dataset is None or mtime != self._pointer_mtime:
+                with open(self._pointer_path(), encoding='utf-8') as f:
+                    version = json.load(f)['version']
+                if self._dataset is None or version != self._dataset.version:
+                    self._dataset = load_hub_dataset(self.store_dir, version)
+                    for callback in self.reload_callbacks:
+                        callback()
+                self._pointer_mtime = mtime
+
+            return self._dataset
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def shared_hub_store():
+    """
+    Return the process-wide HubStore configured from HUB_STORE_DIR, HUB_CSV_PATH,
+    HUB_POLICIES_PATH, HUB_POLICY_UPLIFT_PATH and HUB_STORE_CHECK_INTERVAL. Creating it is cheap; the
+    store is only built or loaded on the first current() call.
+    """
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = HubStore(
+                store_dir=os.environ.get('HUB_STORE_DIR', DEFAULT_STORE_DIR),
+                csv_path=os.environ.get('HUB_CSV_PATH', DEFAULT_CSV_PATH),
+                policies_path=os.environ.get('HUB_POLICIES_PATH', DEFAULT_POLICIES_PATH),
+                check_interval=float(os.environ.get('HUB_STORE_CHECK_INTERVAL', 5.0)),
+                uplift_path=os.environ.get('HUB_POLICY_UPLIFT_PATH', DEFAULT_UPLIFT_PATH)
+            )
+        return _shared_store
+
+
+def find_closest_hub(user_lat, user_lon, dataset=None):
+    """
+    Looks up the hub closest to the user's clicked point in the spatial index
+    and returns its name, data and great-circle distance in km.
+    """
+    dataset = dataset or shared_hub_store().current()
+    return dataset.closest_hub(user_lat, user_lon)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the memory-mapped hub store from a CSV.")
+    parser.add_argument('csv_path', nargs='?', default=DEFAULT_CSV_PATH)
+    parser.add_argument('--policies', default=DEFAULT_POLICIES_PATH, help="JSON file of {state: [policy, ...]}")
+    parser.add_argument('--uplift', default=DEFAULT_UPLIFT_PATH, help="JSON file of {state: projected policy uplift}")
+    parser.add_argument('--out', default=DEFAULT_STORE_DIR, help="Store directory")
+    args = parser.parse_args()
+
+    built_version = build_hub_store(args.csv_path, args.policies, args.out, args.uplift)
+    print(f"Published hub store version {built_version} to {args.out}")
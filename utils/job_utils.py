@@ -0,0 +1,124 @@
+# job_utils.py
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+
+def _isoformat(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+class JobQueue:
+    """
+    Runs report jobs on a bounded worker pool and keeps their state in the
+    report_jobs table, so status can be polled from any worker and jobs left
+    behind by a restart are picked up again by resume().
+
+    handler(payload, progress) does the work: it calls progress(stage) as
+    each stage starts and returns {"report": ..., "session_id": ...}.
+    """
+
+    def __init__(self, db_manager, handler, max_workers=4, stale_after=300):
+        self.db_manager = db_manager
+        self.handler = handler
+        self.stale_after = stale_after
+        self.deduplicated = 0
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report-job")
+        self._inflight = {}  # dedupe_key -> job_id for jobs queued or running here
+        self._lock = threading.Lock()
+        self._table_ready = False
+
+    def _ensure_table(self):
+        if not self._table_ready:
+            self._table_ready = self.db_manager.create_report_jobs_table()
+        return self._table_ready
+
+    def _stale_before(self):
+        return datetime.now() - timedelta(seconds=self.stale_after)
+
+    def submit(self, payload, dedupe_key):
+        """
+        Queue a job and return (job_id, deduplicated). An identical job that is
+        still queued or running is returned instead of starting a new one.
+        """
+        if not self._ensure_table():
+            raise RuntimeError("Report job storage is unavailable")
+        with self._lock:
+            job_id = self._inflight.get(dedupe_key) or self.db_manager.find_active_report_job(dedupe_key)
+            if job_id:
+                self.deduplicated += 1
+                return job_id, True
+            job_id = uuid.uuid4().hex
+            if not self.db_manager.create_report_job(job_id, dedupe_key, json.dumps(payload)):
+                raise RuntimeError("Could not store the report job")
+            self._inflight[dedupe_key] = job_id
+        self._pool.submit(self._run, job_id, dedupe_key, payload)
+        return job_id, False
+
+    def resume(self):
+        """Re-queue jobs that were queued, or whose worker died mid-run"""
+        if not self._ensure_table():
+            return 0
+        jobs = self.db_manager.get_resumable_report_jobs(self._stale_before())
+        for job in jobs:
+            with self._lock:
+                self._inflight.setdefault(job['dedupe_key'], job['id'])
+            self._pool.submit(self._run, job['id'], job['dedupe_key'], json.loads(job['payload']))
+        if jobs:
+            print(f"[INFO] Resumed {len(jobs)} report jobs")
+        return len(jobs)
+
+    def _run(self, job_id, dedupe_key, payload):
+        try:
+            if not self.db_manager.claim_report_job(job_id, self._stale_before()):
+                return  # finished, or running in another worker
+
+            stages = []
+
+            def progress(stage):
+                now = time.time()
+                if stages:
+                    stages[-1]["seconds"] = round(now - stages[-1]["startedAt"], 3)
+                stages.append({"name": stage, "startedAt": now})
+                self.db_manager.update_report_job(job_id, {"stage": stage, "progress": json.dumps(stages)})
+
+            try:
+                result = self.handler(payload, progress)
+            except Exception as e:
+                print(f"[ERROR] Report job {job_id} failed: {e}")
+                self.db_manager.update_report_job(job_id, {"status": "failed", "error": str(e)})
+                return
+
+            if stages:
+                stages[-1]["seconds"] = round(time.time() - stages[-1]["startedAt"], 3)
+            self.db_manager.update_report_job(job_id, {
+                "status": "done",
+                "stage": None,
+                "progress": json.dumps(stages),
+                "result": result.get("report"),
+                "session_id": result.get("session_id")
+            })
+        finally:
+            with self._lock:
+                if self._inflight.get(dedupe_key) == job_id:
+                    del self._inflight[dedupe_key]
+
+    def status(self, job_id):
+        """The job as a JSON-ready dict, or None if it does not exist"""
+        job = self.db_manager.get_report_job(job_id) if self._ensure_table() else None
+        if job is None:
+            return None
+        return {
+            "job_id": job["id"],
+            "status": job["status"],
+            "stage": job["stage"],
+            "stages": json.loads(job["progress"]) if job["progress"] else [],
+            "session_id": job["session_id"],
+            "error": job["error"],
+            "created_at": _isoformat(job["created_at"]),
+            "updated_at": _isoformat(job["updated_at"]),
+            "report": job["result"]
+        }
@@ -0,0 +1,74 @@
+# projection_utils.py
+from functools import lru_cache
+
+import numpy as np
+
+PROJECTION_YEARS = np.array([2025, 2030, 2035, 2040, 2045, 2050])
+BASE_YEAR = 2025
+
+# Scenario drivers: annual capacity growth rate, annual electrolysis cost decline
+# (passed through to output with COST_ELASTICITY), and a state policy uplift
+# that ramps in over POLICY_RAMP_YEARS. Means are calibrated so the median
+# path stays close to the old fixed multipliers (x3.5 by 2050). The uplift per
+# state comes from the hub store (data/policy_uplift.json); the values below
+# are only the fallback for states or store versions without one.
+CAPACITY_GROWTH = {'mean': 0.038, 'sd': 0.012}
+COST_DECLINE = {'mean': 0.03, 'sd': 0.01}
+COST_ELASTICITY = 0.3
+POLICY_UPLIFT_SD = 0.03
+POLICY_RAMP_YEARS = 10
+DEFAULT_POLICY_UPLIFT = 0.05
+STATE_POLICY_UPLIFT = {
+    'Gujarat': 0.10,
+    'Tamil Nadu': 0.08,
+    'Maharashtra': 0.07,
+    'Odisha': 0.07,
+    'Uttar Pradesh': 0.05
+}
+
+PERCENTILES = (10, 50, 90)
+
+
+class ProjectionEngine:
+    """
+    Scenario-based production projections with uncertainty bands.
+
+    Standard-normal draws for every scenario are made once with a fixed seed.
+    A state's (scenarios x years) multiplier matrix is one vectorized
+    expression over those draws, and its percentiles are cached. Projections
+    scale linearly with the base value, so a request is only a multiply.
+    """
+
+    def __init__(self, n_scenarios=2000, seed=2025):
+        self.n_scenarios = n_scenarios
+        rng = np.random.default_rng(seed)
+        self.draws = rng.standard_normal((3, n_scenarios, 1))
+        self.elapsed = (PROJECTION_YEARS - BASE_YEAR)[None, :].astype(np.float64)
+        self._state_bands = lru_cache(maxsize=None)(self._compute_state_bands)
+
+    def scenario_multipliers(self, state, uplift=None):
+        """Return the (scenarios x years) production multipliers for a state and its mean policy uplift"""
+        if uplift is None:
+            uplift = STATE_POLICY_UPLIFT.get(state, DEFAULT_POLICY_UPLIFT)
+        growth_draw, cost_draw, policy_draw = self.draws
+        growth = CAPACITY_GROWTH['mean'] + CAPACITY_GROWTH['sd'] * growth_draw
+        cost_decline = np.clip(COST_DECLINE['mean'] + COST_DECLINE['sd'] * cost_draw, 0.0, 0.2)
+        uplift = uplift + POLICY_UPLIFT_SD * policy_draw
+
+        capacity = np.exp(growth * self.elapsed)
+        cost = (1.0 - cost_decline) ** (-COST_ELASTICITY * self.elapsed)
+        policy = 1.0 + uplift * np.minimum(self.elapsed / POLICY_RAMP_YEARS, 1.0)
+        return np.maximum(capacity * cost * policy, 0.0)
+
+    def _compute_state_bands(self, state, uplift):
+        bands = np.percentile(self.scenario_multipliers(state, uplift), PERCENTILES, axis=0)
+        bands.setflags(write=False)
+        return bands
+
+    def project(self, base_value, state, uplift=None):
+        """
+        Return {"p10", "p50", "p90"} lists of rounded projected values per
+        year. `uplift` is the state's mean policy uplift from the hub store.
+        """
+        bands = self._state_bands(state, uplift) * base_value
+        return {f"p{p}": [round(v) for v in bands[i]] for i, p in enumerate(PERCENTILES)}
@@ -0,0 +1,169 @@
+# scoring_utils.py
+import hashlib
+
+import numpy as np
+
+# Column order of the hub factor matrix
+FACTORS = ('solar', 'wind', 'gas', 'water', 'infrastructure', 'demand_center', 'transport_logistics')
+
+# Row order of the technology weight matrix
+TECHNOLOGIES = ('SOLAR_BASED', 'ELECTROLYSIS', 'THERMAL')
+
+# Technology weights per factor (each row sums to 1.0, scores stay on the 0-10 scale)
+TECH_WEIGHTS = {
+    'SOLAR_BASED': {'solar': 0.5, 'infrastructure': 0.2, 'demand_center': 0.1, 'water': 0.1, 'transport_logistics': 0.1},
+    'ELECTROLYSIS': {'solar': 0.3, 'wind': 0.3, 'infrastructure': 0.15, 'water': 0.15, 'demand_center': 0.05, 'transport_logistics': 0.05},
+    'THERMAL': {'gas': 0.5, 'demand_center': 0.2, 'transport_logistics': 0.1, 'water': 0.1, 'infrastructure': 0.1}
+}
+
+
+def build_weight_matrix(weights=TECH_WEIGHTS):
+    """Turn a {technology: {factor: weight}} dict into a (technologies x factors) matrix"""
+    matrix = np.zeros((len(TECHNOLOGIES), len(FACTORS)))
+    for t, tech in enumerate(TECHNOLOGIES):
+        for f, factor in enumerate(FACTORS):
+            matrix[t, f] = weights.get(tech, {}).get(factor, 0.0)
+    return matrix
+
+
+def sample_weight_matrices(base_weights, n_samples, concentration, rng):
+    """
+    Draw (samples x technologies x factors) weight matrices from a Dirichlet
+    centred on each technology's weights. Factors a technology ignores stay at
+    zero, and higher concentration means tighter samples around the base.
+    """
+    samples = np.zeros((n_samples,) + base_weights.shape)
+    for t in range(base_weights.shape[0]):
+        active = base_weights[t] > 0
+        if active.any():
+            total = base_weights[t, active].sum()
+            samples[:, t, active] = total * rng.dirichlet(concentration * base_weights[t, active] / total, size=n_samples)
+    return samples
+
+
+class ScoringEngine:
+    """
+    Columnar scoring engine for the hub table.
+
+    Hubs are stored as a (hubs x factors) matrix and the technology weights as a
+    (technologies x factors) matrix, so every technology score for every hub comes
+    from a single matrix product that is computed once when the engine is built.
+    """
+
+    def __init__(self, names, states, lat, lon, factors, weights=TECH_WEIGHTS):
+        # Columns are used as given (no copy), so memory-mapped arrays stay shared
+        self.names = np.asarray(names)
+        self.index = {str(name): i for i, name in enumerate(self.names)}
+        self.states = np.asarray(states)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.factors = np.asarray(factors, dtype=np.float64).reshape(len(self.names), len(FACTORS))
+        self.weights = build_weight_matrix(weights)
+
+        # (hubs x technologies) score table; rounded so float noise from the
+        # matrix product never flips a later round() on the 0-100 scale
+        self.scores = np.round(self.score_factors(self.factors), 9)
+        self.best = self.scores.argmax(axis=1) if len(self.names) else np.empty(0, dtype=np.intp)
+        self.fingerprint = self._fingerprint()
+
+    @classmethod
+    def from_hubs(cls, hubs, weights=TECH_WEIGHTS):
+        """Build an engine from a {name: {'lat', 'lon', 'state', <factors>}} dict"""
+        names = list(hubs.keys())
+        return cls(
+            names,
+            [hubs[name]['state'] for name in names],
+            [hubs[name]['lat'] for name in names],
+            [hubs[name]['lon'] for name in names],
+            [[hubs[name][factor] for factor in FACTORS] for name in names],
+            weights
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def _fingerprint(self):
+        """Short hash of the hub data and weights, used to key derived caches"""
+        digest = hashlib.sha1()
+        for array in (self.names, self.lat, self.lon, self.factors, self.weights):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()[:16]
+
+    def score_factors(self, factors):
+        """Score an arbitrary (n x factors) matrix against every technology at once"""
+        return np.asarray(factors, dtype=np.float64) @ self.weights.T
+
+    def row_scores(self, i):
+        """Return the precomputed {technology: score} dict for the hub at row i"""
+        return {tech: float(self.scores[i, t]) for t, tech in enumerate(TECHNOLOGIES)}
+
+    def hub_scores(self, hub_name):
+        """Return the precomputed {technology: score} dict for a named hub"""
+        return self.row_scores(self.index[hub_name])
+
+    def best_technology(self, i):
+        """Return the highest scoring technology for the hub at row i"""
+        return TECHNOLOGIES[self.best[i]]
+
+    def tech_column(self, tech):
+        """Return the score column for one technology across all hubs"""
+        return self.scores[:, TECHNOLOGIES.index(tech)]
+
+    def sensitivity(self, rows, n_samples=10000, concentration=100.0, seed=0, max_cells=4_000_000):
+        """
+        Monte Carlo weight sensitivity for the hubs at `rows`.
+
+        Draws n_samples weight matrices around the current weights and scores
+        every hub under every sample in one broadcast matrix product. Hubs are
+        processed in chunks so samples x hubs x technologies stays under
+        max_cells. Returns per-hub (hubs x technologies) arrays of win
+        probability and score mean/p5/p50/p95 on the 0-10 scale.
+        """
+        rng = np.random.default_rng(seed)
+        weight_samples = sample_weight_matrices(self.weights, n_samples, concentration, rng)
+        # (samples x factors x technologies) so factors @ samples -> (samples x hubs x technologies)
+        weight_samples = weight_samples.transpose(0, 2, 1)
+
+        rows = np.atleast_1d(np.asarray(rows, dtype=np.intp))
+        n_techs = len(TECHNOLOGIES)
+        result = {key: np.empty((len(rows), n_techs)) for key in ('win_probability', 'mean', 'p5', 'p50', 'p95')}
+
+        step = max(1, max_cells // (n_samples * n_techs))
+        for start in range(0, len(rows), step):
+            chunk = slice(start, start + step)
+            scores = self.factors[rows[chunk]] @ weight_samples
+            winners = scores.argmax(axis=2)
+            result['win_probability'][chunk] = (winners[..., None] == np.arange(n_techs)).mean(axis=0)
+            result['mean'][chunk] = scores.mean(axis=0)
+            result['p5'][chunk], result['p50'][chunk], result['p95'][chunk] = np.percentile(scores, [5, 50, 95], axis=0)
+
+        return result
+
+    def rank_column(self, tech=None):
+        """Return the per-hub score used for ranking: one technology, or the best one"""
+        return self.scores.max(axis=1) if tech is None else self.tech_column(tech)
+
+    def rank(self, tech=None, mask=None, limit=20, after=None):
+        """
+        Return the rows of the top `limit` hubs ordered by score (desc), then row (asc).
+
+        `tech` picks a technology column (None ranks by the best technology),
+        `mask` is an optional boolean filter over hubs and `after` is the
+        (score, row) of the last hub on the previous page. Selection uses
+        argpartition so only the returned page is fully sorted.
+        """
+        column = self.rank_column(tech)
+        candidates = np.arange(len(self.names)) if mask is None else np.flatnonzero(mask)
+        if after is not None:
+            after_score, after_row = after
+            candidate_scores = column[candidates]
+            candidates = candidates[(candidate_scores < after_score) | ((candidate_scores == after_score) & (candidates > after_row))]
+
+        if len(candidates) > limit:
+            candidate_scores = column[candidates]
+            threshold = candidate_scores[np.argpartition(-candidate_scores, limit - 1)[limit - 1]]
+            # Keep every hub tied at the threshold so the row tie-break stays exact across pages
+            candidates = candidates[candidate_scores >= threshold]
+
+        order = np.lexsort((candidates, -column[candidates]))
+        return candidates[order][:limit]
@@ -0,0 +1,168 @@
+# text_utils.py
+import hashlib
+import math
+import re
+from collections import Counter
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could do does for from has have how i if in into is it its
+me my of on or our please should so than that the their them then there these they this to
+us was we were what when where which who why will with would you your
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_PHRASE_BREAK_RE = re.compile(r"[.,;:!?()\[\]{}\"'\n\r\t-]+")
+
+# Query parameters that only track the click and never change the page
+TRACKING_PARAMS = frozenset({"fbclid", "gclid", "msclkid", "ref", "ref_src", "mc_cid", "mc_eid"})
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens of a string"""
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def content_tokens(text):
+    """Tokens with stopwords removed"""
+    return [token for token in tokenize(text) if token not in STOPWORDS]
+
+
+def normalize_query(query):
+    """
+    Canonical form of a search query for cache keys: case, punctuation,
+    whitespace, stopwords and word order are ignored, so
+    "Gujarat green hydrogen policy" and "green hydrogen policy of gujarat"
+    share a key.
+    """
+    return " ".join(sorted(set(content_tokens(query))))
+
+
+def keyword_query(text, max_terms=8):
+    """
+    A short search query from the most frequent content words of a text,
+    ties broken by first appearance
+    """
+    tokens = [token for token in content_tokens(text) if not token.isdigit() and len(token) > 2]
+    counts = Counter(tokens)
+    first_seen = {}
+    for i, token in enumerate(tokens):
+        first_seen.setdefault(token, i)
+    ranked = sorted(counts, key=lambda token: (-counts[token], first_seen[token]))
+    return " ".join(ranked[:max_terms])
+
+
+def rake_phrases(text, max_phrases=5, max_words=4):
+    """
+    Key phrases by RAKE: candidate phrases are runs of content words between
+    stopwords and punctuation, each word scores degree / frequency, and a
+    phrase scores the sum of its words. Highest-scoring phrases first.
+    """
+    candidates = []
+    for fragment in _PHRASE_BREAK_RE.split((text or "").lower()):
+        phrase = []
+        for token in tokenize(fragment):
+            if token in STOPWORDS or token.isdigit():
+                if phrase:
+                    candidates.append(tuple(phrase[:max_words]))
+                phrase = []
+            else:
+                phrase.append(token)
+        if phrase:
+            candidates.append(tuple(phrase[:max_words]))
+
+    frequency = Counter()
+    degree = Counter()
+    for phrase in candidates:
+        for word in phrase:
+            frequency[word] += 1
+            degree[word] += len(phrase)
+    scores = {phrase: sum(degree[word] / frequency[word] for word in phrase) for phrase in set(candidates)}
+    ranked = sorted(scores, key=lambda phrase: (-scores[phrase], candidates.index(phrase)))
+    return [" ".join(phrase) for phrase in ranked[:max_phrases]]
+
+
+def char_ngrams(text, n=3):
+    """
+    Character n-grams of a text's content words, for matching short texts
+    that are phrased slightly differently ("what is the water requirement?"
+    and "what's the water requirement"). Empty if the text has no content words.
+    """
+    words = [token for token in content_tokens(text) if len(token) > 1 or token.isdigit()]
+    if not words:
+        return frozenset()
+    padded = f" {' '.join(words)} "
+    return frozenset(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def estimate_tokens(text):
+    """Rough LLM token count (about four characters per token for English)"""
+    return (len(text) + 3) // 4
+
+
+def split_sentences(text):
+    return [sentence.strip() for sentence in _SENTENCE_RE.split(text or "") if sentence.strip()]
+
+
+def normalize_url(url):
+    """
+    Canonical form of a URL for duplicate detection: lowercase host without
+    "www.", no fragment, tracking parameters dropped, remaining parameters
+    sorted, no trailing slash
+    """
+    parts = urlsplit((url or "").strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith("utm_")
+    )
+    path = parts.path.rstrip("/")
+    return urlunsplit((parts.scheme.lower(), host, path, urlencode(query), ""))
+
+
+def simhash(text, bits=64):
+    """SimHash fingerprint over word trigrams; near-duplicate texts differ in few bits"""
+    tokens = tokenize(text)
+    shingles = Counter(" ".join(tokens[i:i + 3]) for i in range(max(1, len(tokens) - 2)))
+    weights = [0] * bits
+    for shingle, count in shingles.items():
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=bits // 8).digest(), "big")
+        for bit in range(bits):
+            weights[bit] += count if value >> bit & 1 else -count
+    return sum(1 << bit for bit in range(bits) if weights[bit] > 0)
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+class BM25:
+    """Okapi BM25 over a small in-memory corpus of token lists"""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(document) for document in documents]
+        self.lengths = [len(document) for document in documents]
+        self.average_length = sum(self.lengths) / len(documents) if documents else 0.0
+        document_frequency = Counter(term for counts in self.term_counts for term in counts)
+        n = len(documents)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+
+    def scores(self, query_tokens):
+        terms = set(query_tokens)
+        scores = []
+        for counts, length in zip(self.term_counts, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.average_length) if self.average_length else self.k1
+            scores.append(sum(
+                self.idf[term] * counts[term] * (self.k1 + 1) / (counts[term] + norm)
+                for term in terms if term in counts
+            ))
+        return scores
\ No newline at end of file
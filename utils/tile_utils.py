@@ -0,0 +1,173 @@
+# tile_utils.py
+"""
+Feasibility heatmap tiles for the map overlays, rendered from the hub data and
+cached on disk. Tiles are rendered on first request; a zoom range can also be
+rendered in bulk ahead of time:
+
+    python -m utils.tile_utils --min-zoom 0 --max-zoom 8
+"""
+import argparse
+import math
+import os
+import shutil
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TILE_CACHE_DIR = os.path.join(PROJECT_ROOT, 'cache', 'tiles')
+
+TILE_SIZE = 256
+
+# Bump when the rendering below changes so cached tiles are regenerated
+TILE_STYLE_VERSION = 'v1'
+
+# Tiles outside this box are always empty, so they are never rendered
+INDIA_BOUNDS = {'min_lat': 6.0, 'max_lat': 37.5, 'min_lon': 68.0, 'max_lon': 97.5}
+
+# Pixels farther than this from any hub are left transparent
+MAX_HUB_DISTANCE_KM = 200.0
+
+# Feasibility (0-100) -> colour ramp from red through amber to green
+COLOR_STOPS = np.array([40.0, 65.0, 90.0])
+COLOR_RAMP = np.array([
+    [220, 38, 38],
+    [245, 158, 11],
+    [22, 163, 74],
+], dtype=np.float64)
+TILE_ALPHA = 150
+
+
+def encode_png(rgba):
+    """Encode an (h x w x 4) uint8 array as a PNG without any imaging dependency"""
+    height, width, _ = rgba.shape
+    # Every scanline is prefixed with filter type 0 (None)
+    raw = np.hstack((np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4))).tobytes()
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw, 6))
+            + chunk(b'IEND', b''))
+
+
+def tile_bounds(z, x, y):
+    """Return (min_lat, max_lat, min_lon, max_lon) of a Web Mercator tile"""
+    n = 2 ** z
+    min_lon = x / n * 360.0 - 180.0
+    max_lon = (x + 1) / n * 360.0 - 180.0
+    max_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    min_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def tile_intersects_india(z, x, y):
+    min_lat, max_lat, min_lon, max_lon = tile_bounds(z, x, y)
+    return not (max_lat < INDIA_BOUNDS['min_lat'] or min_lat > INDIA_BOUNDS['max_lat']
+                or max_lon < INDIA_BOUNDS['min_lon'] or min_lon > INDIA_BOUNDS['max_lon'])
+
+
+def tile_pixel_grid(z, x, y, size=TILE_SIZE):
+    """Return flattened lat/lon arrays for the centre of every pixel in a tile"""
+    n = 2 ** z
+    offsets = (np.arange(size) + 0.5) / size
+    lons = (x + offsets) / n * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + offsets) / n))))
+    lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+    return lat_grid.ravel(), lon_grid.ravel()
+
+
+def render_tile(engine, index, tech, z, x, y, size=TILE_SIZE):
+    """Render the feasibility raster of one technology for a single tile as PNG bytes"""
+    rgba = np.zeros((size * size, 4), dtype=np.uint8)
+
+    if tile_intersects_india(z, x, y) and len(engine):
+        lats, lons = tile_pixel_grid(z, x, y, size)
+        rows, distances = index.nearest_many(lats, lons)
+        feasibility = engine.tech_column(tech)[rows] * 10
+        inside = distances <= MAX_HUB_DISTANCE_KM
+
+        for channel in range(3):
+            rgba[:, channel] = np.interp(feasibility, COLOR_STOPS, COLOR_RAMP[:, channel]).astype(np.uint8)
+        rgba[:, 3] = np.where(inside, TILE_ALPHA, 0)
+
+    return encode_png(rgba.reshape(size, size, 4))
+
+
+class TileCache:
+    """
+    On-disk tile cache laid out as <root>/<style>-<fingerprint>/<tech>/<z>/<x>/<y>.png.
+
+    The fingerprint identifies the hub data and weights the tiles were rendered
+    from, so a data, weight or style change lands in a fresh directory. Stale
+    directories are removed by prune(), which keeps the most recent versions
+    so workers still serving the previous data during a reload are unaffected.
+    """
+
+    def __init__(self, root, keep_versions=2):
+        self.root = root
+        self.keep_versions = keep_versions
+
+    def _version_dir(self, fingerprint):
+        return os.path.join(self.root, f"{TILE_STYLE_VERSION}-{fingerprint}")
+
+    def prune(self):
+        """Remove all but the `keep_versions` most recently written versions"""
+        if not os.path.isdir(self.root):
+            return
+        versions = [name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name))]
+        versions.sort(key=lambda name: os.path.getmtime(os.path.join(self.root, name)), reverse=True)
+        for name in versions[self.keep_versions:]:
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    def get(self, engine, index, tech, z, x, y):
+        """Return the path of a cached tile, rendering and storing it on a miss"""
+        path = os.path.join(self._version_dir(engine.fingerprint), tech, str(z), str(x), f"{y}.png")
+        if os.path.exists(path):
+            return path
+        tile = render_tile(engine, index, tech, z, x, y)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        for attempt in range(3):
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(tmp_path, 'wb') as f:
+                    f.write(tile)
+                # Atomic rename so concurrent workers never serve a half-written tile
+                os.replace(tmp_path, path)
+                return path
+            except FileNotFoundError:
+                # The version directory was pruned underneath us; recreate it
+                if attempt == 2:
+                    raise
+
+    def warm(self, engine, index, tech, z):
+        """Render every tile over India for one zoom level in bulk"""
+        n = 2 ** z
+        for x in range(n):
+            for y in range(n):
+                if tile_intersects_india(z, x, y):
+                    self.get(engine, index, tech, z, x, y)
+
+
+if __name__ == '__main__':
+    from utils.hub_data import shared_hub_store
+    from utils.scoring_utils import TECHNOLOGIES
+
+    parser = argparse.ArgumentParser(description="Render the feasibility tiles of a zoom range into the tile cache.")
+    parser.add_argument('--min-zoom', type=int, default=0)
+    parser.add_argument('--max-zoom', type=int, default=8)
+    parser.add_argument('--tech', action='append', choices=TECHNOLOGIES, help="Technology to render (default: all)")
+    parser.add_argument('--out', default=os.environ.get('MAP_TILE_CACHE_DIR', DEFAULT_TILE_CACHE_DIR), help="Tile cache directory")
+    args = parser.parse_args()
+
+    dataset = shared_hub_store().current()
+    cache = TileCache(args.out)
+    for tech in args.tech or TECHNOLOGIES:
+        for z in range(args.min_zoom, args.max_zoom + 1):
+            cache.warm(dataset.engine, dataset.index, tech, z)
+            print(f"Rendered {tech} tiles for zoom {z}")
+    cache.prune()